@@ -0,0 +1,114 @@
+"""
+Name: bench_analytics.py
+Description: Benchmarks the adherence analytics (src/Analytics.py) on generated dose histories.
+
+First checks the statistics of a small hand-written history, then times Analytics.compute on event arrays of
+several sizes. The events belong to prescriptions made by population.py and are spread over a year in time
+order, mostly "taken" with some snoozes and misses.
+
+Run from the Sprint folder:
+    python -m benchmarks.bench_analytics                      # default sizes, compared against baseline.json
+    python -m benchmarks.bench_analytics --sizes 100000       # number of events
+    python -m benchmarks.bench_analytics --update-baseline
+"""
+
+import sys
+import tempfile
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+import src.Analytics as Analytics
+import src.DoseLog as DoseLog
+from benchmarks.common import timed, finish
+from benchmarks.population import make_database, populate, DEFAULT_SEED
+
+DEFAULT_SIZES = (100_000, 1_000_000, 5_000_000)
+CUSTOMERS = 1000
+PRESCRIPTIONS = 5000
+
+
+def parse_sizes(argv: list[str]) -> tuple:
+    if "--sizes" not in argv:
+        return DEFAULT_SIZES
+    return tuple(int(size) for size in argv[argv.index("--sizes") + 1].split(","))
+
+
+def check_small_history():
+    """Statistics of a history small enough to work out by hand."""
+    class Presc:
+        def __init__(self, owner_ID, interval, schedule=None):
+            self.ID, self.owner_ID, self.time_btwn_dose = str(uuid.uuid4()), owner_ID, interval
+            self.schedule = schedule
+
+    day = 24 * 3600
+    daily = Presc("alice", day)
+    start = datetime(2024, 4, 1, 8, 0).timestamp()
+    history = [
+        (DoseLog.TAKEN, start),                    # First dose: on time by definition
+        (DoseLog.TAKEN, start + day + 600),        # 10 minutes late: on time
+        (DoseLog.SNOOZED, start + 2 * day + 600),
+        (DoseLog.TAKEN, start + 2 * day + 7800),   # 2 hours late: late
+        (DoseLog.MISSED, start + 3 * day + 7800),  # Due one day after the last dose
+        (DoseLog.TAKEN, start + 4 * day + 7800),   # Due one day after the missed dose: on time
+    ]
+    events = np.array([(uuid.UUID(daily.ID).bytes, event, moment) for event, moment in history],
+                      dtype=Analytics.EVENT_DTYPE)
+    stats = Analytics.compute(events, Analytics.PrescriptionTable([daily]))
+
+    assert stats["doses"].tolist() == [5]
+    assert stats["missed"].tolist() == [1] and stats["snoozed"].tolist() == [1]
+    assert stats["on_time_pct"][0] == 60.0
+    assert stats["mean_lateness_s"][0] == (600 + 7200 + 0) / 3
+    assert stats["longest_streak"].tolist() == [2]
+
+    # Times-of-day schedules are due at their next dose time, not one average gap later
+    weekdays = Presc("bob", 5 * day // 7, "weekdays 9:00")
+    friday = datetime(2024, 4, 5, 9, 0).timestamp()
+    history = [
+        (DoseLog.TAKEN, friday),
+        (DoseLog.TAKEN, friday + 3 * day + 1800),  # Monday 9:30, half an hour late
+    ]
+    events = np.array([(uuid.UUID(weekdays.ID).bytes, event, moment) for event, moment in history],
+                      dtype=Analytics.EVENT_DTYPE)
+    stats = Analytics.compute(events, Analytics.PrescriptionTable([weekdays]))
+    assert stats["mean_lateness_s"][0] == 1800 and stats["on_time_pct"][0] == 100.0
+
+
+def make_events(prescription_IDs: np.ndarray, count: int, start: float, rng: np.random.Generator) -> np.ndarray:
+    """count random events spread over a year, written in time order as the program would."""
+    events = np.empty(count, dtype=Analytics.EVENT_DTYPE)
+    rows = rng.integers(0, len(prescription_IDs), count)
+    events["ID"] = prescription_IDs[rows]
+    events["event"] = rng.choice([DoseLog.TAKEN, DoseLog.SNOOZED, DoseLog.MISSED], count, p=[0.8, 0.12, 0.08])
+    events["time"] = np.sort(start + rng.random(count) * 365 * 24 * 3600)
+    return events
+
+
+def main(argv: list[str]):
+    check_small_history()
+
+    rng = np.random.default_rng(DEFAULT_SEED)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        database = make_database(directory)
+        populate(database, CUSTOMERS, PRESCRIPTIONS, now=datetime(2024, 1, 1))
+        results["prescription_table_s"], table = timed(Analytics.PrescriptionTable.from_database, database)
+        prescription_IDs = np.array([uuid.UUID(p.ID).bytes for p in database.prescriptions], dtype="V16")
+
+    start = datetime(2024, 1, 1).timestamp()
+    for count in parse_sizes(argv):
+        print(f"Benchmarking {count} events...")
+        events = make_events(prescription_IDs, count, start, rng)
+        seconds, stats = timed(Analytics.compute, events, table, repeat=3)
+        results[f"{count}_events"] = {
+            "compute_s": seconds,
+            "events_per_second": count / seconds,
+            "population_on_time_pct": stats["population"]["on_time_pct"],
+        }
+    finish("analytics", results, argv)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,143 @@
+"""
+Name: bench_auth.py
+Description: Benchmarks logins (Database.authenticate) under different password hashing costs (src/Password.py).
+
+For every policy this reports the time of a successful and a failed login and how many logins per second one
+thread and THREADS threads get through (hashlib lets other threads run while it hashes). This is what sizes
+the login path: a policy costing 70ms per login caps one core at about 14 logins per second.
+
+It also times:
+    * Finding the customer among many, with the username index, against the old scan of every customer.
+    * The first login of a customer saved before passwords were hashed, which hashes the password and saves the
+      customer list (of LOOKUP_CUSTOMERS customers here), against their next login.
+    * The login throttle (src/RateLimit.py): the cost of an attempt, with THROTTLE_KEYS different usernames
+      against a limiter holding at most THROTTLE_MAX_BUCKETS of them, and how many buckets it ends up with.
+
+Run from the Sprint folder:
+    python -m benchmarks.bench_auth                             # compared against baseline.json
+    python -m benchmarks.bench_auth --logins 50                 # logins timed per policy
+    python -m benchmarks.bench_auth --update-baseline
+"""
+
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import src.Password as Password
+import src.RateLimit as RateLimit
+from benchmarks.common import timed, finish
+from benchmarks.population import make_database, populate, password_of
+
+POLICIES = (
+    Password.Policy(Password.PBKDF2, 100_000),
+    Password.Policy(Password.PBKDF2, 310_000),
+    Password.Policy(Password.PBKDF2, 600_000),
+    Password.Policy(Password.SCRYPT, 2 ** 14),
+    Password.Policy(Password.SCRYPT, 2 ** 15),
+)
+DEFAULT_LOGINS = 20
+THREADS = min(4, os.cpu_count() or 1)
+LOOKUP_CUSTOMERS = 100_000
+LOOKUPS = 10_000
+THROTTLE_KEYS = 1_000_000
+THROTTLE_MAX_BUCKETS = 100_000
+
+
+def parse_count(argv: list[str], option: str, default: int) -> int:
+    if option not in argv:
+        return default
+    return int(argv[argv.index(option) + 1])
+
+
+def legacy_find(database, username: str):
+    """How customers were found before the username index: a scan of every customer."""
+    for customer in database.customers:
+        if customer.username == username:
+            return customer
+    return None
+
+
+def bench_policy(database, policy: Password.Policy, logins: int) -> dict:
+    # The policy stays in place while logging in, or the first login would rehash with the default one
+    previous = Password.set_policy(policy)
+    try:
+        username = f"gojo-{policy.algorithm}-{policy.cost}"
+        database.add_customer("Satoru", "Gojo", username, "hollow&purple1989", "satorugojo@jjhs.edu", "5551234567")
+
+        def login(password: str):
+            return database.authenticate(username, password)
+
+        success_s, customer = timed(lambda: [login("hollow&purple1989") for _ in range(logins)])
+        assert customer[0] is not None
+        failure_s, customer = timed(lambda: [login("wrong-password1") for _ in range(logins)])
+        assert customer[0] is None
+
+        with ThreadPoolExecutor(THREADS) as pool:
+            parallel_s, _ = timed(lambda: list(pool.map(login, ["hollow&purple1989"] * logins * THREADS)))
+    finally:
+        Password.set_policy(previous)
+
+    return {
+        "login_per_call_s": success_s / logins,
+        "failed_login_per_call_s": failure_s / logins,
+        "logins_per_second": logins / success_s,
+        f"logins_per_second_{THREADS}_threads": logins * THREADS / parallel_s,
+    }
+
+
+def bench_lookup(database) -> dict:
+    usernames = [customer.username for customer in database.customers[::len(database.customers) // 100]]
+    calls = LOOKUPS // len(usernames)
+    index_s, _ = timed(lambda: [database.get_customer_by_username(name) for name in usernames * calls])
+    scan_s, _ = timed(lambda: [legacy_find(database, name) for name in usernames])
+    return {
+        "customers": len(database.customers),
+        "index_per_call_s": index_s / (len(usernames) * calls),
+        "legacy_scan_per_call_s": scan_s / len(usernames),
+    }
+
+
+def bench_rehash(database) -> dict:
+    """First and second login of a customer whose password was saved in plaintext."""
+    customer = database.get_customer_by_ID(database.customers[0].ID)
+    customer.password = password_of(0)
+    del customer.password_hash
+    first_s, result = timed(database.authenticate, customer.username, password_of(0))
+    assert result is customer and customer.password is None
+    second_s, result = timed(database.authenticate, customer.username, password_of(0))
+    assert result is customer
+    return {"first_login_s": first_s, "next_login_s": second_s}
+
+
+def bench_throttle() -> dict:
+    limiter = RateLimit.TokenBucketLimiter(max_buckets=THROTTLE_MAX_BUCKETS)
+    usernames = [f"user{idx}" for idx in range(THROTTLE_KEYS)]
+    spread_s, _ = timed(lambda: [limiter.allow(name) for name in usernames])
+    refused_s, _ = timed(lambda: [limiter.allow("gojo") for _ in range(THROTTLE_KEYS)])
+    return {
+        "distinct_usernames_per_call_s": spread_s / THROTTLE_KEYS,
+        "same_username_per_call_s": refused_s / THROTTLE_KEYS,  # All but the first few are refused
+        "buckets_kept": len(limiter),
+    }
+
+
+def main(argv: list[str]):
+    logins = parse_count(argv, "--logins", DEFAULT_LOGINS)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        database = make_database(directory)
+        print(f"Generating {LOOKUP_CUSTOMERS} customers...")
+        populate(database, LOOKUP_CUSTOMERS, 0)
+
+        results["lookup"] = bench_lookup(database)
+        for policy in POLICIES:
+            print(f"Timing logins with {policy.algorithm}, cost {policy.cost}...")
+            results[f"{policy.algorithm}_{policy.cost}"] = bench_policy(database, policy, logins)
+        results["rehash_on_login"] = bench_rehash(database)
+    results["throttle"] = bench_throttle()
+    finish("auth", results, argv)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,251 @@
+"""
+Name: bench_concurrency.py
+Description: Stress test of the Database under many threads (see src/Concurrency.py).
+
+WRITERS threads add prescriptions, delete them (by ID and by drug name), mark doses taken and save, each on its
+own customers so the expected end state is known. Then WRITERS more threads do the same on SHARED_CUSTOMERS
+customers they all share, each deleting only what it added. At the same time READERS threads run the reminder
+check over every loaded shard, iterate the prescriptions, save them and read every shard from disk.
+MAX_RESIDENT_SHARDS is kept small so shards keep being saved, dropped and read again while all this goes on.
+
+The run fails (exit status 1) if any thread raised, or if anything was lost:
+    * every customer's saved shard holds exactly the prescriptions expected (those it had, plus those each writer
+      added and did not delete), read back by a fresh Database,
+    * every loaded prescription is in the ID index and belongs to its shard's owner,
+    * the dose log holds one TAKEN event for every dose marked taken.
+Reports how many operations per second the writers and the readers got through.
+
+Run from the Sprint folder:
+    python -m benchmarks.bench_concurrency                  # compared against baseline.json
+    python -m benchmarks.bench_concurrency --ops 5000       # operations per writer
+    python -m benchmarks.bench_concurrency --update-baseline
+"""
+
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import src.Clock as Clock
+import src.Notification as Notification
+from src.DoseLog import TAKEN
+from benchmarks.common import finish
+from benchmarks.population import make_database, populate, DEFAULT_SEED
+
+CUSTOMERS = 64
+PRESCRIPTIONS = 1000
+RESIDENT_SHARDS = 16
+WRITERS = 4
+SHARED_CUSTOMERS = 4
+READERS = 4
+DEFAULT_OPS = 2000
+NOW = datetime(2024, 4, 5, 12)
+
+
+def parse_count(argv: list[str], option: str, default: int) -> int:
+    if option not in argv:
+        return default
+    return int(argv[argv.index(option) + 1])
+
+
+class Writer(threading.Thread):
+    """Changes the prescriptions of the given customers, and keeps track of what they should end up as.
+    Only prescriptions added by this writer are deleted, so writers may share customers."""
+
+    def __init__(self, database, customer_IDs: list[str], ops: int, seed: int):
+        super().__init__()
+        self.database = database
+        self.ops = ops
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.expected = {ID: {p.ID for p in database.peek_shard(ID)} for ID in customer_IDs}
+        self.added = {}  # Prescription ID -> drug name, of those added here and not deleted yet
+        self.taken = 0
+        self.error = None
+
+    def run(self):
+        try:
+            for idx in range(self.ops):
+                self.step(idx)
+        except BaseException as error:
+            self.error = error
+
+    def step(self, idx: int) -> None:
+        database, rng = self.database, self.rng
+        owner_ID = rng.choice(list(self.expected))
+        owned = self.expected[owner_ID]
+        chance = rng.random()
+        if chance < 0.4 or not owned:
+            drug_name = f"Stress-{self.seed}-{idx}"  # Unique, so deleting by drug name removes only this one
+            ID = database.add_prescription(owner_ID, drug_name, "Ieiri Shoko", 28800, "None", "200mg",
+                                           2024, 4, 5, 2025, 4, 5)
+            owned.add(ID)
+            self.added[ID] = drug_name
+        elif chance < 0.6 and owned & self.added.keys():
+            ID = rng.choice(sorted(owned & self.added.keys()))
+            if rng.random() < 0.5:
+                database.delete_prescription_by_ID(ID, owner_ID)
+            else:
+                database.delete_prescription_by_drug_name(self.added[ID], owner_ID)
+            owned.discard(ID)
+            del self.added[ID]
+        else:
+            if database.mark_taken(rng.choice(sorted(owned)), owner_ID) is None:
+                raise AssertionError(f"Prescription of {owner_ID} went missing")
+            self.taken += 1
+        if rng.random() < 0.2:
+            database.save_shard(owner_ID)
+
+
+class Reader(threading.Thread):
+    """Reads and saves everything that is loaded until told to stop."""
+
+    def __init__(self, database, stop: threading.Event, seed: int):
+        super().__init__()
+        self.database = database
+        self.stop = stop
+        self.rng = random.Random(seed)
+        self.ops = 0
+        self.error = None
+
+    def run(self):
+        database = self.database
+        try:
+            while not self.stop.is_set():
+                chance = self.rng.random()
+                if chance < 0.5:
+                    Notification.check(database)
+                elif chance < 0.8:
+                    for prescription in database.prescriptions:
+                        prescription.drug_name.lower()
+                elif chance < 0.95:
+                    database.save_prescriptions()
+                else:
+                    sum(1 for _ in database.iter_all_prescriptions())
+                self.ops += 1
+        except BaseException as error:
+            self.error = error
+
+
+def check_consistency(database, writers: list[Writer]) -> list[str]:
+    """Problems with the loaded shards and their index."""
+    problems = []
+    with database.lock.read():
+        for owner_ID, shard in database._shards.items():
+            for prescription in shard:
+                if prescription.owner_ID != owner_ID:
+                    problems.append(f"{prescription.ID} is in the shard of {owner_ID}")
+                if database._prescription_index.get(prescription.ID) is not prescription:
+                    problems.append(f"{prescription.ID} is missing from the index")
+    return problems
+
+
+def check_saved(directory: str, writers: list[Writer], taken_before: int) -> list[str]:
+    """Problems with what was saved, read back by a fresh Database."""
+    problems = []
+    database = make_database(directory)
+    database.load()
+    expected_shards = {}  # Owner -> what every writer that changed the shard expects to be left
+    for writer in writers:
+        for owner_ID, expected in writer.expected.items():
+            expected_shards.setdefault(owner_ID, set()).update(expected)
+    for owner_ID, expected in expected_shards.items():
+        saved = {p.ID for p in database.peek_shard(owner_ID)}
+        if saved != expected:
+            problems.append(f"Shard of {owner_ID}: {len(expected - saved)} missing, "
+                            f"{len(saved - expected)} unexpected")
+    taken = sum(1 for _, event, _ in database.dose_log.events() if event == TAKEN) - taken_before
+    expected_taken = sum(writer.taken for writer in writers)
+    if taken != expected_taken:
+        problems.append(f"{taken} doses logged as taken instead of {expected_taken}")
+    database.close()
+    return problems
+
+
+def main(argv: list[str]):
+    ops = parse_count(argv, "--ops", DEFAULT_OPS)
+
+    previous_clock = Clock.set_clock(Clock.VirtualClock(NOW))
+    try:
+        results = stress(ops)
+    finally:
+        Clock.set_clock(previous_clock)
+    finish("concurrency", results, argv)
+
+
+def stress(ops: int) -> dict:
+    """Runs the threads, checks nothing was lost and returns the results."""
+    with tempfile.TemporaryDirectory() as directory:
+        database = make_database(directory)
+        customer_IDs = populate(database, CUSTOMERS, PRESCRIPTIONS, now=NOW)
+        database.save_all()
+        database.MAX_RESIDENT_SHARDS = RESIDENT_SHARDS
+        taken_before = sum(1 for _, event, _ in database.dose_log.events() if event == TAKEN)
+
+        writers = [Writer(database, customer_IDs[idx::WRITERS], ops, DEFAULT_SEED + idx) for idx in range(WRITERS)]
+        stop = threading.Event()
+        readers = [Reader(database, stop, DEFAULT_SEED + WRITERS + idx) for idx in range(READERS)]
+
+        print(f"{WRITERS} writers doing {ops} operations each, with {READERS} readers...")
+        start = time.perf_counter()
+        for thread in readers + writers:
+            thread.start()
+        for writer in writers:
+            writer.join()
+        writing_s = time.perf_counter() - start
+
+        # Made once the others are done, so they start from the shards as those left them. New seeds, so drug
+        # names do not repeat those already added
+        shared = [Writer(database, customer_IDs[:SHARED_CUSTOMERS], ops, DEFAULT_SEED + WRITERS + READERS + idx)
+                  for idx in range(WRITERS)]
+        print(f"{WRITERS} writers doing {ops} operations each on {SHARED_CUSTOMERS} shared customers...")
+        start = time.perf_counter()
+        for writer in shared:
+            writer.start()
+        for writer in shared:
+            writer.join()
+        shared_s = time.perf_counter() - start
+        stop.set()
+        for reader in readers:
+            reader.join()
+
+        problems = [f"{type(thread).__name__} raised {thread.error!r}"
+                    for thread in writers + shared + readers if thread.error is not None]
+        problems += check_consistency(database, writers + shared)
+        database.save_all()
+        database.close()
+        problems += check_saved(directory, writers + shared, taken_before)
+
+    for problem in problems:
+        print("FAILED:", problem)
+    if problems:
+        sys.exit(1)
+    print("No lost updates")
+
+    writes = WRITERS * ops
+    reads = sum(reader.ops for reader in readers)
+    return {
+        "stress": {
+            "writers": WRITERS,
+            "readers": READERS,
+            "writer_operations": writes,
+            "reader_operations": reads,
+            "writer_ops_per_second": writes / writing_s,
+            "reader_ops_per_second": reads / writing_s,
+            "writer_op_s": writing_s / writes,
+            "total_s": writing_s,
+        },
+        "shared": {
+            "writers": WRITERS,
+            "customers": SHARED_CUSTOMERS,
+            "writer_operations": writes,
+            "writer_ops_per_second": writes / shared_s,
+            "writer_op_s": shared_s / writes,
+        },
+    }
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
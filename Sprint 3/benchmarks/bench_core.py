@@ -0,0 +1,108 @@
+"""
+Name: bench_core.py
+Description: Benchmarks the core Database, Notification and Validator entry points on generated populations.
+
+Covers Database.save_all, Database.load, Database.load_shard, Database.get_customer_by_ID,
+Database.get_dose_calendar (first and repeated queries), Notification.check and the Validator checks used by the signup and login windows, at several population sizes.
+
+Run from the Sprint folder:
+    python -m benchmarks.bench_core                       # default sizes, compared against baseline.json
+    python -m benchmarks.bench_core --sizes 100x500       # customers x prescriptions
+    python -m benchmarks.bench_core --update-baseline     # store these results as the new baseline
+"""
+
+import random
+import sys
+import tempfile
+
+import src.Notification as Notification
+import src.Password as Password
+from src.Validator import Validator
+from benchmarks.common import timed, finish
+from benchmarks.population import make_database, populate, password_of, DEFAULT_SEED
+
+DEFAULT_SIZES = ((100, 500), (1000, 5000), (10000, 50000))
+LOOKUPS = 1000  # Calls per measurement for the cheap per-customer operations
+VALIDATOR_CALLS = 200
+
+
+def parse_sizes(argv: list[str]) -> tuple:
+    if "--sizes" not in argv:
+        return DEFAULT_SIZES
+    text = argv[argv.index("--sizes") + 1]
+    return tuple(tuple(int(part) for part in size.split("x")) for size in text.split(","))
+
+
+def per_call(func, calls: int) -> float:
+    """Average seconds per call of func() over the given number of calls (best of 3 rounds)."""
+    def run():
+        for _ in range(calls):
+            func()
+    return timed(run, repeat=3)[0] / calls
+
+
+def bench_size(customer_count: int, prescription_count: int) -> dict:
+    rng = random.Random(DEFAULT_SEED)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = make_database(directory)
+        results["populate_s"], customer_IDs = timed(populate, database, customer_count, prescription_count)
+        results["save_all_s"] = timed(database.save_all, repeat=3)[0]
+
+        # Cold start: customers only
+        def load_fresh():
+            fresh = make_database(directory)
+            fresh.load()
+            return fresh
+        results["load_s"], loaded = timed(load_fresh, repeat=3)
+
+        # Shards are read one at a time on login
+        sample = rng.sample(customer_IDs, min(LOOKUPS, len(customer_IDs)))
+        results["load_shard_per_call_s"] = timed(lambda: [loaded.load_shard(ID) for ID in sample])[0] / len(sample)
+
+        results["get_customer_by_ID_per_call_s"] = per_call(
+            lambda: loaded.get_customer_by_ID(rng.choice(customer_IDs)), LOOKUPS)
+
+        # A week of doses per customer. The first query generates the dose times, later ones reuse them
+        calendar_sample = sample[:100]
+        results["get_dose_calendar_cold_per_call_s"] = timed(
+            lambda: [database.get_dose_calendar(ID) for ID in calendar_sample])[0] / len(calendar_sample)
+        results["get_dose_calendar_warm_per_call_s"] = timed(
+            lambda: [database.get_dose_calendar(ID) for ID in calendar_sample], repeat=3)[0] / len(calendar_sample)
+
+        # The due check runs over every prescription held in memory
+        results["notification_check_s"], due = timed(Notification.check, database, repeat=3)
+        results["notification_due_count"] = len(due)
+
+        # Validator checks, with usernames that do and do not exist
+        existing = database.get_customer_by_ID(customer_IDs[-1])
+        validator = Validator()
+        results["check_username_does_not_exist_per_call_s"] = per_call(
+            lambda: validator.check_username_does_not_exist("nobody-has-this-name", database), VALIDATOR_CALLS)
+        results["check_username_exists_per_call_s"] = per_call(
+            lambda: validator.check_username_exists(existing.username, database), VALIDATOR_CALLS)
+        results["check_username_password_match_per_call_s"] = per_call(
+            lambda: validator.check_username_password_match(existing.username, password_of(len(customer_IDs) - 1),
+                                                            database),
+            VALIDATOR_CALLS)
+        results["check_valid_email_format_per_call_s"] = per_call(
+            lambda: validator.check_valid_email_format(existing.email), VALIDATOR_CALLS)
+        results["check_valid_password_format_per_call_s"] = per_call(
+            lambda: validator.check_valid_password_format("hollow&purple1989"), VALIDATOR_CALLS)
+
+    return results
+
+
+def main(argv: list[str]):
+    # Logins would otherwise rehash with the real policy, and time nothing but that (see bench_auth)
+    Password.set_policy(Password.FAST_POLICY)
+    results = {}
+    for customer_count, prescription_count in parse_sizes(argv):
+        print(f"Benchmarking {customer_count} customers x {prescription_count} prescriptions...")
+        results[f"{customer_count}x{prescription_count}"] = bench_size(customer_count, prescription_count)
+    finish("core", results, argv)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
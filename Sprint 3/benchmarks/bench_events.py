@@ -0,0 +1,133 @@
+"""
+Name: bench_events.py
+Description: Benchmarks the Database's change events (src/Events.py) and what they save the consumers.
+
+    1. Publishing: the time of add_prescription and mark_taken with only the Database's own subscribers, with
+       SUBSCRIBERS more synchronous ones, and with SUBSCRIBERS more queued ones (plus draining them).
+    2. Saving: after CHANGES changes spread over five customers, saving only the shards that changed
+       (save_changed, which follows the events) against saving every loaded shard (save_prescriptions).
+    3. Following changes: a consumer keeping a count of prescriptions per drug, updated from the events, against
+       recounting every loaded prescription after each change.
+
+Run from the Sprint folder:
+    python -m benchmarks.bench_events                       # compared against baseline.json
+    python -m benchmarks.bench_events --update-baseline
+"""
+
+import sys
+import tempfile
+from collections import Counter
+
+import src.Events as Events
+from benchmarks.common import timed, finish
+from benchmarks.population import make_database, populate
+
+CUSTOMERS = 1000
+PRESCRIPTIONS = 5000
+CALLS = 2000
+SUBSCRIBERS = 4
+CHANGES = 20
+REPEAT = 3
+
+
+def time_changes(database, customer_IDs: list[str]) -> dict:
+    """Seconds per add_prescription and per mark_taken."""
+    def add():
+        return [database.add_prescription(customer_IDs[idx % len(customer_IDs)], "Ibuprofen", "Ieiri Shoko",
+                                          28800, "None", "200mg", 2024, 4, 5, 2025, 4, 5)
+                for idx in range(CALLS)]
+
+    add_s, IDs = timed(add)
+    owners = {ID: database.get_prescription_by_ID(ID).owner_ID for ID in IDs}
+    taken_s, _ = timed(lambda: [database.mark_taken(ID, owner_ID) for ID, owner_ID in owners.items()])
+    for ID, owner_ID in owners.items():
+        database.delete_prescription_by_ID(ID, owner_ID)
+    return {"add_prescription_per_call_s": add_s / CALLS, "mark_taken_per_call_s": taken_s / CALLS}
+
+
+def bench_publishing(database, customer_IDs: list[str]) -> dict:
+    results = {"own_subscribers": time_changes(database, customer_IDs)}
+
+    subscriptions = [database.events.subscribe(lambda event: None) for _ in range(SUBSCRIBERS)]
+    results[f"{SUBSCRIBERS}_synchronous"] = time_changes(database, customer_IDs)
+    for subscription in subscriptions:
+        subscription.cancel()
+
+    subscriptions = [database.events.subscribe(lambda event: None, queued=True) for _ in range(SUBSCRIBERS)]
+    results[f"{SUBSCRIBERS}_queued"] = time_changes(database, customer_IDs)
+    results[f"{SUBSCRIBERS}_queued"]["drain_s"], _ = timed(lambda: [s.drain() for s in subscriptions])
+    for subscription in subscriptions:
+        subscription.cancel()
+    return results
+
+
+def bench_saving(database, customer_IDs: list[str]) -> dict:
+    owner_IDs = [ID for ID in customer_IDs if database.load_shard(ID)][:5]
+
+    def change():
+        for idx in range(CHANGES):
+            owner_ID = owner_IDs[idx % len(owner_IDs)]
+            prescription = database.load_shard(owner_ID)[0]
+            database.mark_taken(prescription.ID, owner_ID)
+
+    def changed_only():
+        change()
+        database.save_changed()
+
+    def every_shard():
+        change()
+        database.save_prescriptions()
+
+    changed_s, _ = timed(changed_only, repeat=REPEAT)
+    every_s, _ = timed(every_shard, repeat=REPEAT)
+    return {"loaded_shards": len(database._shards), "save_changed_s": changed_s, "save_prescriptions_s": every_s}
+
+
+def bench_following(database, customer_IDs: list[str]) -> dict:
+    """Keeps a count of prescriptions per drug while CHANGES prescriptions are added and deleted again."""
+    def recount():
+        return Counter(p.drug_name for p in database.prescriptions)
+
+    def change(after_each):
+        IDs = []
+        for idx in range(CHANGES):
+            owner_ID = customer_IDs[idx]
+            IDs.append((database.add_prescription(owner_ID, "Ibuprofen", "Ieiri Shoko", 28800, "None", "200mg",
+                                                  2024, 4, 5, 2025, 4, 5), owner_ID))
+            after_each()
+        for ID, owner_ID in IDs:
+            database.delete_prescription_by_ID(ID, owner_ID)
+            after_each()
+
+    legacy_rescan_s, _ = timed(lambda: change(recount), repeat=REPEAT)
+
+    counts = recount()
+
+    def follow(event):
+        counts[event.prescription.drug_name] += 1 if event.kind == Events.ADDED else -1
+
+    subscription = database.events.subscribe(follow, kinds=(Events.ADDED, Events.DELETED))
+    events_s, _ = timed(lambda: change(lambda: None), repeat=REPEAT)
+    subscription.cancel()
+    if +counts != +recount():
+        raise AssertionError("Counts kept from the events differ from a recount")
+    return {"legacy_rescan_s": legacy_rescan_s, "events_s": events_s}
+
+
+def main(argv: list[str]):
+    with tempfile.TemporaryDirectory() as directory:
+        database = make_database(directory)
+        customer_IDs = populate(database, CUSTOMERS, PRESCRIPTIONS)
+        database.save_all()
+
+        results = {
+            "publishing": bench_publishing(database, customer_IDs),
+            "saving": bench_saving(database, customer_IDs),
+            "following": bench_following(database, customer_IDs),
+        }
+        database.close()
+    finish("events", results, argv)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
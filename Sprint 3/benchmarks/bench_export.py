@@ -0,0 +1,104 @@
+"""
+Name: bench_export.py
+Description: Benchmarks the exports of src/Exporter.py on generated databases of growing size.
+
+Each database is generated, saved, and loaded again the way the program loads it, so prescriptions are read from
+their shards during the export. For every size this reports rows per second of the CSV, JSON-lines and .npz
+exports, and the peak memory (tracemalloc) of the CSV export, which depends on the size of the shards kept in
+memory (Database.MAX_RESIDENT_SHARDS) rather than on the size of the database. For comparison, it also times
+building str(Database) with every shard loaded, which used to be the only way to see all the data.
+
+Run from the Sprint folder:
+    python -m benchmarks.bench_export                           # default sizes, compared against baseline.json
+    python -m benchmarks.bench_export --sizes 1000x10000        # customers x prescriptions
+    python -m benchmarks.bench_export --update-baseline
+"""
+
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import src.Exporter as Exporter
+from benchmarks.common import timed, finish
+from benchmarks.population import make_database, populate
+
+DEFAULT_SIZES = ((1000, 10000), (10000, 100000))
+NPZ_FIELDS = ("owner_ID", "drug_name", "time_btwn_dose", "was_taken")
+
+
+def parse_sizes(argv: list[str]) -> tuple:
+    if "--sizes" not in argv:
+        return DEFAULT_SIZES
+    text = argv[argv.index("--sizes") + 1]
+    return tuple(tuple(int(part) for part in size.split("x")) for size in text.split(","))
+
+
+def peak_memory(func, *args) -> int:
+    """Peak bytes allocated by Python while running func."""
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_size(customer_count: int, prescription_count: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        generated = make_database(directory)
+        populate(generated, customer_count, prescription_count)
+        generated.save_all()
+        generated.close()
+
+        database = make_database(directory)
+        database.load()
+
+        results = {}
+        for kind, count in ((Exporter.CUSTOMERS, customer_count), (Exporter.PRESCRIPTIONS, prescription_count)):
+            kind_results = {}
+            for file_format in ("csv", "jsonl"):
+                path = os.path.join(directory, f"{kind}.{file_format}")
+                seconds, rows = timed(Exporter.export, database, kind, path)
+                assert rows == count
+                kind_results[file_format] = {
+                    "rows": rows,
+                    "export_s": seconds,
+                    "rows_per_second": rows / seconds,
+                    "megabytes": os.path.getsize(path) / 2 ** 20,
+                }
+            results[kind] = kind_results
+
+        path = os.path.join(directory, "prescriptions.npz")
+        seconds, rows = timed(Exporter.export, database, Exporter.PRESCRIPTIONS, path, None, NPZ_FIELDS)
+        results[Exporter.PRESCRIPTIONS]["npz"] = {
+            "fields": len(NPZ_FIELDS),
+            "export_s": seconds,
+            "rows_per_second": rows / seconds,
+            "megabytes": os.path.getsize(path) / 2 ** 20,
+        }
+
+        path = os.path.join(directory, "memory.csv")
+        results[Exporter.PRESCRIPTIONS]["csv"]["peak_memory_mb"] = peak_memory(
+            Exporter.export, database, Exporter.PRESCRIPTIONS, path) / 2 ** 20
+
+        # The old way: every shard in memory, then one string of everything
+        database.MAX_RESIDENT_SHARDS = customer_count
+        for customer in database.customers:
+            database.load_shard(customer.ID)
+        seconds, text = timed(str, database)
+        results["str_database"] = {"build_s": seconds, "megabytes": len(text) / 2 ** 20}
+        database.close()
+    return results
+
+
+def main(argv: list[str]):
+    results = {}
+    for customer_count, prescription_count in parse_sizes(argv):
+        print(f"Benchmarking {customer_count} customers, {prescription_count} prescriptions...")
+        results[f"{customer_count}x{prescription_count}"] = bench_size(customer_count, prescription_count)
+    finish("export", results, argv)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
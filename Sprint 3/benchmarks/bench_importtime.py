@@ -0,0 +1,96 @@
+"""
+Name: bench_importtime.py
+Description: Start-up import report for main.py, built from `python -X importtime`.
+
+Imports main.py (without running the app) in a fresh interpreter several times and reports:
+    * the total time spent importing main.py
+    * the slowest modules by their own import time
+    * the time spent in this project's modules
+    * whether any module that is supposed to be loaded on first use was imported at startup anyway
+
+Run from the Sprint folder:
+    python -m benchmarks.bench_importtime [--runs N] [--update-baseline]
+The import times of main.py and of each of this project's modules are compared against benchmarks/baseline.json.
+Exits with status 1 if one of them regressed or a deferred module shows up in the startup imports.
+"""
+
+import os
+import subprocess
+import sys
+
+from benchmarks.common import write_results, finish
+
+SPRINT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOP_N = 15
+DEFAULT_RUNS = 7
+# Most modules import in well under a millisecond, where a busy machine easily adds half again
+TOLERANCE = 2.0
+
+# Modules that App only imports when they are first needed. Seeing any of these at startup is a regression.
+DEFERRED_MODULES = (
+    "src.Account", "src.Alert", "src.Medication", "src.Validator", "src.Notification", "windows_toasts",
+    # Imported by the Database and Customer on first use
+    "src.Password", "src.Schedule", "src.QuietHours", "src.Calendar", "src.DoseLog",
+    # Standard library modules that only those (or sign in, or error reporting) need
+    "hmac", "hashlib", "secrets", "traceback", "json",
+)
+
+
+def run_importtime() -> dict:
+    """Imports main.py in a new interpreter. Returns {module name: (self µs, cumulative µs)}."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=SPRINT_DIR, capture_output=True, text=True, check=True
+    )
+
+    timings = {}
+    for line in completed.stderr.splitlines():
+        # Lines look like "import time:       312 |       1024 |   src.Database"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def median(values: list):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def parse_count(argv: list[str], option: str, default: int) -> int:
+    if option not in argv:
+        return default
+    return int(argv[argv.index(option) + 1])
+
+
+def main(argv: list[str]):
+    runs = parse_count(argv, "--runs", DEFAULT_RUNS)
+    samples = [run_importtime() for _ in range(runs)]
+
+    # Median of each module over all runs that imported it, to smooth out disk cache and scheduler noise
+    modules = set().union(*samples)
+    self_us = {name: median([s[name][0] for s in samples if name in s]) for name in modules}
+    cumulative_us = {name: median([s[name][1] for s in samples if name in s]) for name in modules}
+
+    eager_deferred = sorted(name for name in modules if name in DEFERRED_MODULES)
+    results = {
+        "runs": runs,
+        "main_cumulative_s": cumulative_us.get("main", 0) / 1e6,
+        "module_count": len(modules),
+        "project_modules": {name: {"cumulative_s": cumulative_us[name] / 1e6} for name in sorted(modules)
+                            if name.startswith("src.")},
+        "slowest_self_s": [[name, self_us[name] / 1e6]
+                           for name in sorted(modules, key=self_us.get, reverse=True)[:TOP_N]],
+        "deferred_modules_imported_at_startup": eager_deferred,
+    }
+
+    if eager_deferred:
+        write_results("importtime", results)  # No baseline is stored or compared against until this is fixed
+        print(f"REGRESSION: modules meant to load on first use were imported at startup: {eager_deferred}")
+        sys.exit(1)
+    finish("importtime", results, argv, TOLERANCE)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
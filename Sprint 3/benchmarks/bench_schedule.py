@@ -0,0 +1,125 @@
+"""
+Name: bench_schedule.py
+Description: Benchmarks the dose schedules (src/Schedule.py), quiet hours (src/QuietHours.py) and the due check
+that uses them.
+
+Measures parsing a schedule expression, finding the next dose with interval and times-of-day schedules, the
+quiet hours lookup, and Notification.check on populations where some of the prescriptions have a schedule
+expression. The check is also timed in the middle of the night with every customer having quiet hours: the first
+check holds every due reminder back, later ones skip them until the quiet hours end.
+
+Run from the Sprint folder:
+    python -m benchmarks.bench_schedule                           # default sizes, compared against baseline.json
+    python -m benchmarks.bench_schedule --sizes 1000x5000         # customers x prescriptions
+    python -m benchmarks.bench_schedule --update-baseline
+"""
+
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import src.Clock as Clock
+import src.Notification as Notification
+import src.QuietHours as QuietHours
+import src.Schedule as Schedule
+from benchmarks.common import timed, finish
+from benchmarks.population import make_database, populate, SCHEDULES
+
+DEFAULT_SIZES = ((1000, 5000), (10000, 50000))
+SCHEDULE_SHARE = 0.5
+CALLS = 100_000
+NOW = datetime(2024, 4, 5, 12, 0)
+NIGHT = datetime(2024, 4, 6, 3, 0)
+QUIET_HOURS = "10pm-7am"
+
+
+def parse_sizes(argv: list[str]) -> tuple:
+    if "--sizes" not in argv:
+        return DEFAULT_SIZES
+    text = argv[argv.index("--sizes") + 1]
+    return tuple(tuple(int(part) for part in size.split("x")) for size in text.split(","))
+
+
+def per_call(func, calls: int) -> float:
+    """Average seconds per call of func() over the given number of calls (best of 3 rounds)."""
+    def run():
+        for _ in range(calls):
+            func()
+    return timed(run, repeat=3)[0] / calls
+
+
+def bench_next_after(schedule) -> float:
+    """Average seconds per next_after call, stepping through a week of moments."""
+    moments = [NOW + timedelta(seconds=idx * 6053) for idx in range(100)]
+
+    def run():
+        for _ in range(CALLS // len(moments)):
+            for moment in moments:
+                schedule.next_after(moment)
+    return timed(run, repeat=3)[0] / CALLS
+
+
+def timed_checks(database, now: datetime) -> tuple:
+    """(seconds of the first check, seconds of a repeated check, prescriptions due) at the given time."""
+    previous_clock = Clock.set_clock(Clock.VirtualClock(now))
+    try:
+        # The first check also logs the doses missed so far, later ones find them already logged
+        first_s, due = timed(Notification.check, database)
+        repeat_s, _ = timed(Notification.check, database, repeat=3)
+    finally:
+        Clock.set_clock(previous_clock)
+    return first_s, repeat_s, due
+
+
+def bench_size(customer_count: int, prescription_count: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        database = make_database(directory)
+        customer_IDs = populate(database, customer_count, prescription_count, now=NOW,
+                                schedule_share=SCHEDULE_SHARE)
+        scheduled = sum(1 for p in database.prescriptions if p.schedule)
+        first_s, repeat_s, due = timed_checks(database, NOW)
+
+        windows = QuietHours.parse(QUIET_HOURS)
+        for customer_ID in customer_IDs:
+            database.set_quiet_hours(customer_ID, windows)
+        quiet_first_s, quiet_repeat_s, quiet_due = timed_checks(database, NIGHT)
+        held_back = sum(1 for p in database.prescriptions if p.deferred_until is not None)
+        database.close()
+
+    return {
+        "scheduled_prescriptions": scheduled,
+        "due": len(due),
+        "notification_check_first_s": first_s,
+        "notification_check_s": repeat_s,
+        "quiet_hours": {
+            "due": len(quiet_due),
+            "held_back": held_back,
+            "notification_check_first_s": quiet_first_s,
+            "notification_check_s": quiet_repeat_s,
+        },
+    }
+
+
+def main(argv: list[str]):
+    results = {
+        # Parsing from scratch, and the cached lookup every later use of the same expression costs
+        "compile_uncached_per_call_s": per_call(
+            lambda: Schedule.compile_schedule.__wrapped__("mon, wed, fri 7:30am, 12pm, 5:30pm, 10pm"), CALLS // 10),
+        "compile_cached_per_call_s": per_call(lambda: Schedule.compile_schedule("8am, 2pm, 8pm"), CALLS),
+        "next_after_interval_per_call_s": bench_next_after(Schedule.compile_schedule("every 8 hours")),
+    }
+    quiet_hours = QuietHours.compile_windows(QuietHours.parse("10pm-7am, 1pm-2pm"))
+    results["quiet_hours_lookup_per_call_s"] = per_call(lambda: quiet_hours.end_of_window(NIGHT), CALLS)
+    results["next_after_weekly"] = {
+        expression: {"per_call_s": bench_next_after(Schedule.compile_schedule(expression))}
+        for expression, _ in SCHEDULES
+    }
+
+    for customer_count, prescription_count in parse_sizes(argv):
+        print(f"Benchmarking {customer_count} customers, {prescription_count} prescriptions...")
+        results[f"{customer_count}x{prescription_count}"] = bench_size(customer_count, prescription_count)
+    finish("schedule", results, argv)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
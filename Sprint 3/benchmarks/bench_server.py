@@ -0,0 +1,238 @@
+"""
+Name: bench_server.py
+Description: Tests and benchmarks the local HTTP/JSON API (src/Server.py) over localhost.
+
+The server runs in its own process, on a generated database in a temporary folder, so the clients do not share
+its core. Two parts:
+    1. Checks: clients walk through every route (login, adding, reading, editing, taking, snoozing and deleting
+       a prescription, logging out) and the error cases (wrong password, throttling, another user's
+       prescription, invalid records, unknown routes). Any unexpected response fails the run.
+    2. Load: `--connections` clients, each logged in as a different customer and keeping its connection open,
+       send a mix of requests (mostly reads, plus taken and snooze) for DURATION_S seconds. Reports requests
+       per second and latency percentiles.
+
+Run from the Sprint folder:
+    python -m benchmarks.bench_server                       # compared against baseline.json
+    python -m benchmarks.bench_server --connections 200
+    python -m benchmarks.bench_server --update-baseline
+"""
+
+import asyncio
+import json
+import multiprocessing
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.common import finish
+from benchmarks.population import password_of, DEFAULT_SEED
+
+CUSTOMERS = 500
+PRESCRIPTIONS = 5000
+DEFAULT_CONNECTIONS = 100
+DURATION_S = 5.0
+STARTUP_TIMEOUT_S = 120
+
+RECORD = {
+    "drug_name": "Ibuprofen", "doctor_name": "Ieiri Shoko", "time_btwn_dose": 28800, "side_effects": "None",
+    "dosage": "200mg", "date_issued": "2024-04-05", "expiration_date": "2025-04-05",
+}
+
+
+def parse_count(argv: list[str], option: str, default: int) -> int:
+    if option not in argv:
+        return default
+    return int(argv[argv.index(option) + 1])
+
+
+def run_server(directory: str, started) -> None:
+    """Body of the server process: generates the database, then serves it until terminated.
+    Puts (port, usernames in customer order) on the started queue once it is listening."""
+    import src.Password as Password
+    from src.Server import Server
+    from src.Service import Service
+    from benchmarks.population import make_database, populate
+
+    # Logins would otherwise rehash every password with the real policy (timed in bench_auth)
+    Password.set_policy(Password.FAST_POLICY)
+    database = make_database(directory)
+    populate(database, CUSTOMERS, PRESCRIPTIONS)
+    database.save_all()
+
+    async def serve():
+        server = Server(Service(database), port=0)
+        port = await server.start()
+        started.put((port, [customer.username for customer in database.customers]))
+        await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.token = None
+        self.reader = None
+        self.writer = None
+
+    async def connect(self) -> "Client":
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        return self
+
+    async def request(self, method: str, path: str, body=None) -> tuple:
+        """Returns (status, decoded JSON body, headers with lowercase names)."""
+        data = b"" if body is None else json.dumps(body).encode("utf-8")
+        head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n"
+        if self.token:
+            head += f"Authorization: Bearer {self.token}\r\n"
+        self.writer.write((head + "\r\n").encode("latin-1") + data)
+
+        lines = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ")[1])
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        payload = json.loads(await self.reader.readexactly(int(headers["content-length"])))
+        return status, payload, headers
+
+    async def expect(self, status: int, method: str, path: str, body=None):
+        actual, payload, headers = await self.request(method, path, body)
+        if actual != status:
+            raise AssertionError(f"{method} {path} returned {actual} instead of {status}: {payload}")
+        return payload
+
+    async def login(self, username: str, password: str) -> dict:
+        payload = await self.expect(200, "POST", "/login", {"username": username, "password": password})
+        self.token = payload["token"]
+        return payload
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+async def check_routes(port: int, usernames: list[str]) -> None:
+    """Walks through every route and error case."""
+    client = await Client(port).connect()
+    other = await Client(port).connect()
+
+    await client.expect(401, "POST", "/login", {"username": usernames[0], "password": "wrong-password1"})
+    await client.expect(401, "GET", "/prescriptions")
+    await client.expect(404, "GET", "/nothing-here")
+    await client.expect(405, "PUT", "/prescriptions")
+    await client.login(usernames[0], password_of(0))
+    await other.login(usernames[1], password_of(1))
+
+    before = await client.expect(200, "GET", "/prescriptions")
+    added = await client.expect(201, "POST", "/prescriptions", RECORD)
+    path = f"/prescriptions/{added['ID']}"
+    assert len(await client.expect(200, "GET", "/prescriptions")) == len(before) + 1
+    assert (await client.expect(200, "GET", path))["drug_name"] == "Ibuprofen"
+
+    edited = await client.expect(200, "PATCH", path, {"schedule": "8am, 8pm", "dosage": "400mg"})
+    assert edited["schedule"] == "8am, 8pm" and edited["dosage"] == "400mg" and edited["time_btwn_dose"] == 43200
+    invalid = await client.expect(400, "PATCH", path, {"expiration_date": "2025-02-30"})
+    assert invalid["errors"][0]["field"] == "expiration_date"
+    await client.expect(400, "POST", "/prescriptions", dict(RECORD, time_btwn_dose="eight hours"))
+    for body in (None, [1]):  # No body, or not an object
+        await client.expect(400, "PATCH", path, body)
+        await client.expect(400, "POST", "/prescriptions", body)
+
+    assert (await client.expect(200, "POST", f"{path}/taken"))["was_taken"] is not None
+    assert (await client.expect(200, "POST", f"{path}/snooze"))["snooze"] is not None
+    assert isinstance(await client.expect(200, "GET", "/prescriptions/due"), list)
+
+    # Another user cannot see or change it
+    for method, suffix in (("GET", ""), ("PATCH", ""), ("DELETE", ""), ("POST", "/taken"), ("POST", "/snooze")):
+        await other.expect(404, method, path + suffix, {} if method == "PATCH" else None)
+
+    await client.expect(200, "DELETE", path)
+    await client.expect(404, "GET", path)
+    await client.expect(200, "POST", "/logout")
+    await client.expect(401, "GET", "/prescriptions")
+
+    # Throttling, on a fresh connection to show it is per username and not per connection
+    throttled = await Client(port).connect()
+    statuses = [(await throttled.request("POST", "/login", {"username": usernames[2], "password": "wrong1"}))[0]
+                for _ in range(6)]
+    assert statuses == [401] * 5 + [429], statuses
+    status, _, headers = await throttled.request("POST", "/login", {"username": usernames[2],
+                                                                     "password": password_of(2)})
+    assert status == 429 and int(headers["retry-after"]) > 0
+
+    for connection in (client, other, throttled):
+        connection.close()
+
+
+async def load(port: int, usernames: list[str], connections: int) -> dict:
+    """Keeps every connection busy for DURATION_S seconds. Returns the request rate and latencies."""
+    clients = []
+    for idx in range(3, 3 + connections):
+        client = await Client(port).connect()
+        await client.login(usernames[idx], password_of(idx))
+        client.prescriptions = [p["ID"] for p in await client.expect(200, "GET", "/prescriptions")]
+        clients.append(client)
+
+    latencies = []
+    deadline = time.perf_counter() + DURATION_S
+
+    async def run(client: Client, rng: random.Random):
+        while time.perf_counter() < deadline:
+            chance = rng.random()
+            if chance < 0.4 or not client.prescriptions:
+                method, path = "GET", "/prescriptions"
+            elif chance < 0.7:
+                method, path = "GET", f"/prescriptions/{rng.choice(client.prescriptions)}"
+            elif chance < 0.8:
+                method, path = "GET", "/prescriptions/due"
+            elif chance < 0.9:
+                method, path = "POST", f"/prescriptions/{rng.choice(client.prescriptions)}/taken"
+            else:
+                method, path = "POST", f"/prescriptions/{rng.choice(client.prescriptions)}/snooze"
+            start = time.perf_counter()
+            await client.expect(200, method, path)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(client, random.Random(DEFAULT_SEED + idx)) for idx, client in enumerate(clients)))
+    seconds = time.perf_counter() - start
+    for client in clients:
+        client.close()
+
+    latencies.sort()
+    return {
+        "connections": connections,
+        "requests": len(latencies),
+        "requests_per_second": len(latencies) / seconds,
+        "p50_latency_s": latencies[len(latencies) // 2],
+        "p99_latency_s": latencies[int(len(latencies) * 0.99)],
+    }
+
+
+def main(argv: list[str]):
+    connections = parse_count(argv, "--connections", DEFAULT_CONNECTIONS)
+    if connections + 3 > CUSTOMERS:
+        raise SystemExit(f"At most {CUSTOMERS - 3} connections")
+
+    with tempfile.TemporaryDirectory() as directory:
+        started = multiprocessing.Queue()
+        server = multiprocessing.Process(target=run_server, args=(directory, started), daemon=True)
+        server.start()
+        try:
+            port, usernames = started.get(timeout=STARTUP_TIMEOUT_S)
+            print("Checking routes...")
+            asyncio.run(check_routes(port, usernames))
+            print(f"Loading the server with {connections} connections for {DURATION_S}s...")
+            results = {"load": asyncio.run(load(port, usernames, connections))}
+        finally:
+            server.terminate()
+            server.join()
+    finish("server", results, argv)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,56 @@
+"""
+Name: bench_startup.py
+Description: Measures how long the main window takes to appear (time to first paint) and how long until its
+             buttons can be used (time to interactive, i.e. once the background database load finished).
+
+Run from the Sprint folder with a display available:
+    python -m benchmarks.bench_startup [runs]
+The database files in the current folder are used, so point it at a folder with a large database to see how
+startup scales.
+"""
+
+import sys
+import time
+
+try:
+    from tkinter import Tk
+except ImportError:
+    from Tkinter import Tk
+
+from src.App import App
+from benchmarks.common import write_results
+
+TIMEOUT_S = 120
+
+
+def measure_once() -> dict:
+    """Starts the app, waits until it becomes interactive, then closes it and returns its startup times."""
+    root = Tk()
+    app = App(root)
+    give_up_at = time.perf_counter() + TIMEOUT_S
+
+    def wait_for_interactive():
+        if "interactive" in app.startup_times or time.perf_counter() > give_up_at:
+            root.destroy()
+        else:
+            root.after(10, wait_for_interactive)
+
+    root.after(10, wait_for_interactive)
+    root.mainloop()
+    return dict(app.startup_times)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    samples = [measure_once() for _ in range(runs)]
+
+    results = {}
+    for key in ("first_paint", "interactive"):
+        values = sorted(sample[key] for sample in samples if key in sample)
+        if values:
+            results[f"{key}_s"] = {"best": values[0], "median": values[len(values) // 2], "runs": len(values)}
+    write_results("startup", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Name: bench_validation.py
+Description: Fuzz tests and benchmarks the email and password rules (src/Rules.py) behind the Validator checks.
+
+Four parts:
+    1. Fuzzing: random strings and mangled email addresses are run through both the rules and the regular
+       expressions the Validator used before them. Any input they disagree on fails the run. Emails longer than
+       Rules.MAX_EMAIL_LENGTH are left out, since rejecting those is new.
+    2. Adversarial inputs: long strings built to make a backtracking regular expression work as hard as
+       possible, at growing lengths. Every rule must take roughly linear time, so quadrupling the length of an
+       input may not make it take more than MAX_GROWTH times longer. The email cases time Rules.EMAIL_PATTERN
+       directly, as Rules.valid_email would turn them down by length alone. The old expressions are timed on
+       shorter inputs for comparison.
+    3. Typical inputs: the time per check of an ordinary email and password.
+    4. Batches: src/BatchValidator.py checking generated customer and prescription records against a database
+       of existing customers. A few records of each batch are broken in some way.
+
+Run from the Sprint folder:
+    python -m benchmarks.bench_validation                       # compared against baseline.json
+    python -m benchmarks.bench_validation --fuzz 100000         # number of fuzzed inputs per rule
+    python -m benchmarks.bench_validation --batch 1000000       # number of records per batch
+    python -m benchmarks.bench_validation --update-baseline
+"""
+
+import random
+import re
+import string
+import sys
+import tempfile
+from collections import Counter
+
+import src.Rules as Rules
+from src.BatchValidator import BatchValidator
+from benchmarks.common import timed, finish
+from benchmarks.population import make_database, populate, DEFAULT_SEED
+
+DEFAULT_FUZZ = 20_000
+SIZES = (4_000, 16_000, 64_000, 256_000)  # x4 each step
+LEGACY_SIZES = (1_000, 2_000, 4_000)  # The old password expression is quadratic, longer inputs take minutes
+MAX_GROWTH = 8  # Linear is x4 per step, quadratic x16
+DEFAULT_BATCH = 200_000
+EXISTING_CUSTOMERS = 10_000
+
+# The expressions used by Validator before Rules.py, kept here as the reference behaviour
+LEGACY_EMAIL_REGEX = r"[a-zA-Z0-9!#\$%&'\*\+-/=\?\^_`\{\|\}~\.]+@[a-zA-Z0-9\-]+\.[a-zA-Z\.]+"
+LEGACY_EIGHT_CHARS_REGEX = ".{8,}"
+LEGACY_LETTERS_THEN_NUM_REGEX = ".*[0-9].*[a-zA-Z].*"
+LEGACY_NUM_THEN_LETTERS_REGEX = ".*[a-zA-Z].*[0-9].*"
+
+# Characters that mean something to one of the rules, plus a few that must not be mistaken for letters or digits
+ALPHABET = string.ascii_letters + string.digits + "@.-_+!#$%&'*/=?^`{|}~,\n \t\"()[]\\éß٣²"
+
+
+def legacy_valid_email(email: str) -> bool:
+    return re.fullmatch(LEGACY_EMAIL_REGEX, email) is not None
+
+
+def legacy_password_long_enough(password: str) -> bool:
+    return re.fullmatch(LEGACY_EIGHT_CHARS_REGEX, password) is not None
+
+
+def legacy_password_has_letters_and_numbers(password: str) -> bool:
+    return (re.fullmatch(LEGACY_LETTERS_THEN_NUM_REGEX, password) is not None) or \
+        (re.fullmatch(LEGACY_NUM_THEN_LETTERS_REGEX, password) is not None)
+
+
+PAIRS = (
+    ("valid_email", Rules.valid_email, legacy_valid_email),
+    ("password_long_enough", Rules.password_long_enough, legacy_password_long_enough),
+    ("password_has_letters_and_numbers", Rules.password_has_letters_and_numbers,
+     legacy_password_has_letters_and_numbers),
+)
+
+
+def email_pattern_matches(email: str) -> bool:
+    """Rules.EMAIL_PATTERN on its own. Rules.valid_email rejects anything longer than Rules.MAX_EMAIL_LENGTH
+    before matching, so timing it on long inputs would only time len()."""
+    return Rules.EMAIL_PATTERN.fullmatch(email) is not None
+
+
+# name -> (rule, function building an adversarial input of about the given length)
+ADVERSARIAL = {
+    "password_letters_only": (Rules.password_has_letters_and_numbers, lambda n: "a" * n),
+    "password_digits_then_newline": (Rules.password_has_letters_and_numbers, lambda n: "1" * n + "\n"),
+    "password_length_newline_at_end": (Rules.password_long_enough, lambda n: "a" * n + "\n"),
+    "email_no_at": (email_pattern_matches, lambda n: "a" * n),
+    "email_no_domain": (email_pattern_matches, lambda n: "a" * n + "@"),
+    "email_dots_then_bad_char": (email_pattern_matches, lambda n: "a@b." + "." * n + "!"),
+}
+LEGACY_ADVERSARIAL = {
+    "password_letters_only": (legacy_password_has_letters_and_numbers, lambda n: "a" * n),
+    "email_no_domain": (legacy_valid_email, lambda n: "a" * n + "@"),
+}
+
+
+def parse_count(argv: list[str], option: str, default: int) -> int:
+    if option not in argv:
+        return default
+    return int(argv[argv.index(option) + 1])
+
+
+def random_text(rng: random.Random) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randrange(0, 40)))
+
+
+def mangled_email(rng: random.Random) -> str:
+    """A valid looking address with a few random characters replaced, added or removed."""
+    local = "".join(rng.choice(string.ascii_letters + string.digits + "._+-") for _ in range(rng.randrange(1, 15)))
+    domain = "".join(rng.choice(string.ascii_lowercase + "-") for _ in range(rng.randrange(1, 10)))
+    email = list(f"{local}@{domain}.{rng.choice(('com', 'edu', 'co.uk', 'org'))}")
+    for _ in range(rng.randrange(0, 3)):
+        position = rng.randrange(len(email) + 1)
+        action = rng.randrange(3)
+        if action == 0:
+            email.insert(position, rng.choice(ALPHABET))
+        elif position < len(email):
+            if action == 1:
+                email[position] = rng.choice(ALPHABET)
+            else:
+                del email[position]
+    return "".join(email)
+
+
+def fuzz(count: int) -> dict:
+    """Checks that the rules and the old expressions agree on count random inputs per rule."""
+    rng = random.Random(DEFAULT_SEED)
+    results = {}
+    for name, rule, legacy in PAIRS:
+        accepted = 0
+        for idx in range(count):
+            text = mangled_email(rng) if (name == "valid_email" and idx % 2) else random_text(rng)
+            expected = legacy(text)
+            if rule(text) != expected:
+                raise AssertionError(f"Rules.{name} disagrees with the old expression on {text!r}")
+            accepted += expected
+        results[name] = {"inputs": count, "accepted": accepted}
+
+    # Emails of every length around the limit
+    for length in range(Rules.MAX_EMAIL_LENGTH - 5, Rules.MAX_EMAIL_LENGTH + 5):
+        email = "a" * (length - len("@example.com")) + "@example.com"
+        assert Rules.valid_email(email) == (length <= Rules.MAX_EMAIL_LENGTH)
+    return results
+
+
+def time_per_call(rule, text: str, characters: int = 1_000_000) -> float:
+    """Average seconds per call, over enough calls to cover about the given number of characters."""
+    calls = max(1, characters // len(text))
+    return timed(lambda: [rule(text) for _ in range(calls)], repeat=3)[0] / calls
+
+
+def bench_adversarial(cases: dict, sizes: tuple, check_growth: bool, characters: int = 1_000_000) -> dict:
+    results = {}
+    for name, (rule, make_input) in cases.items():
+        seconds = [time_per_call(rule, make_input(size), characters) for size in sizes]
+        results[name] = {f"{size}_chars_per_call_s": value for size, value in zip(sizes, seconds)}
+        growth = max(later / earlier for earlier, later in zip(seconds, seconds[1:]))
+        results[name]["worst_growth"] = growth
+        if check_growth and growth > MAX_GROWTH:
+            raise AssertionError(f"{name} grew x{growth:.1f} when the input got x4 longer")
+    return results
+
+
+def customer_records(count: int, existing: list[str], rng: random.Random):
+    """Candidate customers. About one in fifty reuses an existing username and one in fifty has a bad email."""
+    for idx in range(count):
+        broken = rng.randrange(100)
+        yield {
+            "first_name": "Yuji", "last_name": "Itadori",
+            "username": rng.choice(existing) if broken < 2 else f"import{idx}",
+            "password": f"sukuna{idx}",
+            "email": "no at sign" if 2 <= broken < 4 else f"import{idx}@example.com",
+            "phone_number": "5551234567",
+        }
+
+
+def prescription_records(count: int, owners: list[str], rng: random.Random):
+    """Candidate prescriptions of existing customers. About one in fifty has a bad date, one in fifty a schedule."""
+    for idx in range(count):
+        broken = rng.randrange(100)
+        yield {
+            "owner_username": rng.choice(owners),
+            "drug_name": "Ibuprofen", "doctor_name": "Ieiri Shoko",
+            "time_btwn_dose": "" if broken >= 98 else "28800",
+            "schedule": "8am, 8pm" if broken >= 98 else "",
+            "side_effects": "None reported.", "dosage": "200mg",
+            "date_issued": "2024-13-01" if broken < 2 else "2024-04-05",
+            "expiration_date": "2025-04-05",
+        }
+
+
+def bench_batches(count: int) -> dict:
+    rng = random.Random(DEFAULT_SEED)
+    with tempfile.TemporaryDirectory() as directory:
+        database = make_database(directory)
+        customer_IDs = populate(database, EXISTING_CUSTOMERS, 0)
+    owners = [database.get_customer_by_ID(ID).username for ID in customer_IDs]
+
+    results = {}
+    for name, records in (("customers", list(customer_records(count, owners, rng))),
+                          ("prescriptions", list(prescription_records(count, owners, rng)))):
+        def run():
+            return Counter(error.code for result in getattr(BatchValidator(database), name)(records)
+                           for error in result.errors)
+        seconds, error_counts = timed(run, repeat=3)
+        results[name] = {
+            "records": count,
+            "validate_s": seconds,
+            "records_per_minute": count / seconds * 60,
+            "errors": dict(error_counts),
+        }
+    return results
+
+
+def main(argv: list[str]):
+    print("Fuzzing...")
+    results = {"fuzz": fuzz(parse_count(argv, "--fuzz", DEFAULT_FUZZ))}
+
+    print("Timing adversarial inputs...")
+    results["adversarial"] = bench_adversarial(ADVERSARIAL, SIZES, check_growth=True)
+    results["adversarial_legacy"] = bench_adversarial(LEGACY_ADVERSARIAL, LEGACY_SIZES, check_growth=False,
+                                                       characters=20_000)
+
+    results["typical"] = {
+        "valid_email_per_call_s": time_per_call(Rules.valid_email, "satorugojo@jjhs.edu"),
+        "password_long_enough_per_call_s": time_per_call(Rules.password_long_enough, "hollow&purple1989"),
+        "password_has_letters_and_numbers_per_call_s": time_per_call(
+            Rules.password_has_letters_and_numbers, "hollow&purple1989"),
+        "legacy_password_per_call_s": time_per_call(
+            lambda text: legacy_password_long_enough(text) and legacy_password_has_letters_and_numbers(text),
+            "hollow&purple1989"),
+    }
+
+    print("Validating batches...")
+    results["batch"] = bench_batches(parse_count(argv, "--batch", DEFAULT_BATCH))
+    finish("validation", results, argv)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,132 @@
+"""
+Name: common.py
+Description: Helpers shared by the benchmark scripts in this folder.
+
+Every benchmark is run from the Sprint folder (so that ./assets and the src package resolve), e.g.
+    python -m benchmarks.bench_startup
+Results are printed and also written as JSON to benchmarks/results/<benchmark name>.json.
+
+Benchmarks that support it compare their timings against benchmarks/baseline.json. Every numeric result
+whose key ends in "_s" (seconds) is compared, and one that is more than `tolerance` times slower than the
+baseline is reported as a regression.
+
+Reference timings of the old way of doing something, kept to show what a change gained, have a key (or an
+enclosing key) starting with "legacy". They are stored in the baseline and printed next to it, but never
+reported as a regression, since they do not time the program's current code.
+"""
+
+import json
+import os
+import platform
+import sys
+import time
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_TOLERANCE = 1.5
+REFERENCE_PREFIX = "legacy"
+
+
+def timed(func, *args, repeat=1, **kwargs) -> tuple:
+    """Runs func repeat times and returns (best time in seconds, last return value)."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def write_results(name: str, results: dict, path: str = None) -> str:
+    """Prints the results and writes them to a JSON file. Returns the path of the file."""
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{name}.json")
+
+    document = {
+        "benchmark": name,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    with open(path, "w") as file:
+        json.dump(document, file, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {path}")
+    return path
+
+
+def flatten_timings(results: dict, prefix: str = "") -> dict:
+    """Turns nested results into {"outer.inner.metric_s": seconds} for every timing in them."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_timings(value, name + "."))
+        elif key.endswith("_s") and isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def load_baseline(name: str, path: str = BASELINE_PATH) -> dict:
+    """Returns the stored baseline timings of one benchmark, or an empty dict if there are none."""
+    try:
+        with open(path) as file:
+            return json.load(file).get(name, {})
+    except (OSError, ValueError):
+        return {}
+
+
+def update_baseline(name: str, results: dict, path: str = BASELINE_PATH) -> None:
+    """Stores the timings of the given results as the new baseline of one benchmark."""
+    try:
+        with open(path) as file:
+            baseline = json.load(file)
+    except (OSError, ValueError):
+        baseline = {}
+
+    baseline[name] = flatten_timings(results)
+    with open(path, "w") as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+    print(f"Baseline for {name} updated in {path}")
+
+
+def is_reference(metric: str) -> bool:
+    """Whether a flattened metric name is a reference timing of old code (see the top of this file)."""
+    return any(part.startswith(REFERENCE_PREFIX) for part in metric.split("."))
+
+
+def compare_to_baseline(name: str, results: dict, tolerance: float = DEFAULT_TOLERANCE,
+                        path: str = BASELINE_PATH) -> list[str]:
+    """Prints how each timing compares to the baseline. Returns the names of the timings that regressed."""
+    baseline = load_baseline(name, path)
+    if not baseline:
+        print(f"No baseline stored for {name}. Run with --update-baseline to create one.")
+        return []
+
+    regressions = []
+    for metric, seconds in sorted(flatten_timings(results).items()):
+        if metric not in baseline or baseline[metric] <= 0:
+            continue
+        ratio = seconds / baseline[metric]
+        flag = ""
+        if is_reference(metric):
+            flag = "  (reference)"
+        elif ratio > tolerance:
+            flag = "  <-- REGRESSION"
+            regressions.append(metric)
+        print(f"{metric:60} {seconds * 1000:12.3f}ms  x{ratio:5.2f} of baseline{flag}")
+    return regressions
+
+
+def finish(name: str, results: dict, argv: list[str], tolerance: float = DEFAULT_TOLERANCE) -> None:
+    """Shared ending of benchmarks that keep a baseline. Writes the results, then either stores them as the new
+    baseline (--update-baseline) or compares against the old one and exits with status 1 on a regression."""
+    write_results(name, results)
+    if "--update-baseline" in argv:
+        update_baseline(name, results)
+    elif compare_to_baseline(name, results, tolerance):
+        sys.exit(1)
@@ -0,0 +1,147 @@
+"""
+Name: population.py
+Description: Deterministic generator of synthetic customers and prescriptions for benchmarks and simulations.
+
+The same seed always produces the same population (names, intervals, dates, owners), though the IDs of the
+generated objects are random UUIDs like everywhere else in the program.
+
+Distributions:
+    * Drug names follow a Zipf-like popularity curve, so a few drugs are very common and most are rare.
+    * Most prescriptions are taken every 8, 12 or 24 hours. A few are every 4 or 6 hours, or weekly.
+    * Prescriptions per customer are skewed: most customers have a handful, a few have many.
+    * Issue dates fall in the last two years and prescriptions expire 6 to 24 months after being issued.
+    * Each dose was last taken somewhere between 0 and 1.25 intervals ago, so roughly a fifth are overdue.
+    * Passwords are hashed with Password.FAST_POLICY, since real hashing would make generating thousands of
+      customers take minutes.
+    * Optionally, a share of prescriptions get a times-of-day schedule (see src/Schedule.py) instead of an
+      interval. Those are drawn from a separate random stream, so the rest of the population stays the same.
+"""
+
+import os
+import random
+from datetime import datetime, timedelta
+
+import src.Password as Password
+from src.Database import Database
+
+DRUG_NAMES = (
+    "Lisinopril", "Atorvastatin", "Levothyroxine", "Metformin", "Amlodipine", "Metoprolol", "Omeprazole",
+    "Simvastatin", "Losartan", "Albuterol", "Gabapentin", "Hydrochlorothiazide", "Sertraline", "Furosemide",
+    "Acetaminophen", "Fluticasone", "Amoxicillin", "Escitalopram", "Montelukast", "Rosuvastatin", "Bupropion",
+    "Pantoprazole", "Trazodone", "Prednisone", "Tamsulosin", "Meloxicam", "Clopidogrel", "Citalopram",
+    "Carvedilol", "Insulin Glargine", "Warfarin", "Duloxetine", "Ibuprofen", "Pravastatin", "Tramadol",
+    "Fluoxetine", "Venlafaxine", "Cetirizine", "Zolpidem", "Allopurinol", "Spironolactone", "Glipizide",
+    "Propranolol", "Cyclobenzaprine", "Lamotrigine", "Loratadine", "Topiramate", "Famotidine", "Apixaban",
+    "Clonazepam",
+)
+DRUG_WEIGHTS = tuple(1 / (rank + 1) for rank in range(len(DRUG_NAMES)))
+
+DOCTOR_NAMES = (
+    "Ieiri Shoko", "Gege Akutami", "Meredith Grey", "Gregory House", "John Dorian", "Stephen Strange",
+    "Leonard McCoy", "Beverly Crusher", "Julius Hibbert", "Elliot Reid", "Miranda Bailey", "Doogie Howser",
+)
+
+HOUR = 3600
+# (seconds between doses, relative frequency)
+INTERVALS = ((4 * HOUR, 3), (6 * HOUR, 5), (8 * HOUR, 20), (12 * HOUR, 30), (24 * HOUR, 35), (7 * 24 * HOUR, 7))
+
+# (schedule expression, relative frequency)
+SCHEDULES = (("8am", 30), ("8am, 8pm", 30), ("8am, 2pm, 8pm", 15), ("weekdays 9:00", 10),
+             ("mon, wed, fri 9am, 9pm", 5), ("7:30am, 12pm, 5:30pm, 10pm", 10))
+
+DOSAGES = ("5mg", "10mg", "20mg", "25mg", "40mg", "50mg", "100mg", "250mg", "500mg", "1000mg")
+SIDE_EFFECTS = ("None reported.", "Drowsiness.", "Nausea.", "Headache.", "Dizziness.", "Dry mouth.")
+
+FIRST_NAMES = ("Satoru", "Megumi", "Yuji", "Nobara", "Maki", "Toge", "Panda", "Kento", "Yuta", "Suguru")
+LAST_NAMES = ("Gojo", "Fushiguro", "Itadori", "Kugisaki", "Zenin", "Inumaki", "Nanami", "Okkotsu", "Geto")
+
+DEFAULT_SEED = 355
+
+
+def make_database(directory: str) -> Database:
+    """Returns an empty Database whose files all live inside the given directory."""
+    database = Database()
+    database.CUSTOMER_FILE_NAME = os.path.join(directory, "customers.pkl")
+    database.PRESCRIPTION_FILE_NAME = os.path.join(directory, "prescriptions.pkl")
+    database.PRESCRIPTION_DIR_NAME = os.path.join(directory, "prescriptions")
+    database.DOSE_LOG_FILE_NAME = os.path.join(directory, "dose_log.bin")
+    return database
+
+
+def password_of(idx: int) -> str:
+    """Password of the idx-th customer made by populate()."""
+    return f"password{idx}"
+
+
+def populate(database: Database, customer_count: int, prescription_count: int,
+             seed: int = DEFAULT_SEED, now: datetime = None, schedule_share: float = 0.0) -> list[str]:
+    """Adds customer_count customers and prescription_count prescriptions to the database.
+    About schedule_share of the prescriptions get a schedule expression instead of a plain interval.
+    All generated shards are kept in memory (MAX_RESIDENT_SHARDS is raised if needed). They are added with
+    Database.add_prescriptions(), which also saves them, before the last dose times are set. Save them again to
+    keep those.
+    Returns the IDs of the new customers in creation order."""
+    rng = random.Random(seed)
+    if now is None:
+        now = datetime.now()
+
+    database.MAX_RESIDENT_SHARDS = max(database.MAX_RESIDENT_SHARDS, customer_count + len(database.customers))
+
+    customer_IDs = []
+    previous_policy = Password.set_policy(Password.FAST_POLICY)
+    try:
+        for idx in range(customer_count):
+            first_name = rng.choice(FIRST_NAMES)
+            last_name = rng.choice(LAST_NAMES)
+            username = f"{first_name.lower()}{idx}"
+            customer_IDs.append(database.add_customer(
+                first_name, last_name, username, password_of(idx),
+                f"{username}@example.com", f"555{rng.randrange(10 ** 7):07d}"
+            ))
+    finally:
+        Password.set_policy(previous_policy)
+
+    # Skewed ownership: customer weight falls off with a random rank so a few customers own many prescriptions
+    owner_weights = [1 / (rng.random() * 9 + 1) ** 2 for _ in customer_IDs]
+    owners = rng.choices(customer_IDs, weights=owner_weights, k=prescription_count) if customer_IDs else []
+
+    interval_values = [interval for interval, weight in INTERVALS]
+    interval_weights = [weight for interval, weight in INTERVALS]
+    schedule_rng = random.Random(seed + 1)
+    schedule_values = [expression for expression, weight in SCHEDULES]
+    schedule_weights = [weight for expression, weight in SCHEDULES]
+
+    rows = []
+    taken_shares = []  # How many intervals ago each dose was last taken
+    for owner_ID in owners:
+        interval = rng.choices(interval_values, weights=interval_weights)[0]
+        issued = now - timedelta(days=rng.randrange(730))
+        expires = issued + timedelta(days=rng.randrange(182, 731))
+        schedule = None
+        if schedule_share and schedule_rng.random() < schedule_share:
+            schedule = schedule_rng.choices(schedule_values, weights=schedule_weights)[0]
+
+        rows.append({
+            "owner_ID": owner_ID,
+            "drug_name": rng.choices(DRUG_NAMES, weights=DRUG_WEIGHTS)[0],
+            "doctor_name": rng.choice(DOCTOR_NAMES),
+            "time_btwn_dose": interval,
+            "side_effects": rng.choice(SIDE_EFFECTS),
+            "dosage": rng.choice(DOSAGES),
+            "date_issued_year": issued.year, "date_issued_month": issued.month, "date_issued_day": issued.day,
+            "expiration_date_year": expires.year, "expiration_date_month": expires.month,
+            "expiration_date_day": expires.day,
+            "schedule": schedule,
+        })
+        taken_shares.append(rng.random() * 1.25)
+
+    # Loaded first so that add_prescriptions() keeps them in memory. In order of each owner's last prescription,
+    # which is the order adding them one at a time would leave the shards in
+    for owner_ID in reversed(list(dict.fromkeys(reversed(owners)))):
+        database.load_shard(owner_ID)
+    for prescription_ID, taken_share in zip(database.add_prescriptions(rows), taken_shares):
+        prescription = database.get_prescription_by_ID(prescription_ID)
+        # Scheduled prescriptions use the average gap between their doses
+        prescription.was_taken = now - timedelta(seconds=taken_share * prescription.time_btwn_dose)
+
+    return customer_IDs
@@ -0,0 +1,123 @@
+"""
+Name: simulate.py
+Description: Time-travel simulation of medication reminders over a generated population.
+
+A VirtualClock replaces the system clock and is advanced one minute at a time, the same rate at which
+App.notification_bg_task runs. Every tick runs Notification.check. Each reminder it returns is recorded as
+fired and the simulated patient answers it right away: "Medication Taken" with probability --take, otherwise
+the toast is dismissed (snoozed). Notification.send is skipped since it only shows the toast.
+Doses the scheduler logs as missed are counted from the dose log afterwards.
+
+Run from the Sprint folder:
+    python -m benchmarks.simulate [--days 7] [--customers 100] [--prescriptions 500] [--take 0.8]
+                                  [--seed 355] [--events events.jsonl]
+Prints (and writes to benchmarks/results/simulation.json) the reminder counts and the scheduler cost.
+With --events every fired/taken/snoozed reminder is also written to a JSON-lines file.
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import src.Clock as Clock
+import src.DoseLog as DoseLog
+import src.Notification as Notification
+from benchmarks.common import write_results
+from benchmarks.population import make_database, populate
+
+TICK = timedelta(minutes=1)
+START = datetime(2024, 12, 2, 0, 0)  # Fixed so that runs with the same seed are identical
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--customers", type=int, default=100)
+    parser.add_argument("--prescriptions", type=int, default=500)
+    parser.add_argument("--take", type=float, default=0.8, help="chance a reminder is answered with 'taken'")
+    parser.add_argument("--seed", type=int, default=355)
+    parser.add_argument("--events", help="write every reminder event to this JSON-lines file")
+    return parser.parse_args()
+
+
+def simulate(database, days: float, take_chance: float, seed: int, clock: Clock.VirtualClock) -> tuple:
+    """Runs the simulation. Returns (summary dict, list of (time, event, prescription ID))."""
+    rng = random.Random(seed)
+    events = []
+    counts = {"fired": 0, "taken": 0, "snoozed": 0}
+    check_seconds = 0.0
+    action_seconds = 0.0
+    slowest_check = 0.0
+
+    ticks = int(timedelta(days=days) / TICK)
+    for _ in range(ticks):
+        now = clock.advance(TICK)
+
+        start = time.perf_counter()
+        due = Notification.check(database)
+        elapsed = time.perf_counter() - start
+        check_seconds += elapsed
+        slowest_check = max(slowest_check, elapsed)
+
+        start = time.perf_counter()
+        for prescription in due:
+            counts["fired"] += 1
+            events.append((now, "fired", prescription.ID))
+            if rng.random() < take_chance:
+                Notification._medication_taken_action(database, prescription)
+                counts["taken"] += 1
+                events.append((now, "taken", prescription.ID))
+            else:
+                Notification._snooze_action(database, prescription)
+                counts["snoozed"] += 1
+                events.append((now, "snoozed", prescription.ID))
+        action_seconds += time.perf_counter() - start
+
+    summary = dict(counts)
+    summary["missed"] = sum(1 for _, event, _ in database.dose_log.events() if event == DoseLog.MISSED)
+    summary["dose_log_bytes"] = len(database.dose_log) * DoseLog.RECORD_SIZE
+    summary.update({
+        "simulated_days": days,
+        "ticks": ticks,
+        "prescriptions": len(database.prescriptions),
+        "check_total_s": check_seconds,
+        "check_per_tick_s": check_seconds / max(ticks, 1),
+        "check_slowest_s": slowest_check,
+        "actions_total_s": action_seconds,
+    })
+    return summary, events
+
+
+def main():
+    args = parse_args()
+    clock = Clock.VirtualClock(START)
+    previous_clock = Clock.set_clock(clock)
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            database = make_database(directory)
+            populate(database, args.customers, args.prescriptions, seed=args.seed, now=START)
+
+            wall_start = time.perf_counter()
+            summary, events = simulate(database, args.days, args.take, args.seed, clock)
+            summary["wall_s"] = time.perf_counter() - wall_start
+            summary["speedup"] = timedelta(days=args.days).total_seconds() / max(summary["wall_s"], 1e-9)
+            database.close()
+    finally:
+        Clock.set_clock(previous_clock)
+
+    if args.events:
+        with open(args.events, "w") as file:
+            for moment, event, prescription_ID in events:
+                file.write(json.dumps({"time": moment.isoformat(), "event": event,
+                                       "prescription": prescription_ID}) + "\n")
+        print(f"{len(events)} events written to {args.events}")
+
+    write_results("simulation", summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,8 +12,10 @@ except ImportError:
     import ttk
 
 try:
+    from src.Resources import get_icon
     from src.Validator import Validator
 except ImportError:
+    from Resources import get_icon
     from Validator import Validator
 
 TITLE_FONT = ('Magneto', 24)  # Goofy font bc why not
@@ -79,8 +81,7 @@ class SignupWindow:
         self.root.resizable(width=True, height=True)
 
         # Window Logo
-        logo = tk.PhotoImage(file='./assets/medical_icon.png')
-        self.root.iconphoto(False, logo)
+        self.root.iconphoto(False, get_icon(self.root))
 
         # Event bindings
         self.root.bind("<KeyPress-Return>", self.click_create_account_button)
@@ -226,6 +227,7 @@ class SignupWindow:
                 self.account_data["phone_number"][2].get(),
             )
             self.current_user.set(result)
+            self.database.load_shard(result)  # New users start with an empty prescription shard
             self.database.save_customers()
             self.root.destroy()
 
@@ -285,8 +287,7 @@ class LoginWindow:
         self.root.resizable(width=True, height=True)
 
         # Window Logo
-        logo = tk.PhotoImage(file='./assets/medical_icon.png')
-        self.root.iconphoto(False, logo)
+        self.root.iconphoto(False, get_icon(self.root))
 
         # Event bindings
         self.root.bind("<KeyPress-Return>", self.click_login_button)
@@ -346,24 +347,26 @@ class LoginWindow:
         """Find user that matches username and password, then set them as active user.
         If issues arise, show an alert popup that explain what went wrong"""
 
-        # Run validation checks
+        # Run validation checks. Throttled attempts stop before the (slow on purpose) password check
         validator = Validator()
-        validator.check_username_exists(self.account_data["username"].get(), self.database)  # TC06
-        validator.check_username_password_match(self.account_data["username"].get(),
-                                                self.account_data["password"].get(), self.database)  # TC07
+        result = None
+        validator.check_login_not_throttled(self.account_data["username"].get(), self.database)
+        if validator.no_failures():
+            validator.check_username_exists(self.account_data["username"].get(), self.database)  # TC06
+            # The matching user is kept rather than looked up again, so the password is only hashed once
+            result = validator.check_username_password_match(self.account_data["username"].get(),
+                                                             self.account_data["password"].get(),
+                                                             self.database)  # TC07
 
         # Continue with login process if no validation failures occured
         if validator.no_failures():
-            # Get user date corresponding with username and password
-            result = self.database.get_customer_by_username_password(
-                self.account_data["username"].get(),
-                self.account_data["password"].get()
-            )
 
             # If somehow there is no valid user even after validation passed
             if result is None:
                 self.current_user.set("Error: No User Found")
             else:
+                self.database.login_limiter.forget(result.username)  # A full set of attempts for next time
+                self.database.load_shard(result.ID)  # Pull in this user's prescriptions only now that they're needed
                 self.current_user.set(result.ID)
 
             self.root.destroy()
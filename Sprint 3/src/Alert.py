@@ -11,6 +11,11 @@ except ImportError:
     import Tkinter as tk
     import ttk
 
+try:
+    from src.Resources import get_icon
+except ImportError:
+    from Resources import get_icon
+
 
 class AlertWindow:
     def __init__(self, message):
@@ -45,8 +50,7 @@ class AlertWindow:
         self.root.geometry('500x150')
 
         # Window Logo
-        logo = tk.PhotoImage(file='./assets/medical_icon.png')
-        self.root.iconphoto(False, logo)
+        self.root.iconphoto(False, get_icon(self.root))
 
     def init_main_frame(self):
         """Configure the main frame upon which sits most of the application"""
@@ -0,0 +1,277 @@
+"""
+Name: Analytics.py
+Description: Adherence statistics computed from the dose log (see DoseLog.py).
+
+The log is read straight into a NumPy structured array and every statistic is computed with whole-array
+operations (sorting, bincount, searchsorted), so millions of events are processed per second. The exception is
+the due times of prescriptions with a times-of-day schedule ("8am, 8pm", "weekdays 9:00"), which are looked up
+one dose at a time.
+
+Definitions:
+    * A dose is a TAKEN or MISSED event. Snoozes are counted separately.
+    * A taken dose is due at the next dose time of its prescription's schedule (see Schedule.py) after the
+      previous dose of the same prescription (the time it was taken, or the due time of a missed dose). For a
+      plain interval that is one interval later. The first taken dose of a prescription has nothing to be late
+      against and counts as on time.
+    * A taken dose is on time if it was taken at most ON_TIME_WINDOW_S after it was due.
+    * Lateness is how long after being due a dose was taken (0 if early), averaged over the taken doses that
+      have a due time.
+    * The longest streak is the longest run of on-time doses in a row of one customer, over all their
+      prescriptions.
+    * Missed doses per week are divided over the weeks between a customer's first and last dose (at least one).
+
+Events of prescriptions that have since been deleted are left out, since their owner is no longer known.
+
+NumPy is only needed by this module, the rest of the program runs without it.
+
+Run from the Sprint folder to print the report of the saved database:
+    python -m src.Analytics
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import src.DoseLog as DoseLog
+    import src.Schedule as Schedule
+except ImportError:
+    import DoseLog as DoseLog
+    import Schedule as Schedule
+
+ON_TIME_WINDOW_S = 60 * 60
+WEEK_S = 7 * 24 * 60 * 60
+# The epoch was a Thursday. Shifting by 3 days makes weeks start on Monday
+_WEEK_OFFSET_S = 3 * 24 * 60 * 60
+
+EVENT_DTYPE = np.dtype([("ID", "V16"), ("event", "u1"), ("time", "<f8")])  # Same layout as DoseLog.RECORD
+assert EVENT_DTYPE.itemsize == DoseLog.RECORD_SIZE
+
+
+def load_events(database) -> np.ndarray:
+    """Every record of the database's dose log as an EVENT_DTYPE array. No copy of the file contents is made."""
+    return np.frombuffer(database.dose_log.read_bytes(), dtype=EVENT_DTYPE)
+
+
+class PrescriptionTable:
+    """Owner and dose schedule of every prescription, as arrays sorted by prescription ID so that events can be
+    matched to their prescription with searchsorted."""
+
+    def __init__(self, prescriptions):
+        keyed = sorted((_ID_key(p.ID), p) for p in prescriptions)
+
+        self.owner_IDs = sorted({str(p.owner_ID) for _, p in keyed})
+        owner_codes = {owner_ID: code for code, owner_ID in enumerate(self.owner_IDs)}
+
+        # The first 8 bytes of a UUID are the sort key. The last 8 are checked after matching
+        self.ID_high = np.array([key[0] for key, _ in keyed], dtype=np.uint64)
+        self.ID_low = np.array([key[1] for key, _ in keyed], dtype=np.uint64)
+        self.owner = np.array([owner_codes[str(p.owner_ID)] for _, p in keyed], dtype=np.int64)
+        schedules = [Schedule.of(p) for _, p in keyed]
+        # Interval schedules are worked out for all rows at once. Times-of-day schedules are kept to look up one
+        # dose at a time, their interval_s is unused
+        self.interval_s = np.array([float(schedule.mean_gap_s()) for schedule in schedules], dtype=np.float64)
+        self.weekly = {row: schedule for row, schedule in enumerate(schedules)
+                       if not isinstance(schedule, Schedule.IntervalSchedule)}
+
+    @classmethod
+    def from_database(cls, database):
+        return cls(database.iter_all_prescriptions())
+
+    def due_after(self, rows: np.ndarray, previous: np.ndarray) -> np.ndarray:
+        """When the dose following one at each previous time (a timestamp) was due, for the prescriptions of
+        the given rows."""
+        due = previous + self.interval_s[rows]
+        if self.weekly:
+            for idx in np.flatnonzero(np.isin(rows, list(self.weekly))):
+                moment = datetime.fromtimestamp(previous[idx])
+                due[idx] = self.weekly[int(rows[idx])].next_after(moment).timestamp()
+        return due
+
+    def lookup(self, events: np.ndarray) -> np.ndarray:
+        """Row of each event's prescription in this table, or -1 if the prescription is not in it."""
+        if len(self.ID_high) == 0:
+            return np.full(len(events), -1, dtype=np.int64)
+        halves = np.ascontiguousarray(events["ID"]).view(">u8").reshape(-1, 2)  # UUID bytes are big-endian
+        high, low = halves[:, 0], halves[:, 1]
+
+        rows = np.minimum(np.searchsorted(self.ID_high, high), len(self.ID_high) - 1)
+        found = (self.ID_high[rows] == high) & (self.ID_low[rows] == low)
+
+        # Two IDs sharing their first 8 bytes would make searchsorted land on the wrong one. With random UUIDs
+        # that essentially never happens, but if it does the events involved are matched one by one
+        if np.any(self.ID_high[1:] == self.ID_high[:-1]):
+            found = self._lookup_slow(high, low, rows, found)
+        return np.where(found, rows, -1)
+
+    def _lookup_slow(self, high, low, rows, found):
+        duplicates = set(self.ID_high[1:][self.ID_high[1:] == self.ID_high[:-1]].tolist())
+        for idx in np.flatnonzero(np.isin(high, list(duplicates))):
+            row = int(np.searchsorted(self.ID_high, high[idx]))
+            while row < len(self.ID_high) and self.ID_high[row] == high[idx] and self.ID_low[row] != low[idx]:
+                row += 1
+            found[idx] = row < len(self.ID_high) and self.ID_high[row] == high[idx]
+            rows[idx] = row if found[idx] else 0
+        return found
+
+
+def _ID_key(ID: str) -> tuple:
+    raw = bytes.fromhex(ID.replace("-", ""))
+    return int.from_bytes(raw[:8], "big"), int.from_bytes(raw[8:], "big")
+
+
+def _order_by(codes: np.ndarray, time_order: np.ndarray) -> np.ndarray:
+    """Indices that sort by the given integer codes and then by time, given the indices that sort by time.
+    Stable sorts of 16-bit integers are radix sorts in NumPy, so codes are narrowed to 16 bits when they fit."""
+    codes = codes[time_order]
+    if len(codes) and codes.max() < (1 << 16):
+        codes = codes.astype(np.uint16)
+    return time_order[np.argsort(codes, kind="stable")]
+
+
+def compute(events: np.ndarray, table: PrescriptionTable) -> dict:
+    """All statistics of the given events. Per-customer values are arrays indexed the same as table.owner_IDs."""
+    customer_count = len(table.owner_IDs)
+
+    rows = table.lookup(events)
+    known = rows >= 0
+    events, rows = events[known], rows[known]
+    event = events["event"]
+    time = events["time"]
+    owner = table.owner[rows]
+
+    snoozed = np.bincount(owner[event == DoseLog.SNOOZED], minlength=customer_count)
+
+    # Doses of each prescription in time order
+    is_dose = (event == DoseLog.TAKEN) | (event == DoseLog.MISSED)
+    rows, event, time, owner = rows[is_dose], event[is_dose], time[is_dose], owner[is_dose]
+    # The log is written in almost chronological order (only misses are logged late), which the stable sort
+    # takes advantage of
+    time_order = np.argsort(time, kind="stable")
+    order = _order_by(rows, time_order)
+    rows, event, time, owner = rows[order], event[order], time[order], owner[order]
+
+    taken = event == DoseLog.TAKEN
+    has_previous = np.zeros(len(rows), dtype=bool)
+    has_previous[1:] = rows[1:] == rows[:-1]
+    timed = taken & has_previous  # Taken doses that have a due time
+    lateness = np.zeros(len(rows))
+    timed_idx = np.flatnonzero(timed)
+    lateness[timed_idx] = time[timed_idx] - table.due_after(rows[timed_idx], time[timed_idx - 1])
+    lateness = np.maximum(lateness, 0.0)
+    on_time = taken & (~has_previous | (lateness <= ON_TIME_WINDOW_S))
+
+    doses = np.bincount(owner, minlength=customer_count)
+    taken_count = np.bincount(owner[taken], minlength=customer_count)
+    missed = doses - taken_count
+    on_time_count = np.bincount(owner[on_time], minlength=customer_count)
+    timed_count = np.bincount(owner[timed], minlength=customer_count)
+    lateness_total = np.bincount(owner[timed], weights=lateness[timed], minlength=customer_count)
+
+    # Per customer, in time order, for streaks and the observed time span
+    # The arrays are now in `order`, so time_order is translated into positions of the reordered arrays
+    new_position = np.empty_like(order)
+    new_position[order] = np.arange(len(order))
+    order = _order_by(owner, new_position[time_order])
+    owner_sorted, time_sorted, good = owner[order], time[order], on_time[order]
+    starts = np.searchsorted(owner_sorted, np.arange(customer_count))
+    ends = np.searchsorted(owner_sorted, np.arange(customer_count), side="right")
+    has_doses = ends > starts
+
+    longest_streak = np.zeros(customer_count, dtype=np.int64)
+    if len(owner_sorted):
+        # Each position's run started right after the latest miss (or late dose), or at the customer's first dose
+        position = np.arange(len(owner_sorted))
+        first_of_customer = np.ones(len(owner_sorted), dtype=bool)
+        first_of_customer[1:] = owner_sorted[1:] != owner_sorted[:-1]
+        run_start = np.where(~good, position + 1, np.where(first_of_customer, position, 0))
+        run_start = np.maximum.accumulate(run_start)
+        run_length = np.where(good, position - run_start + 1, 0)
+        longest_streak[has_doses] = np.maximum.reduceat(run_length, starts[has_doses])
+
+    weeks = np.ones(customer_count)
+    weeks[has_doses] = np.maximum((time_sorted[ends[has_doses] - 1] - time_sorted[starts[has_doses]]) / WEEK_S, 1.0)
+
+    # Population: missed doses in each calendar week
+    missed_time = time[~taken]
+    if len(missed_time):
+        week_index = np.floor((missed_time + _WEEK_OFFSET_S) / WEEK_S).astype(np.int64)
+        first_week = week_index.min()
+        per_week = np.bincount(week_index - first_week)
+        week_starts = [datetime.fromtimestamp((first_week + idx) * WEEK_S - _WEEK_OFFSET_S)
+                       for idx in range(len(per_week))]
+        missed_by_week = list(zip(week_starts, per_week.tolist()))
+    else:
+        missed_by_week = []
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "owner_IDs": table.owner_IDs,
+            "events": len(events),
+            "doses": doses,
+            "taken": taken_count,
+            "missed": missed,
+            "snoozed": snoozed,
+            "on_time_pct": np.where(doses > 0, 100 * on_time_count / doses, np.nan),
+            "mean_lateness_s": np.where(timed_count > 0, lateness_total / timed_count, np.nan),
+            "longest_streak": longest_streak,
+            "missed_per_week": missed / weeks,
+            "population": {
+                "doses": int(doses.sum()),
+                "on_time_pct": 100 * on_time_count.sum() / doses.sum() if doses.sum() else float("nan"),
+                "mean_lateness_s": lateness_total.sum() / timed_count.sum() if timed_count.sum() else float("nan"),
+                "longest_streak": int(longest_streak.max()) if customer_count else 0,
+                "missed_by_week": missed_by_week,
+            },
+        }
+
+
+def adherence_by_customer(database, stats: dict = None) -> dict:
+    """Customer ID -> dict of that customer's statistics, for every customer with a prescription."""
+    if stats is None:
+        stats = compute(load_events(database), PrescriptionTable.from_database(database))
+
+    result = {}
+    for idx, owner_ID in enumerate(stats["owner_IDs"]):
+        result[owner_ID] = {
+            "doses": int(stats["doses"][idx]),
+            "taken": int(stats["taken"][idx]),
+            "missed": int(stats["missed"][idx]),
+            "snoozed": int(stats["snoozed"][idx]),
+            "on_time_pct": float(stats["on_time_pct"][idx]),
+            "mean_lateness_s": float(stats["mean_lateness_s"][idx]),
+            "longest_streak": int(stats["longest_streak"][idx]),
+            "missed_per_week": float(stats["missed_per_week"][idx]),
+        }
+    return result
+
+
+def report(database) -> str:
+    """Readable adherence report of every customer, followed by the population totals."""
+    stats = compute(load_events(database), PrescriptionTable.from_database(database))
+    lines = [f"{'Customer':<30} {'doses':>7} {'on time':>8} {'late (min)':>10} {'streak':>7} {'missed/wk':>10}"]
+    for owner_ID, row in adherence_by_customer(database, stats).items():
+        customer = database.get_customer_by_ID(owner_ID)
+        name = f"{customer.first_name} {customer.last_name}" if customer is not None else owner_ID
+        lines.append(f"{name[:30]:<30} {row['doses']:>7} {row['on_time_pct']:>7.1f}% "
+                     f"{row['mean_lateness_s'] / 60:>10.1f} {row['longest_streak']:>7} {row['missed_per_week']:>10.2f}")
+
+    population = stats["population"]
+    lines.append("")
+    lines.append(f"Population: {population['doses']} doses, {population['on_time_pct']:.1f}% on time, "
+                 f"{population['mean_lateness_s'] / 60:.1f} min late on average, "
+                 f"longest streak {population['longest_streak']}")
+    for week_start, count in population["missed_by_week"]:
+        lines.append(f"    Week of {week_start:%Y-%m-%d}: {count} missed")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    try:
+        from src.Database import Database
+    except ImportError:
+        from Database import Database
+
+    db = Database()
+    db.load()
+    print(report(db))
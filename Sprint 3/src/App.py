@@ -12,45 +12,72 @@ except ImportError:
     import tkinter as tk
     import ttk
 
+import queue
+import threading
+import time
+
 try:
-    from src.Account import SignupWindow, LoginWindow
-    from src.Alert import AlertWindow
     from src.Database import Database
-    from src.Medication import MedicationMenuWindow
-    from src.Validator import Validator
-    import src.Notification as Notification
+    from src.Resources import get_icon, window_pool
+    import src.Instrumentation as Instrumentation
+    from src.Watchdog import EventLoopMonitor
+    import src.Profiler as Profiler
+    from src.Session import Session
+    from src.Lazy import lazy_import
 except ImportError:
-    from Account import SignupWindow, LoginWindow
-    from Alert import AlertWindow
     from Database import Database
-    from Medication import MedicationMenuWindow
-    from Validator import Validator
-    import Notification as Notification
+    from Resources import get_icon, window_pool
+    import Instrumentation as Instrumentation
+    from Watchdog import EventLoopMonitor
+    import Profiler as Profiler
+    from Session import Session
+    from Lazy import lazy_import
 
 NO_USER_MSG = "No User Signed In"
+LOAD_POLL_MS = 50  # How often the main thread checks on the background database load
 
+# The window modules and the notification backend are only imported once they are first used, through
+# lazy_import (see Lazy.py).
+# Keeps them, and whatever they import in turn, out of the startup path.
 
 # FIXME: Add a database save for when the window is closed to ensure all work is saved.
 
 class App:
     def __init__(self, main_root):
+        # Startup timing. Times are in seconds since this point (see record_first_paint and finish_database_load)
+        self.startup_begin = time.perf_counter()
+        self.startup_times = {}
+
+        # Hot path stats, if requested through the environment (see Instrumentation.py)
+        Instrumentation.configure_from_environment()
+
+        # Session profiler, started here if requested through the environment and toggled with Ctrl+Shift+P
+        self.profiler = Profiler.Profiler()
+        Profiler.configure_from_environment(self.profiler)
+
         # Root instance variable
         self.root = main_root
 
+        # Logs slow callbacks and timer drift. Started before any widget exists so that all callbacks are timed
+        self.monitor = EventLoopMonitor(self.root)
+        self.monitor.start()
+
         # Grid constants
         self.TOP_ROW = 1
 
         # Instance variables assigned in other functions
         self.main_frame = None  # init_main_frame
+        self.controls = []  # Buttons that stay disabled until the database has loaded
 
         # Database
         self.database = Database()  # The original location of the loaded database
-        self.database.load()
-        self.current_user = tk.StringVar()  # Stores ID of signed-in user
-        self.current_user.set(NO_USER_MSG)
+        # Session of the signed-in user, passed to every window. get() gives their ID, NO_USER_MSG until login
+        self.current_user = Session(NO_USER_MSG)
         self.current_user_info = tk.StringVar()  # Stores a string that displays all user info to show who is logged in.
         self.current_user_info.set(NO_USER_MSG)
-        self.notification_bg_task()
+        self.load_status = tk.StringVar()  # Progress message of the background database load
+        self.load_status.set("Loading database...")
+        self.load_queue = queue.Queue()  # Messages from the loading thread to the Tk thread
 
         # Load any necessary components
         self.init_root()
@@ -58,6 +85,11 @@ class App:
         self.create_account_buttons()
         self.create_prescription_menu_button()
         self.create_current_user_label()
+        self.create_load_status_label()
+
+        # Draw the window first, then fill in the database behind it
+        self.root.bind("<Map>", self.record_first_paint, add="+")
+        self.start_database_load()
 
     def init_root(self):
         """Configure any window elements such as title, size, etc.
@@ -74,8 +106,10 @@ class App:
         self.root.resizable(width=True, height=True)
 
         # Window Logo
-        logo = tk.PhotoImage(file='./assets/medical_icon.png')
-        self.root.iconphoto(False, logo)
+        self.root.iconphoto(False, get_icon(self.root))
+
+        # Hidden profiler toggle (see Profiler.py). bind_all so that it also works while a child window has focus
+        self.root.bind_all("<Control-P>", self.profiler.toggle)
 
     def init_main_frame(self):
         """Configure the main frame upon which sits most of the application"""
@@ -87,14 +121,18 @@ class App:
     def create_account_buttons(self):
         """Two buttons to open login and sign up windows."""
         # Sign up button
-        login_button = ttk.Button(self.main_frame, text="Sign Up", command=self.click_sign_up_button)
-        login_button.grid(column=1, row=self.TOP_ROW, columnspan=2,
-                          padx=5, pady=5, sticky="NSEW")
+        sign_up_button = ttk.Button(self.main_frame, text="Sign Up", command=self.click_sign_up_button)
+        sign_up_button.grid(column=1, row=self.TOP_ROW, columnspan=2,
+                            padx=5, pady=5, sticky="NSEW")
+        sign_up_button.state(['disabled'])
+        self.controls.append(sign_up_button)
 
         # Login button
         login_button = ttk.Button(self.main_frame, text="Login", command=self.click_log_in_button)
         login_button.grid(column=3, row=self.TOP_ROW, columnspan=2,
                           padx=5, pady=5, sticky="NSEW")
+        login_button.state(['disabled'])
+        self.controls.append(login_button)
 
     def create_prescription_menu_button(self):
         """Button that opens the menu for managing prescriptions."""
@@ -102,6 +140,8 @@ class App:
                                          command=self.click_prescription_button)
         prescription_button.grid(column=1, row=self.TOP_ROW + 1, columnspan=2,
                                  padx=5, pady=5, sticky="NSEW")
+        prescription_button.state(['disabled'])
+        self.controls.append(prescription_button)
 
     def create_current_user_label(self):
         """Temporary measure to make sure everything works. Jk, it will be here forever."""
@@ -114,31 +154,94 @@ class App:
         user_label2 = tk.Label(label_frame, textvariable=self.current_user_info)
         user_label2.grid(column=2, row=1, columnspan=3, sticky="NSW")
 
+    def create_load_status_label(self):
+        """Shows how far along the database load is. Reads "Ready" once the app can be used."""
+        tk.Label(self.main_frame, textvariable=self.load_status).grid(
+            column=1, row=self.TOP_ROW + 3, padx=5, pady=5, columnspan=4, sticky="NSEW"
+        )
+
+    def record_first_paint(self, e=None):
+        """Runs when the main window is first mapped. Records the time once Tk has finished drawing it."""
+        if e is not None and e.widget is not self.root:
+            return  # <Map> bound to the root also fires for every child widget
+        if "first_paint" not in self.startup_times:
+            self.root.after_idle(lambda: self.startup_times.setdefault(
+                "first_paint", time.perf_counter() - self.startup_begin))
+
+    def start_database_load(self):
+        """Loads the database on a worker thread so that the window can be drawn in the meantime.
+        Tkinter is not thread safe, so the worker only talks to the Tk thread through self.load_queue."""
+        threading.Thread(target=self._database_load_worker, name="database-load", daemon=True).start()
+        self.root.after(LOAD_POLL_MS, self.poll_database_load)
+
+    def _database_load_worker(self):
+        """Body of the loading thread. Never touches any Tk object."""
+        try:
+            self.database.load(progress=lambda message, fraction: self.load_queue.put(("progress", message, fraction)))
+            self.load_queue.put(("done",))
+        except Exception as error:  # Handed over to the Tk thread so it can be shown to the user
+            self.load_queue.put(("error", error))
+
+    def poll_database_load(self):
+        """Applies progress messages from the loading thread. Keeps polling until the load is done."""
+        while True:
+            try:
+                message = self.load_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if message[0] == "progress":
+                self.load_status.set(f"{message[1]} ({message[2]:.0%})")
+            elif message[0] == "done":
+                self.finish_database_load()
+                return
+            elif message[0] == "error":
+                self.load_status.set("Database could not be loaded!")
+                lazy_import("Alert").AlertWindow(f"The database could not be loaded:\n{message[1]}")
+                return
+
+        self.root.after(LOAD_POLL_MS, self.poll_database_load)
+
+    def finish_database_load(self):
+        """Unlocks the window once the database is in memory and starts the notification checks."""
+        for control in self.controls:
+            control.state(['!disabled'])
+        self.load_status.set("Ready")
+
+        self.notification_bg_task()
+
+        self.startup_times["interactive"] = time.perf_counter() - self.startup_begin
+        # Reported with the other hot path stats when instrumentation is on (see Instrumentation.py)
+        if Instrumentation.enabled:
+            for name, seconds in self.startup_times.items():
+                Instrumentation.record(f"App.startup.{name}", seconds)
+
     def click_sign_up_button(self):
         """Opens sign up menu and then updates the logged-in user label upon completion."""
-        win = SignupWindow(self.database, self.current_user)
+        win = lazy_import("Account").SignupWindow(self.database, self.current_user)
         win.root.bind("<Destroy>", self.account_action_finished)
 
     def click_log_in_button(self):
         """Opens login menu and then updates the logged-in user label upon completion."""
-        win = LoginWindow(self.database, self.current_user)
+        win = lazy_import("Account").LoginWindow(self.database, self.current_user)
         win.root.bind("<Destroy>", self.account_action_finished)
 
     def click_prescription_button(self):
         """Opens the prescription management menu"""
 
-        validator = Validator()
+        validator = lazy_import("Validator").Validator()
         validator.check_user_logged_in(self.current_user.get(), NO_USER_MSG)
 
         if validator.no_failures():
-            win = MedicationMenuWindow(self.database, self.current_user)
-            win.root.bind("<Destroy>", self.prescription_action_finished)
+            win = window_pool.acquire(lazy_import("Medication").MedicationMenuWindow,
+                                      self.database, self.current_user)
+            win.set_close_callback(self.prescription_action_finished)
         else:
             validator.display_failures()
 
     def prescription_action_finished(self, e=None):
         """Runs when main prescription window is closed."""
-        self.database.save_prescriptions()
+        self.database.save_changed()
         self.root.focus()
 
     def account_action_finished(self, e=None):
@@ -159,9 +262,10 @@ class App:
         After sending any necessary notifications, this function is scheduled to run again in 1 minute
         (as per the business rules)."""
         ONE_MINUTE_IN_MS = 60000
+        Notification = lazy_import("Notification")
 
-        queue = Notification.check(self.database)
-        for prescription in queue:
+        due = Notification.check(self.database)
+        for prescription in due:
             Notification.send(self.database, prescription, self.current_user)
 
-        self.root.after(ONE_MINUTE_IN_MS, self.notification_bg_task)
+        self.monitor.schedule("notification_bg_task", ONE_MINUTE_IN_MS, self.notification_bg_task)
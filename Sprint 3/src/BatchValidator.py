@@ -0,0 +1,305 @@
+"""
+Name: BatchValidator.py
+Description: Validates many candidate customers or prescriptions at once, without any windows.
+
+Validator.py is built around one form at a time and shows its failures in an AlertWindow. This module applies
+the same rules to records from a file or another program instead:
+
+    for result in BatchValidator(database).customers(records):
+        if result.ok:
+            database.add_customer(**result.values)
+        else:
+            for error in result.errors:
+                print(result.index, error.field, error.code, error.message)
+
+Records are dictionaries (e.g. rows of csv.DictReader, or parsed JSON lines). Text fields may also be given as
+whole numbers (a phone number in JSON), which are turned into text. Any other kind of value is reported as an
+error of that record, so one bad record never stops the rest of the batch. Results are yielded one per record, in order, as soon as
+the record has been checked, so a batch never has to be held in memory. Each result carries the errors found
+with a field name and one of the error codes below, or, if there were none, the values converted to what the
+Database methods take.
+
+A username must not be taken in the database, or by an earlier record of the same batch that passed. Checking
+is a dictionary lookup either way (see Database.get_customer_by_username), so the time per record does not grow
+with the size of the database or of the batch.
+"""
+
+from collections import namedtuple
+from datetime import date
+
+try:
+    import src.Rules as Rules
+    import src.Schedule as Schedule
+except ImportError:
+    import Rules as Rules
+    import Schedule as Schedule
+
+# Error codes
+MISSING = "missing"  # The field is not in the record at all
+BLANK = "blank"
+NOT_TEXT = "not_text"  # E.g. a list or a decimal number where text is expected
+INVALID_FORMAT = "invalid_format"
+TOO_SHORT = "too_short"
+NEEDS_LETTERS_AND_NUMBERS = "needs_letters_and_numbers"
+USERNAME_TAKEN = "username_taken"  # By a customer already in the database
+DUPLICATE_IN_BATCH = "duplicate_in_batch"
+NOT_A_NUMBER = "not_a_number"
+NOT_POSITIVE = "not_positive"
+INVALID_DATE = "invalid_date"
+INVALID_SCHEDULE = "invalid_schedule"
+UNKNOWN_OWNER = "unknown_owner"
+
+CUSTOMER_FIELDS = ("first_name", "last_name", "username", "password", "email", "phone_number")
+PRESCRIPTION_FIELDS = ("drug_name", "doctor_name", "time_btwn_dose", "side_effects", "dosage",
+                       "date_issued", "expiration_date")
+
+FieldError = namedtuple("FieldError", ("field", "code", "message"))
+
+
+class RecordResult(namedtuple("RecordResult", ("index", "record", "errors", "values"))):
+    """The outcome of checking one record. index counts records from 0, values is None unless ok."""
+    __slots__ = ()
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+class BatchValidator:
+    def __init__(self, database):
+        self.database = database
+        self._batch_usernames = set()  # Usernames of customers that passed so far
+
+    def customers(self, records):
+        """Yields a RecordResult for each candidate customer. The values of a passing record are the keyword
+        arguments of Database.add_customer."""
+        for index, record in enumerate(records):
+            errors = []
+            values = _required(record, CUSTOMER_FIELDS, errors, text=CUSTOMER_FIELDS)
+
+            username = values.get("username")
+            if username is not None:
+                if username == "":
+                    errors.append(FieldError("username", BLANK, "Username cannot be blank."))
+                elif self.database.get_customer_by_username(username) is not None:
+                    errors.append(FieldError("username", USERNAME_TAKEN, "Username already exists in the database."))
+                elif username in self._batch_usernames:
+                    errors.append(FieldError("username", DUPLICATE_IN_BATCH,
+                                             "Username is used by an earlier record of this batch."))
+
+            email = values.get("email")
+            if email is not None and not Rules.valid_email(email):
+                errors.append(FieldError("email", INVALID_FORMAT, "Email was not in the correct format."))
+
+            password = values.get("password")
+            if password is not None:
+                if not Rules.password_long_enough(password):
+                    errors.append(FieldError("password", TOO_SHORT, "Password must have eight or more characters."))
+                if not Rules.password_has_letters_and_numbers(password):
+                    errors.append(FieldError("password", NEEDS_LETTERS_AND_NUMBERS,
+                                             "Password must have both letters and numbers."))
+
+            if errors:
+                yield RecordResult(index, record, errors, None)
+            else:
+                self._batch_usernames.add(username)
+                yield RecordResult(index, record, errors, values)
+
+    def prescriptions(self, records, owner_ID: str = None):
+        """Yields a RecordResult for each candidate prescription. The values of a passing record are the keyword
+        arguments of Database.add_prescription.
+
+        The owner is taken from the record's "owner_ID", or its "owner_username", or else the given owner_ID.
+        Owners must be customers in the database. Dates are "YYYY-MM-DD" text or date objects. time_btwn_dose
+        is in seconds and may be left blank if the record has a "schedule" (see Schedule.py)."""
+        for index, record in enumerate(records):
+            errors = []
+            values = _required(record, PRESCRIPTION_FIELDS, errors, optional=("time_btwn_dose",),
+                               text=("drug_name", "doctor_name", "side_effects", "dosage"))
+            values["owner_ID"] = self._owner(record, owner_ID, errors)
+
+            if values.get("drug_name") == "":
+                errors.append(FieldError("drug_name", BLANK, "Drug name cannot be blank."))
+
+            schedule = _text(record.get("schedule"))
+            if schedule:
+                if not isinstance(schedule, str):
+                    errors.append(FieldError("schedule", NOT_TEXT, "Schedule must be text."))
+                else:
+                    try:
+                        Schedule.compile_schedule(schedule)
+                    except ValueError as error:
+                        errors.append(FieldError("schedule", INVALID_SCHEDULE, str(error)))
+                values["time_btwn_dose"] = 0  # Replaced by the schedule's average gap when added
+            else:
+                schedule = None
+                time_btwn_dose = values.get("time_btwn_dose")
+                if time_btwn_dose is None:
+                    errors.append(FieldError("time_btwn_dose", MISSING, "Time between dose is missing."))
+                else:
+                    seconds = _whole_number(time_btwn_dose)
+                    if seconds is None:
+                        errors.append(FieldError("time_btwn_dose", NOT_A_NUMBER,
+                                                 "Time between dose must be a whole number of seconds."))
+                    elif seconds <= 0:
+                        errors.append(FieldError("time_btwn_dose", NOT_POSITIVE,
+                                                 "Time between dose must be more than zero."))
+                    else:
+                        values["time_btwn_dose"] = seconds
+            values["schedule"] = schedule
+
+            for field in ("date_issued", "expiration_date"):
+                if field in values:
+                    moment = _date(values.pop(field))
+                    if moment is None:
+                        errors.append(FieldError(field, INVALID_DATE, 'Dates must look like "2024-04-05".'))
+                    else:
+                        values[f"{field}_year"], values[f"{field}_month"], values[f"{field}_day"] = \
+                            moment.year, moment.month, moment.day
+
+            yield RecordResult(index, record, errors, None if errors else values)
+
+    def _owner(self, record, default_owner_ID, errors) -> str or None:
+        """ID of the customer the record belongs to, or None (with an error added) if there is none."""
+        fields = ("owner_ID", "owner_username")
+        error_count = len(errors)
+        given = _required(record, fields, errors, optional=fields, text=fields)
+        if len(errors) > error_count:
+            return None  # Not text
+        owner_ID = _text(given.get("owner_ID")) or None
+        if owner_ID is None:
+            username = _text(given.get("owner_username")) or None
+            if username is not None:
+                customer = self.database.get_customer_by_username(username)
+                owner_ID = customer.ID if customer is not None else None
+                if owner_ID is None:
+                    errors.append(FieldError("owner_username", UNKNOWN_OWNER, f"No account found with username "
+                                                                              f"{username}."))
+                return owner_ID
+            owner_ID = default_owner_ID
+
+        if owner_ID is None or self.database.get_customer_by_ID(owner_ID) is None:
+            errors.append(FieldError("owner_ID", UNKNOWN_OWNER, "The prescription does not belong to a known customer."))
+            return None
+        return owner_ID
+
+
+def _text(value) -> str or None:
+    """Field value with surrounding spaces removed. Non-text values are left alone."""
+    return value.strip() if isinstance(value, str) else value
+
+
+def _required(record, fields: tuple, errors: list, optional: tuple = (), text: tuple = ()) -> dict:
+    """Values of the given fields, adding a MISSING error for each one not in the record.
+    Fields named in text must be text. Whole numbers are turned into text, anything else gets a NOT_TEXT error.
+    Text is kept exactly as given, same as in the windows (a password may start with a space)."""
+    values = {}
+    for field in fields:
+        value = record.get(field)
+        if value is None:
+            if field not in optional:
+                errors.append(FieldError(field, MISSING, f"{field.replace('_', ' ').capitalize()} is missing."))
+        elif field not in text or isinstance(value, str):
+            values[field] = value
+        elif isinstance(value, int) and not isinstance(value, bool):
+            values[field] = str(value)
+        else:
+            errors.append(FieldError(field, NOT_TEXT, f"{field.replace('_', ' ').capitalize()} must be text."))
+    return values
+
+
+def _whole_number(value) -> int or None:
+    """value as an int if it is a whole number (10, 10.0 or "10"), else None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else None
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            return None
+    return None
+
+
+def _date(value) -> date or None:
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value.strip())
+    except (AttributeError, ValueError):
+        return None
+
+
+if __name__ == "__main__":
+    # Quick sanity test
+    try:
+        from src.Database import Database
+    except ImportError:
+        from Database import Database
+
+    db = Database()
+    db.add_customer("Satoru", "Gojo", "thestr0ngest", "hollow&purple1989", "satorugojo@jjhs.edu", "5551234567")
+    validator = BatchValidator(db)
+
+    people = [
+        {"first_name": "Yuji", "last_name": "Itadori", "username": "yuji", "password": "sukuna2018",
+         "email": "yuji@jjhs.edu", "phone_number": "5550000000"},
+        {"first_name": "Yuji", "last_name": "Itadori", "username": "yuji", "password": "sukuna2018",
+         "email": "yuji@jjhs.edu", "phone_number": "5550000000"},
+        {"first_name": "Fake", "last_name": "Gojo", "username": "thestr0ngest", "password": "short",
+         "email": "not an email", "phone_number": "5550000000"},
+        {"first_name": "Megumi"},
+    ]
+    results = list(validator.customers(people))
+    assert results[0].ok and results[0].values["username"] == "yuji"
+    assert [error.code for error in results[1].errors] == [DUPLICATE_IN_BATCH]
+    assert [error.code for error in results[2].errors] == [USERNAME_TAKEN, INVALID_FORMAT, TOO_SHORT,
+                                                           NEEDS_LETTERS_AND_NUMBERS]
+    assert {error.field for error in results[3].errors} == {"last_name", "username", "password", "email",
+                                                             "phone_number"}
+
+    medications = [
+        {"owner_username": "thestr0ngest", "drug_name": "Ibuprofen", "doctor_name": "Ieiri Shoko",
+         "time_btwn_dose": "28800", "side_effects": "None", "dosage": "200mg",
+         "date_issued": "2024-04-05", "expiration_date": "2025-04-05"},
+        {"owner_username": "thestr0ngest", "drug_name": "Ibuprofen", "doctor_name": "Ieiri Shoko",
+         "schedule": "8am, 8pm", "side_effects": "None", "dosage": "200mg",
+         "date_issued": "2024-04-05", "expiration_date": "2025-02-30"},
+        {"owner_username": "nobody", "drug_name": "", "doctor_name": "Ieiri Shoko", "time_btwn_dose": "8 hours",
+         "side_effects": "None", "dosage": "200mg", "date_issued": "2024-04-05", "expiration_date": "2025-04-05"},
+    ]
+    results = list(validator.prescriptions(medications))
+    assert results[0].ok
+    db.add_prescription(**results[0].values)
+    assert [(error.field, error.code) for error in results[1].errors] == [("expiration_date", INVALID_DATE)]
+    assert [error.code for error in results[2].errors] == [UNKNOWN_OWNER, BLANK, NOT_A_NUMBER]
+
+    # Values as they come out of JSON
+    json_people = [
+        {"first_name": "Maki", "last_name": "Zenin", "username": "maki", "password": 12345678,
+         "email": 42, "phone_number": 5550000000},
+        {"first_name": "Toge", "last_name": "Inumaki", "username": "toge", "password": "onigiri2018",
+         "email": "toge@jjhs.edu", "phone_number": ["5550000000"]},
+    ]
+    results = list(validator.customers(json_people))
+    assert [(error.field, error.code) for error in results[0].errors] == [("email", INVALID_FORMAT),
+                                                                          ("password", NEEDS_LETTERS_AND_NUMBERS)]
+    assert [(error.field, error.code) for error in results[1].errors] == [("phone_number", NOT_TEXT)]
+
+    intervals = [3600.0, 3600.5, -3600, "0", "-60", True, " 60 "]
+    results = list(validator.prescriptions(dict(medications[0], time_btwn_dose=value) for value in intervals))
+    assert results[0].ok and results[0].values["time_btwn_dose"] == 3600
+    assert [[error.code for error in result.errors] for result in results[1:6]] == \
+        [[NOT_A_NUMBER], [NOT_POSITIVE], [NOT_POSITIVE], [NOT_POSITIVE], [NOT_A_NUMBER]]
+    assert results[6].ok and results[6].values["time_btwn_dose"] == 60
+    results = list(validator.prescriptions([dict(medications[1], schedule=8, expiration_date="2025-04-05")]))
+    assert [error.code for error in results[0].errors] == [NOT_TEXT]
+    bad_owners = [{"owner_username": ["thestr0ngest"]}, {"owner_username": {"name": "thestr0ngest"}},
+                  {"owner_ID": ["1"]}]
+    results = list(validator.prescriptions(dict(medications[0], **owner) for owner in bad_owners))
+    assert [[(error.field, error.code) for error in result.errors] for result in results] == \
+        [[("owner_username", NOT_TEXT)], [("owner_username", NOT_TEXT)], [("owner_ID", NOT_TEXT)]]
+    print("Batch validator test successful")
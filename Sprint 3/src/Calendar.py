@@ -0,0 +1,98 @@
+"""
+Name: Calendar.py
+Description: Upcoming dose times of each user ("what do I take today/this week").
+
+A prescription's doses are projected from its schedule (see Schedule.py): the next dose is due at the first
+scheduled time after it was last taken, and every later dose at the scheduled time after that, up to the
+expiration date. The first projected dose may already be overdue.
+
+DoseCalendar is a materialized view of those projections. The dose times of a prescription are generated
+the first time they are asked for, and only as far ahead as has been asked for. They are kept until the
+prescription changes. The calendar is subscribed to the Database's events (see Events.py) and is told about every
+change (taken, edited, deleted, or the shard being dropped from memory), and only that one prescription's times
+are thrown away.
+"""
+
+import heapq
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+try:
+    import src.Clock as Clock
+    import src.Schedule as Schedule
+except ImportError:
+    import Clock as Clock
+    import Schedule as Schedule
+
+DEFAULT_DAYS = 7
+
+
+class _Projection:
+    """Generated dose times of one prescription. More are added on demand, up to the expiration date."""
+
+    __slots__ = ("times", "schedule", "expires")
+
+    def __init__(self, prescription):
+        self.schedule = Schedule.of(prescription)
+        self.expires = prescription.expiration_date
+        first = self.schedule.next_after(prescription.was_taken)
+        self.times = [first] if first <= self.expires else []
+
+    def extend_to(self, end: datetime) -> None:
+        """Makes sure every dose up to end has been generated."""
+        times = self.times
+        if not times:
+            return
+        last = times[-1]
+        while last < end:
+            following = self.schedule.next_after(last)
+            if following > self.expires or following <= last:  # A zero interval would never move forward
+                break
+            times.append(following)
+            last = following
+
+    def between(self, start: datetime, end: datetime) -> list[datetime]:
+        times = self.times
+        if times and times[-1] < start:
+            # Skip straight to start rather than generating every dose in between (a prescription taken every
+            # two minutes but last taken weeks ago would otherwise generate thousands)
+            last = self.schedule.skip_to(times[-1], start) if self.schedule.mean_gap_s() > 0 else times[-1]
+            times[:] = [last] if last <= self.expires else []
+        self.extend_to(end)
+        return self.times[bisect_left(self.times, start):bisect_left(self.times, end)]
+
+
+class DoseCalendar:
+    def __init__(self):
+        self._projections = {}  # Prescription ID -> _Projection
+
+    def invalidate(self, prescription_ID: str) -> None:
+        """Forgets the dose times of one prescription. They are generated again the next time they are needed."""
+        self._projections.pop(prescription_ID, None)
+
+    def on_event(self, event) -> None:
+        """Forgets the dose times of the prescription of an event from the Database (see Events.py)."""
+        self._projections.pop(event.prescription_ID, None)
+
+    def clear(self) -> None:
+        self._projections.clear()
+
+    def doses(self, prescriptions, start: datetime, end: datetime) -> list[tuple]:
+        """(dose time, prescription) of every dose of the given prescriptions from start up to end, in time order."""
+        per_prescription = []
+        for prescription in prescriptions:
+            projection = self._projections.get(prescription.ID)
+            if projection is None:
+                projection = self._projections[prescription.ID] = _Projection(prescription)
+            per_prescription.append([(moment, prescription) for moment in projection.between(start, end)])
+
+        # Each list is already in time order, so they only have to be merged
+        return list(heapq.merge(*per_prescription, key=lambda dose: dose[0]))
+
+
+def day_window(days: int, now: datetime = None) -> tuple:
+    """(start, end) covering today from midnight and the following days, days in total."""
+    if now is None:
+        now = Clock.now()
+    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, start + timedelta(days=days)
@@ -0,0 +1,53 @@
+"""
+Name: Clock.py
+Description: The one place the program reads the current time from.
+             Everything that needs "now" calls Clock.now() instead of datetime.now(). Normally that is the
+             system time, but a VirtualClock can be swapped in with set_clock() to simulate days of reminders
+             in seconds.
+"""
+
+from datetime import datetime, timedelta
+
+
+class SystemClock:
+    """The real time of the computer."""
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+
+class VirtualClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self, start: datetime = None):
+        self._now = start if start is not None else datetime.now()
+
+    def now(self) -> datetime:
+        return self._now
+
+    def advance(self, delta: timedelta) -> datetime:
+        """Moves the clock forward by delta and returns the new time."""
+        self._now += delta
+        return self._now
+
+    def set(self, moment: datetime) -> None:
+        self._now = moment
+
+
+_clock = SystemClock()
+
+
+def now() -> datetime:
+    """The current time according to the active clock."""
+    return _clock.now()
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(clock) -> object:
+    """Makes the given clock the active one. Returns the previously active clock so it can be put back."""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
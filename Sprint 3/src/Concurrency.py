@@ -0,0 +1,182 @@
+"""
+Name: Concurrency.py
+Description: A readers/writer lock and the decorators the Database uses to hold it.
+
+The Database is used from more than one thread: the Tk thread, the background load, the server's worker pool
+(Server.py) and anything else running headless. RWLock lets any number of threads read at once, or one thread
+write. Writers go first: once a writer is waiting no new reader gets in, so a steady stream of readers cannot
+keep a writer out forever.
+
+Both sides are reentrant, since Database methods call each other (add_prescriptions -> load_shard, etc.):
+    * A thread that is writing may read or write again.
+    * A thread that is reading may read again, even while a writer waits.
+    * A thread that is reading may NOT start writing: two readers doing that would each wait for the other, so
+      RuntimeError is raised instead. Methods that might write take the write lock from the start.
+
+    class Database:
+        def __init__(self):
+            self.lock = RWLock()
+
+        @reading
+        def get_something(self): ...
+
+        @writing
+        def change_something(self): ...
+"""
+
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+
+class RWLock:
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0  # Threads reading, each counted once however deeply nested
+        self._writer = None  # Ident of the thread writing
+        self._writer_depth = 0
+        self._writers_waiting = 0
+        self._local = threading.local()  # read_depth of the current thread
+
+    def _read_depth(self) -> int:
+        return getattr(self._local, "read_depth", 0)
+
+    def acquire_read(self) -> None:
+        me = threading.get_ident()
+        depth = self._read_depth()
+        if depth or self._writer == me:
+            self._local.read_depth = depth + 1
+            return
+        with self._condition:
+            while self._writer is not None or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        self._local.read_depth = 1
+
+    def release_read(self) -> None:
+        depth = self._read_depth() - 1
+        self._local.read_depth = depth
+        if depth or self._writer == threading.get_ident():
+            return
+        with self._condition:
+            self._readers -= 1
+            if self._readers == 0:
+                self._condition.notify_all()
+
+    def acquire_write(self) -> None:
+        me = threading.get_ident()
+        if self._writer == me:
+            self._writer_depth += 1
+            return
+        if self._read_depth():
+            raise RuntimeError("Cannot start writing while reading. Take the write lock from the start.")
+        with self._condition:
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self) -> None:
+        self._writer_depth -= 1
+        if self._writer_depth:
+            return
+        with self._condition:
+            self._writer = None
+            self._condition.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def reading(method):
+    """Runs the method while holding self.lock for reading."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        lock = self.lock
+        lock.acquire_read()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            lock.release_read()
+    return wrapper
+
+
+def writing(method):
+    """Runs the method while holding self.lock for writing."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        lock = self.lock
+        lock.acquire_write()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            lock.release_write()
+    return wrapper
+
+
+if __name__ == "__main__":
+    # Quick sanity test
+    import time
+
+    lock = RWLock()
+    with lock.read():
+        with lock.read():
+            pass
+        try:
+            lock.acquire_write()
+            raise AssertionError("Upgrade was allowed")
+        except RuntimeError:
+            pass
+    with lock.write():
+        with lock.write():
+            with lock.read():
+                pass
+
+    # Readers overlap, a writer does not overlap with anyone
+    active = {"readers": 0, "writers": 0, "max_readers": 0}
+    guard = threading.Lock()
+
+    def reader():
+        for _ in range(200):
+            with lock.read():
+                with guard:
+                    active["readers"] += 1
+                    active["max_readers"] = max(active["max_readers"], active["readers"])
+                    assert active["writers"] == 0
+                time.sleep(0.0001)
+                with guard:
+                    active["readers"] -= 1
+
+    def writer():
+        for _ in range(100):
+            with lock.write():
+                with guard:
+                    active["writers"] += 1
+                    assert active["writers"] == 1 and active["readers"] == 0
+                with guard:
+                    active["writers"] -= 1
+
+    threads = [threading.Thread(target=reader) for _ in range(4)] + [threading.Thread(target=writer) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert active["max_readers"] > 1
+    print("Concurrency test successful")
@@ -7,6 +7,14 @@ Description: The customer class.
 
 import uuid
 
+try:
+    from src.Lazy import lazy_import
+except ImportError:
+    from Lazy import lazy_import
+
+# Password.py (and the hashlib and hmac it imports) is only loaded once the first customer is created, which keeps
+# it out of startup. Customers loaded from disk are unpickled without calling __init__.
+
 
 class Customer:
     def __init__(self, first_name: str, last_name: str,
@@ -15,15 +23,20 @@ class Customer:
         self.first_name = first_name
         self.last_name = last_name
         self.username = username
-        self.password = password  # Password stored in plaintext. This is terrible, but it doesn't matter here.
+        Password = lazy_import("Password")
+        self.password_hash = Password.hash_password(password)  # Salted, see Password.py
+        self.password = None  # Plaintext, only on customers saved before passwords were hashed
         self.email = email
         self.phone_number = phone_number
+        # (start, end) seconds since midnight of the windows with no reminders, see QuietHours.py
+        self.quiet_hours = ()
         self.ID = str(uuid.uuid4())  # Random ID to discern between customers with identical names, email, etc.
 
     def __str__(self):
+        # The password is masked, since this is shown in the main window and printed when debugging
         return "Name: {0} {1},\nUsername/Password: {2}, {3},\nEmail/Phone: {4}, {5},\nID: {6}".format(
             self.first_name, self.last_name,
-            self.username, self.password,
+            self.username, "*" * 8,
             self.email, self.phone_number,
             self.ID
         )
@@ -2,128 +2,602 @@
 Name: Database.py
 Description: The database class.
              Serves as a home for all the data stored in this application.
-             It holds a list of all customers and a list of all active prescriptions.
+             It holds a list of all customers and the prescriptions of recently used customers.
+
+             Prescriptions are stored on disk as one file ("shard") per owner inside PRESCRIPTION_DIR_NAME.
+             Only the customer list is read at startup. A customer's shard is read the first time it is needed
+             (usually on login) and at most MAX_RESIDENT_SHARDS shards are kept in memory at once.
+
+             The database may be used from several threads (see Concurrency.py). Methods that change anything,
+             or that may load a shard, hold `lock` for writing. Looking up one customer or prescription by ID is
+             a single dictionary lookup, which is safe without the lock.
+             Shard lists are never changed in place: adding or deleting a prescription replaces its owner's
+             list. So a list handed out by load_shard() or the prescriptions property is a snapshot that can be
+             iterated without holding the lock while writers carry on. Changes to a prescription's fields are
+             made while holding the lock for writing, and saves hold it for reading one shard at a time.
+
+             Every change to a prescription is published on `events` (see Events.py), so other parts of the
+             program can follow along instead of rescanning. The dose calendar and the tracking of which
+             shards need saving are kept up to date that way too.
 """
 
+import os
 import pickle
+import threading
+from collections import OrderedDict
+from datetime import datetime
 
 try:
     from src.Customer import Customer
     from src.Prescription import Prescription
+    import src.Clock as Clock
+    import src.RateLimit as RateLimit
+    import src.Instrumentation as Instrumentation
+    from src.Instrumentation import instrumented
+    from src.Concurrency import RWLock, reading, writing
+    from src.Events import EventBus
+    import src.Events as Events
+    from src.Lazy import lazy_import
 except ImportError:
     from Customer import Customer
     from Prescription import Prescription
+    import Clock as Clock
+    import RateLimit as RateLimit
+    import Instrumentation as Instrumentation
+    from Instrumentation import instrumented
+    from Concurrency import RWLock, reading, writing
+    from Events import EventBus
+    import Events as Events
+    from Lazy import lazy_import
+
+# Modules that only some methods need are imported when first used (see Lazy.py), which keeps them and what
+# they import in turn (hashlib, hmac, re) out of the startup path. The dose log, the dose calendar, schedules,
+# quiet hours and password hashing are all first needed after the window is up.
 
 
 class Database:
     def __init__(self):
         self.customers = []
-        self.prescriptions = []
+        self._customer_index = {}  # Customer ID -> Customer, rebuilt whenever self.customers is replaced
+        self._username_index = {}  # Username -> first Customer with it, rebuilt along with _customer_index
+        self._shards = OrderedDict()  # Owner ID -> list of Prescription. Least recently used first.
+        self._prescription_index = {}  # Prescription ID -> Prescription, for every prescription in a loaded shard
+        self._dose_log = None  # Opened on first use, see dose_log
+        self._dose_calendar = None  # Made on first use, see dose_calendar
+        self._dirty_shards = set()  # Owner IDs of shards changed since they were last saved
+        # Login attempts per username, checked before any password is (see Validator.check_login_not_throttled)
+        self.login_limiter = RateLimit.TokenBucketLimiter(name="auth.limiter")
 
         self.CUSTOMER_FILE_NAME = "customers.pkl"
-        self.PRESCRIPTION_FILE_NAME = "prescriptions.pkl"
+        self.PRESCRIPTION_FILE_NAME = "prescriptions.pkl"  # Old single file storage. Migrated into shards on load.
+        self.PRESCRIPTION_DIR_NAME = "prescriptions"
+        self.DOSE_LOG_FILE_NAME = "dose_log.bin"
+        self.MAX_RESIDENT_SHARDS = 8
+
+        self.lock = RWLock()  # See Concurrency.py and the notes at the top of this file
+        # Held while a shard or customer file is written or a shard file read, so none is read half written.
+        # Only ever taken after `lock`, never the other way around.
+        self._file_lock = threading.Lock()
+
+        self.events = EventBus()  # Changes to prescriptions, see Events.py
+        self.events.subscribe(self._shard_changed, kinds=Events.CHANGES)
+
+    @property
+    def prescriptions(self) -> list[Prescription]:
+        """All prescriptions currently held in memory. This is NOT every prescription on disk, only those
+        belonging to customers whose shard has been loaded.
+        The list is a snapshot, which can be iterated while other threads change the database."""
+        with self.lock.read():
+            shards = list(self._shards.values())
+        return [prescription for shard in shards for prescription in shard]
 
     # CUSTOMER MANAGEMENT METHODS -----
+    @instrumented("Database.add_customer")
     def add_customer(self, first_name, last_name, username, password, email, phone_number) -> Customer:
-        """Adds new customer to database. Returns object of the new user"""
+        """Adds new customer to database. Returns object of the new user.
+        The password is hashed (the slow part, see Password.py) before the lock is taken."""
         new_customer = Customer(first_name, last_name, username, password, email, phone_number)
-        self.customers.append(new_customer)
+        with self.lock.write():
+            self._insert_customer(new_customer)
         return new_customer.ID
 
+    @instrumented("Database.add_customers")
+    def add_customers(self, rows) -> list[str]:
+        """Adds many customers at once and saves the customer list a single time. Each row is a dict of the
+        keyword arguments of add_customer(). Returns the IDs of the new customers in the order of the rows.
+        The passwords are hashed on a thread pool before the lock is taken. hashlib lets go of the GIL while
+        hashing, so every core is used and other threads are not held up meanwhile."""
+        rows = list(rows)
+        workers = min(os.cpu_count() or 1, len(rows))
+        if workers > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(workers, thread_name_prefix="password-hash") as pool:
+                new_customers = list(pool.map(lambda row: Customer(**row), rows))
+        else:
+            new_customers = [Customer(**row) for row in rows]
+
+        with self.lock.write():
+            for new_customer in new_customers:
+                self._insert_customer(new_customer)
+        self.save_customers()
+        return [new_customer.ID for new_customer in new_customers]
+
+    def _insert_customer(self, new_customer: Customer) -> None:
+        """Adds an already built customer to the list and lookup tables. The caller holds the lock for writing."""
+        self.customers.append(new_customer)
+        self._customer_index[new_customer.ID] = new_customer
+        self._username_index.setdefault(new_customer.username, new_customer)
+
+    @instrumented("Database.get_customer_by_ID")
     def get_customer_by_ID(self, ID: str) -> Customer or None:
         """Get customer object by ID. Returns None if no customer with ID exists."""
+        return self._customer_index.get(str(ID))
+
+    @instrumented("Database.get_customer_by_username")
+    def get_customer_by_username(self, username: str) -> Customer or None:
+        """Get customer object by username. Returns None if no customer has that username."""
+        return self._username_index.get(username)
+
+    @instrumented("Database.set_quiet_hours")
+    @writing
+    def set_quiet_hours(self, user_id: str, windows) -> bool:
+        """Sets the (start, end) windows during which the given customer gets no reminders (see QuietHours.py).
+        Raises ValueError if the windows are not valid. Returns whether the customer exists."""
+        customer = self.get_customer_by_ID(user_id)
+        if customer is None:
+            return False
+        windows = tuple(windows)
+        lazy_import("QuietHours").compile_windows(windows)
+        customer.quiet_hours = windows
+
+        # Reminders held back by the old quiet hours are checked against the new ones
+        for prescription in self.load_shard(user_id):
+            if getattr(prescription, "deferred_until", None) is not None:
+                prescription.deferred_until = None
+                self.events.publish(Events.REMINDED, prescription)
+        return True
+
+    def _rebuild_customer_index(self) -> None:
+        """Rebuilds the customer ID and username lookup tables from self.customers"""
+        self._customer_index = {str(customer.ID): customer for customer in self.customers}
+        self._username_index = {}
         for customer in self.customers:
-            if str(customer.ID) == str(ID):
-                return customer
-
-        return None
+            self._username_index.setdefault(customer.username, customer)
+
+    @instrumented("Database.authenticate")
+    def authenticate(self, username: str, password: str) -> Customer or None:
+        """Get the customer with the given username if the password is theirs, else None.
+        A customer saved before passwords were hashed, or whose hash is weaker than the current Password policy,
+        gets a new hash of the password on their first successful login, and the customer list is saved."""
+        customer = self._username_index.get(username)
+        if customer is None:
+            Instrumentation.count("auth.unknown_username")
+            return None
+
+        # The slow part, checking the password, is done without holding the lock
+        with self.lock.read():
+            stored = getattr(customer, "password_hash", None)
+            plaintext = customer.password
+        Password = lazy_import("Password")
+        if stored is not None:
+            matches = Password.verify(password, stored)
+        else:
+            import hmac
+            matches = plaintext is not None and hmac.compare_digest(plaintext.encode("utf-8"),
+                                                                    password.encode("utf-8"))
+        if not matches:
+            Instrumentation.count("auth.failed")
+            return None
+
+        Instrumentation.count("auth.succeeded")
+        if Password.needs_rehash(stored):
+            new_hash = Password.hash_password(password)
+            with self.lock.write():
+                customer.password_hash = new_hash
+                customer.password = None
+            self.save_customers()
+            Instrumentation.count("auth.rehashed")
+        return customer
 
     def get_customer_by_username_password(self, username, password) -> Customer or None:
         """Get customer object by matching username and password. Returns None if no matching customer exists."""
-        for customer in self.customers:
-            if (customer.username == username) and (customer.password == password):
-                return customer
-
-        return None
+        return self.authenticate(username, password)
 
     # PRESCRIPTION MANAGEMENT METHODS -----
+    @instrumented("Database.add_prescription")
+    @writing
     def add_prescription(self, owner_ID: str, drug_name: str, doctor_name: str, time_btwn_dose: int, side_effects: str,
                          dosage: str, date_issued_year: int, date_issued_month: int, date_issued_day: int,
-                         expiration_date_year: int, expiration_date_month: int, expiration_date_day: int) -> str:
+                         expiration_date_year: int, expiration_date_month: int, expiration_date_day: int,
+                         schedule: str = None) -> str:
         """Adds new prescription to database.
+        If a schedule expression is given (see Schedule.py), time_btwn_dose is replaced by its average gap.
+        The owner's shard is copied to add it, so each call takes time in proportion to the number of prescriptions
+        the owner already has. Use add_prescriptions() to add many, which copies each shard once per call.
         Returns the ID of the new prescription."""
-        new_prescription = Prescription(
+        new_prescription = self._build_prescription(
             owner_ID, drug_name, doctor_name, time_btwn_dose, side_effects,
             dosage, date_issued_year, date_issued_month, date_issued_day,
-            expiration_date_year, expiration_date_month, expiration_date_day
+            expiration_date_year, expiration_date_month, expiration_date_day, schedule
         )
-        self.prescriptions.append(new_prescription)
+        # A new list rather than append(), so that anyone iterating the old one is not disturbed
+        self._shards[str(owner_ID)] = self.load_shard(owner_ID) + [new_prescription]
+        self._prescription_index[new_prescription.ID] = new_prescription
+        self.events.publish(Events.ADDED, new_prescription)
         return new_prescription.ID
 
-    def get_prescription_by_ID(self, ID: str) -> Prescription or None:
-        """Finds prescription in database from a given unique ID. Returns None if no match exists."""
-        for prescription in self.prescriptions:
-            if prescription.ID == ID:
-                return prescription
-
-        return None
+    @instrumented("Database.add_prescriptions")
+    @writing
+    def add_prescriptions(self, rows) -> list[str]:
+        """Adds many prescriptions at once and saves the shards they went into. Each row is a dict of the
+        keyword arguments of add_prescription(). Every shard involved is read and written once per call rather
+        than once per prescription. Returns the IDs of the new prescriptions in the order of the rows.
+
+        Shards that are not loaded are updated on disk without being loaded, so a big import does not push the
+        shards of the customers using the program out of memory."""
+        rows_by_owner = {}
+        for idx, row in enumerate(rows):
+            rows_by_owner.setdefault(str(row["owner_ID"]), []).append((idx, row))
+
+        IDs = [None] * sum(len(owner_rows) for owner_rows in rows_by_owner.values())
+        for owner_ID, owner_rows in rows_by_owner.items():
+            resident = owner_ID in self._shards
+            shard = list(self.peek_shard(owner_ID))
+            for idx, row in owner_rows:
+                new_prescription = self._build_prescription(**row)
+                shard.append(new_prescription)
+                if resident:
+                    self._prescription_index[new_prescription.ID] = new_prescription
+                IDs[idx] = new_prescription.ID
+                self.events.publish(Events.ADDED, new_prescription)
+            if resident:
+                self._shards[owner_ID] = shard
+            self._save_shard(owner_ID, shard)
+        return IDs
+
+    @staticmethod
+    def _build_prescription(owner_ID: str, drug_name: str, doctor_name: str, time_btwn_dose: int,
+                            side_effects: str, dosage: str, date_issued_year: int, date_issued_month: int,
+                            date_issued_day: int, expiration_date_year: int, expiration_date_month: int,
+                            expiration_date_day: int, schedule: str = None) -> Prescription:
+        """A new Prescription, with time_btwn_dose worked out from the schedule if there is one."""
+        if schedule:
+            # Raises ValueError if it does not parse
+            time_btwn_dose = lazy_import("Schedule").compile_schedule(schedule).mean_gap_s()
+        return Prescription(
+            owner_ID, drug_name, doctor_name, time_btwn_dose, side_effects,
+            dosage, date_issued_year, date_issued_month, date_issued_day,
+            expiration_date_year, expiration_date_month, expiration_date_day, schedule or None
+        )
 
+    @instrumented("Database.get_prescription_by_ID")
+    def get_prescription_by_ID(self, ID: str) -> Prescription or None:
+        """Finds prescription in the loaded shards from a given unique ID. Returns None if no match exists."""
+        return self._prescription_index.get(ID)
+
+    def iter_all_prescriptions(self):
+        """Yields every prescription, including those in shards that are not loaded.
+        Shards read from disk here are not kept in memory, so the loaded shards stay as they are."""
+        with self.lock.read():
+            resident = dict(self._shards)
+        for shard in resident.values():
+            yield from shard
+        try:
+            file_names = os.listdir(self.PRESCRIPTION_DIR_NAME)
+        except OSError:
+            return
+        for file_name in file_names:
+            owner_ID, extension = os.path.splitext(file_name)
+            if extension != ".pkl" or owner_ID in resident:
+                continue
+            yield from self._read_shard(owner_ID)
+
+    @reading
+    def peek_shard(self, owner_ID: str) -> list[Prescription]:
+        """The given customer's prescriptions, like load_shard(), except that a shard that is not loaded is read
+        without being kept in memory. The loaded shards stay as they are, so nothing is evicted or saved.
+        Changes to the prescriptions of a shard that was not loaded are lost."""
+        owner_ID = str(owner_ID)
+        shard = self._shards.get(owner_ID)
+        return shard if shard is not None else self._read_shard(owner_ID)
+
+    @instrumented("Database.get_prescriptions_by_owner_ID")
+    @writing
     def get_prescriptions_by_owner_ID(self, user_id: str) -> tuple[Prescription] or None:
         """Find all prescriptions owned by the given user. Returns None if no match is found"""
-        result = []
-        for prescription in self.prescriptions:
-            if prescription.owner_ID == user_id:
-                result.append(prescription)
-
+        result = self.load_shard(user_id)
         return tuple(result) if len(result) != 0 else None
 
+    @instrumented("Database.edit_prescription")
+    @writing
+    def edit_prescription(self, ID: str, user_id: str, drug_name: str, doctor_name: str, time_btwn_dose: int,
+                          side_effects: str, dosage: str, date_issued_year: int, date_issued_month: int,
+                          date_issued_day: int, expiration_date_year: int, expiration_date_month: int,
+                          expiration_date_day: int, schedule: str = None) -> bool:
+        """Changes the details of the prescription with the given ID, as long as it belongs to the given user.
+        Its ID and dose history (was_taken, snooze, dose log) are kept. Returns whether it was changed.
+        The schedule is handled the same way as in add_prescription()."""
+        self.load_shard(user_id)
+        prescription = self._prescription_index.get(ID)
+        if (prescription is None) or (prescription.owner_ID != user_id):
+            return False
+
+        # A throwaway Prescription builds the dates the same way add_prescription() does
+        if schedule:
+            time_btwn_dose = lazy_import("Schedule").compile_schedule(schedule).mean_gap_s()
+        edited = Prescription(
+            user_id, drug_name, doctor_name, time_btwn_dose, side_effects,
+            dosage, date_issued_year, date_issued_month, date_issued_day,
+            expiration_date_year, expiration_date_month, expiration_date_day, schedule or None
+        )
+        for attribute in ("drug_name", "doctor_name", "time_btwn_dose", "side_effects", "dosage",
+                          "date_issued", "expiration_date", "schedule"):
+            setattr(prescription, attribute, getattr(edited, attribute))
+        self.events.publish(Events.EDITED, prescription)
+        return True
+
+    @instrumented("Database.delete_prescription_by_ID")
+    @writing
+    def delete_prescription_by_ID(self, ID: str, user_id: str) -> None:
+        """Deletes the prescription with the given ID, as long as it belongs to the given user."""
+        shard = self.load_shard(user_id)
+        prescription = self._prescription_index.get(ID)
+        if (prescription is not None) and (prescription.owner_ID == user_id):
+            self._shards[str(user_id)] = [p for p in shard if p is not prescription]
+            del self._prescription_index[ID]
+            self.events.publish(Events.DELETED, prescription)
+
+    @instrumented("Database.delete_prescription_by_drug_name")
+    @writing
     def delete_prescription_by_drug_name(self, drug_name: str, user_id: str) -> None:
-        """Given a drug name, will delete the given user's instance of that drug.
-
-        Yes, it doesn't use the (much better) ID to index results. This is because tkinter's OptionMenu
-        only lets you see what the actual name of the selection is, rather than giving an index or anything sensible."""
-
-        for idx in range(len(self.prescriptions)):
-            prescription = self.prescriptions[idx]
-            if (prescription.owner_ID == user_id) and (prescription.drug_name == drug_name):
-                self.prescriptions.pop(idx)
+        """Given a drug name, will delete the given user's first instance of that drug.
+        Prefer delete_prescription_by_ID(), since a user may have two prescriptions of the same drug."""
+
+        shard = self.load_shard(user_id)
+        for idx in range(len(shard)):
+            if shard[idx].drug_name == drug_name:
+                prescription = shard[idx]
+                self._shards[str(user_id)] = shard[:idx] + shard[idx + 1:]
+                self._prescription_index.pop(prescription.ID, None)
+                self.events.publish(Events.DELETED, prescription)
                 break
 
+    # DOSE HISTORY METHODS -----
+    @property
+    def dose_log(self):
+        """The taken/snoozed/missed history of every prescription (a DoseLog, see DoseLog.py)"""
+        if self._dose_log is None:
+            self._dose_log = lazy_import("DoseLog").DoseLog(self.DOSE_LOG_FILE_NAME)
+        return self._dose_log
+
+    @instrumented("Database.record_dose_event")
+    @writing
+    def record_dose_event(self, prescription_ID: str, event: int, when: datetime = None) -> None:
+        """Appends an event (DoseLog.TAKEN, SNOOZED or MISSED) to the dose history. Defaults to happening now.
+        Only the event is written, no prescription shard is saved."""
+        self.dose_log.append(prescription_ID, event, Clock.now() if when is None else when)
+
+    @instrumented("Database.mark_taken")
+    @writing
+    def mark_taken(self, ID: str, user_id: str, when: datetime = None) -> Prescription or None:
+        """Records a dose of the given user's prescription as taken, now unless given a time.
+        Returns the prescription, or None if the user has no prescription with that ID."""
+        prescription = self.get_user_prescription(ID, user_id)
+        if prescription is not None:
+            prescription.was_taken = Clock.now() if when is None else when
+            self.record_dose_event(ID, lazy_import("DoseLog").TAKEN, prescription.was_taken)
+            self.events.publish(Events.TAKEN, prescription)
+        return prescription
+
+    @instrumented("Database.snooze")
+    @writing
+    def snooze(self, ID: str, user_id: str, when: datetime = None, log: bool = True) -> Prescription or None:
+        """Snoozes the reminder of the given user's prescription from now, unless given a time (see
+        Notification.SNOOZE_TIME_MIN). The snooze is recorded in the dose history unless log is False.
+        Returns the prescription, or None if the user has no prescription with that ID."""
+        prescription = self.get_user_prescription(ID, user_id)
+        if prescription is not None:
+            prescription.snooze = Clock.now() if when is None else when
+            if log:
+                self.record_dose_event(ID, lazy_import("DoseLog").SNOOZED, prescription.snooze)
+            self.events.publish(Events.SNOOZED, prescription)
+        return prescription
+
+    @instrumented("Database.get_user_prescription")
+    @writing
+    def get_user_prescription(self, ID: str, user_id: str) -> Prescription or None:
+        """The prescription with the given ID if it belongs to the given user, loading their shard if needed."""
+        self.load_shard(user_id)
+        prescription = self._prescription_index.get(ID)
+        return prescription if (prescription is not None) and (prescription.owner_ID == user_id) else None
+
+    @property
+    def dose_calendar(self):
+        """Upcoming doses (a DoseCalendar, see Calendar.py). Made on first use and kept up to date from events."""
+        if self._dose_calendar is None:
+            with self.lock.write():
+                if self._dose_calendar is None:
+                    calendar = lazy_import("Calendar").DoseCalendar()
+                    self.events.subscribe(calendar.on_event,
+                                          kinds=(Events.EDITED, Events.DELETED, Events.TAKEN, Events.UNLOADED))
+                    self._dose_calendar = calendar
+        return self._dose_calendar
+
+    @instrumented("Database.get_dose_calendar")
+    @writing
+    def get_dose_calendar(self, user_id: str, days: int = None, now: datetime = None) -> list[tuple]:
+        """(dose time, Prescription) of every dose the given user is due to take from the start of today until
+        days later (Calendar.DEFAULT_DAYS unless given), in time order. See Calendar.py for how the times are worked
+        out and kept."""
+        Calendar = lazy_import("Calendar")
+        start, end = Calendar.day_window(Calendar.DEFAULT_DAYS if days is None else days, now)
+        return self.dose_calendar.doses(self.load_shard(user_id), start, end)
+
+    @writing
+    def close(self) -> None:
+        """Closes the files kept open by the database. Everything else is already closed after each save."""
+        if self._dose_log is not None:
+            self._dose_log.close()
+
+    # SHARD METHODS -----
+    def _shard_file_name(self, owner_ID: str) -> str:
+        """Path of the file holding the given customer's prescriptions"""
+        return os.path.join(self.PRESCRIPTION_DIR_NAME, f"{owner_ID}.pkl")
+
+    @instrumented("Database.load_shard")
+    @writing
+    def load_shard(self, owner_ID: str) -> list[Prescription]:
+        """Returns the list of prescriptions owned by the given customer, reading it from disk if it is not
+        already in memory. A customer without a shard file gets an empty list.
+
+        Loading a shard marks it as most recently used. If this pushes the number of resident shards over
+        MAX_RESIDENT_SHARDS, the least recently used shard is saved and dropped from memory."""
+        owner_ID = str(owner_ID)
+        if owner_ID in self._shards:
+            self._shards.move_to_end(owner_ID)
+            return self._shards[owner_ID]
+
+        shard = self._read_shard(owner_ID)
+        self._shards[owner_ID] = shard
+        for prescription in shard:
+            self._prescription_index[prescription.ID] = prescription
+        self._evict_shards()
+        return shard
+
+    def _read_shard(self, owner_ID: str) -> list[Prescription]:
+        """Reads a shard from disk. A customer without a shard file gets an empty list."""
+        try:
+            with self._file_lock, open(self._shard_file_name(owner_ID), "rb") as file:
+                return pickle.load(file)
+        except (OSError, ModuleNotFoundError):
+            return []
+
+    def _evict_shards(self) -> None:
+        """Drops least recently used shards until at most MAX_RESIDENT_SHARDS remain. Those that changed since
+        they were last saved are saved first."""
+        while len(self._shards) > self.MAX_RESIDENT_SHARDS:
+            owner_ID, shard = self._shards.popitem(last=False)
+            if owner_ID in self._dirty_shards:
+                self._save_shard(owner_ID, shard)
+            for prescription in shard:
+                self._prescription_index.pop(prescription.ID, None)
+                self.events.publish(Events.UNLOADED, prescription)
+
+    def _shard_changed(self, event) -> None:
+        """Subscribed to self.events. Marks the shard of a changed prescription as needing to be saved."""
+        self._dirty_shards.add(event.owner_ID)
+
+    @instrumented("Database.save_shard")
+    def _save_shard(self, owner_ID: str, shard: list[Prescription]) -> None:
+        """Writes a single shard to disk. Empty shards that were never saved are skipped so that customers
+        who never add a prescription don't leave empty files behind."""
+        file_name = self._shard_file_name(owner_ID)
+        if len(shard) == 0 and not os.path.exists(file_name):
+            self._dirty_shards.discard(owner_ID)
+            return
+
+        # Held for reading until the file is written, so a writer cannot save a newer copy of the shard first
+        with self.lock.read(), self._file_lock:
+            os.makedirs(self.PRESCRIPTION_DIR_NAME, exist_ok=True)
+            with open(file_name, "wb") as file:
+                pickle.dump(shard, file)
+                Instrumentation.add_bytes("Database.save_shard", file.tell())
+            self._dirty_shards.discard(owner_ID)
+
+    def _migrate_legacy_prescriptions(self) -> None:
+        """Splits the old single prescription file into per-owner shards.
+        The old file is left in place, but is ignored from then on since the shard directory exists."""
+        with open(self.PRESCRIPTION_FILE_NAME, "rb") as file:
+            legacy_prescriptions = pickle.load(file)
+
+        shards = {}
+        for prescription in legacy_prescriptions:
+            shards.setdefault(str(prescription.owner_ID), []).append(prescription)
+
+        os.makedirs(self.PRESCRIPTION_DIR_NAME, exist_ok=True)
+        for owner_ID, shard in shards.items():
+            self._save_shard(owner_ID, shard)
+
+    # INSTRUMENTATION -----
+    @staticmethod
+    def stats() -> dict:
+        """Snapshot of the call counts, latencies and saved byte counts recorded so far.
+        Everything is zero unless instrumentation is enabled, see Instrumentation.py."""
+        return Instrumentation.snapshot()
+
     # SAVING METHODS -----
+    @instrumented("Database.save_customers")
     def save_customers(self) -> None:
         """Save customers list to disk"""
-        with open(self.CUSTOMER_FILE_NAME, "wb") as file:
-            pickle.dump(self.customers, file)
+        with self.lock.read(), self._file_lock:
+            with open(self.CUSTOMER_FILE_NAME, "wb") as file:
+                pickle.dump(self.customers, file)
+                Instrumentation.add_bytes("Database.save_customers", file.tell())
 
+    @instrumented("Database.save_prescriptions")
     def save_prescriptions(self) -> None:
-        """Save prescriptions list to disk"""
-        with open(self.PRESCRIPTION_FILE_NAME, "wb") as file:
-            pickle.dump(self.prescriptions, file)
-
+        """Save every loaded prescription shard to disk"""
+        # One shard at a time, so writers can carry on in between
+        with self.lock.read():
+            owner_IDs = list(self._shards)
+        for owner_ID in owner_IDs:
+            self.save_shard(owner_ID)
+
+    @instrumented("Database.save_changed")
+    def save_changed(self) -> None:
+        """Save the loaded prescription shards that changed since they were last saved"""
+        with self.lock.read():
+            owner_IDs = [owner_ID for owner_ID in self._shards if owner_ID in self._dirty_shards]
+        for owner_ID in owner_IDs:
+            self.save_shard(owner_ID)
+
+    def save_shard(self, owner_ID: str) -> None:
+        """Save one customer's prescriptions to disk, if their shard is loaded"""
+        with self.lock.read():
+            shard = self._shards.get(str(owner_ID))
+            if shard is not None:
+                self._save_shard(str(owner_ID), shard)
+
+    @instrumented("Database.save_all")
     def save_all(self) -> None:
         """Save whole database to disk"""
         self.save_customers()
         self.save_prescriptions()
 
-    def load(self) -> None:
-        """Loads saved data from disk"""
+    @instrumented("Database.load")
+    @writing
+    def load(self, progress=None) -> None:
+        """Loads saved customers from disk. Prescriptions are not read here, see load_shard().
+
+        If given, progress(message, fraction) is called as the load goes along, with fraction going from 0 to 1.
+        It may be called from whichever thread runs the load."""
+        if progress is None:
+            progress = lambda message, fraction: None
+
         # Customers
+        progress("Loading customers", 0.0)
         try:
             with open(self.CUSTOMER_FILE_NAME, "rb") as file:
-                self.customers = pickle.load(file)
+                reader = _ProgressReader(file, os.fstat(file.fileno()).st_size,
+                                         lambda fraction: progress("Loading customers", fraction * 0.9))
+                self.customers = pickle.load(reader)
+            self._rebuild_customer_index()
         except (OSError, ModuleNotFoundError):
             print("No customer file could be loaded. Loading in defaults...")
             self.load_default_customers()
             self.save_customers()
 
         # Prescriptions
-        try:
-            with open(self.PRESCRIPTION_FILE_NAME, "rb") as file:
-                self.prescriptions = pickle.load(file)
-        except (OSError, ModuleNotFoundError):
-            print("No prescription file could be loaded. Loading in defaults...")
-            self.load_default_prescriptions()
-            self.save_prescriptions()
+        progress("Loading prescriptions", 0.9)
+        if not os.path.isdir(self.PRESCRIPTION_DIR_NAME):
+            try:
+                self._migrate_legacy_prescriptions()
+            except (OSError, ModuleNotFoundError):
+                print("No prescription file could be loaded. Loading in defaults...")
+                self.load_default_prescriptions()
+                self.save_prescriptions()
+
+        progress("Done", 1.0)
 
     def load_default_customers(self) -> None:
         """Loads 2 default customers into database. Assumes empty database, so does not check for username conflicts."""
@@ -139,7 +613,7 @@ class Database:
         NOTE: Needs default user `Satoru` to be in the database. Thus, this should only be run once default
         users are loaded.
         """
-        gojo = self.get_customer_by_username_password("thestr0ngest", "hollow&purple1989")
+        gojo = self.get_customer_by_username("thestr0ngest")
         self.add_prescription(gojo.ID, "Copium", "Gege Akutami", "604800", "Sudden torso separation.",
                               "500mg", 2023, 9, 25, 2024, 9, 29)
         self.add_prescription(gojo.ID, "Reverse Cursed Technique", "Ieiri Shoko", "120",
@@ -150,13 +624,50 @@ class Database:
                               1989, 9, 9, 2024, 9, 29)"""
 
     def __str__(self):
-        result = "Customers (" + str(len(self.customers)) + ") " + "-" * 10 + "\n"
-        for customer in self.customers:
-            result += " - " + str(customer) + "\n"
-        result += "Prescriptions (" + str(len(self.prescriptions)) + ") " + "-" * 10 + "\n"
-        for prescription in self.prescriptions:
-            result += " - " + str(prescription) + "\n"
-        return result
+        """Every customer (without passwords) and loaded prescription. Use Exporter.py to write out everything."""
+        prescriptions = self.prescriptions
+        lines = [f"Customers ({len(self.customers)}) " + "-" * 10]
+        lines.extend(f" - {customer}" for customer in self.customers)
+        lines.append(f"Prescriptions ({len(prescriptions)}) " + "-" * 10)
+        lines.extend(f" - {prescription}" for prescription in prescriptions)
+        return "\n".join(lines) + "\n"
+
+
+Instrumentation.register(Database)
+
+
+class _ProgressReader:
+    """Wraps a binary file for pickle.load() and reports how much of it has been read so far."""
+
+    REPORT_EVERY_BYTES = 1 << 20  # Report at most once per MiB so big files don't flood the callback
+
+    def __init__(self, file, total_bytes: int, report):
+        self.file = file
+        self.total_bytes = max(total_bytes, 1)
+        self.report = report  # Called with the fraction (0 to 1) of the file read so far
+        self.bytes_read = 0
+        self.last_report = 0
+
+    def _advance(self, count: int) -> None:
+        self.bytes_read += count
+        if self.bytes_read - self.last_report >= self.REPORT_EVERY_BYTES or self.bytes_read >= self.total_bytes:
+            self.last_report = self.bytes_read
+            self.report(min(self.bytes_read / self.total_bytes, 1.0))
+
+    def read(self, size=-1) -> bytes:
+        data = self.file.read(size)
+        self._advance(len(data))
+        return data
+
+    def readinto(self, buffer) -> int:
+        count = self.file.readinto(buffer)
+        self._advance(count)
+        return count
+
+    def readline(self, size=-1) -> bytes:
+        data = self.file.readline(size)
+        self._advance(len(data))
+        return data
 
 
 if __name__ == "__main__":
@@ -168,12 +679,18 @@ if __name__ == "__main__":
 
     db.CUSTOMER_FILE_NAME = "temp_cust.pkl"
     db.PRESCRIPTION_FILE_NAME = "temp_pscr.pkl"
+    db.PRESCRIPTION_DIR_NAME = "temp_pscr"
+    db.DOSE_LOG_FILE_NAME = "temp_dose_log.bin"
     db.save_all()
 
     db2 = Database()
     db2.CUSTOMER_FILE_NAME = db.CUSTOMER_FILE_NAME
     db2.PRESCRIPTION_FILE_NAME = db.PRESCRIPTION_FILE_NAME
+    db2.PRESCRIPTION_DIR_NAME = db.PRESCRIPTION_DIR_NAME
+    db2.DOSE_LOG_FILE_NAME = db.DOSE_LOG_FILE_NAME
     db2.load()
+    for customer in db2.customers:
+        db2.load_shard(customer.ID)
 
     print(str(db))
 
@@ -182,9 +699,26 @@ if __name__ == "__main__":
     else:
         print("Save/load test unsuccessful")
 
-    import os
+    # Changes are published, and save_changed() saves the shard they were in
+    events = []
+    db2.events.subscribe(events.append)
+    changed = db2.prescriptions[0]
+    db2.mark_taken(changed.ID, changed.owner_ID)
+    db2.delete_prescription_by_ID(changed.ID, changed.owner_ID)
+    assert [event.kind for event in events] == [Events.TAKEN, Events.DELETED]
+    db2.save_changed()
+    assert not db2._dirty_shards and changed.ID not in {p.ID for p in db2._read_shard(changed.owner_ID)}
+    db2.close()
+    print("Change events test successful")
+
+    import shutil
 
     if os.path.exists(db.CUSTOMER_FILE_NAME):
         os.remove(db.CUSTOMER_FILE_NAME)
     if os.path.exists(db.PRESCRIPTION_FILE_NAME):
         os.remove(db.PRESCRIPTION_FILE_NAME)
+    if os.path.isdir(db.PRESCRIPTION_DIR_NAME):
+        shutil.rmtree(db.PRESCRIPTION_DIR_NAME)
+    db.close()
+    if os.path.exists(db.DOSE_LOG_FILE_NAME):
+        os.remove(db.DOSE_LOG_FILE_NAME)
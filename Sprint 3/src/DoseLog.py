@@ -0,0 +1,93 @@
+"""
+Name: DoseLog.py
+Description: Append-only history of what happened to each medication reminder.
+
+Prescription.was_taken and Prescription.snooze only hold the latest state, so every "Medication Taken" click,
+snooze and missed dose is also written here as a fixed-width record:
+
+    bytes 0-15   prescription ID (the 16 raw bytes of its UUID)
+    byte  16     event type (TAKEN, SNOOZED or MISSED)
+    bytes 17-24  time of the event in seconds since the epoch (little-endian double)
+
+For MISSED the time is when the missed dose was due. Records are only ever appended, each with a single write,
+so adding one costs the same no matter how long the log is. If the program dies in the middle of a write, the
+incomplete record at the end of the file is ignored when reading.
+"""
+
+import os
+import struct
+import uuid
+from datetime import datetime
+
+TAKEN = 1
+SNOOZED = 2
+MISSED = 3
+EVENT_NAMES = {TAKEN: "taken", SNOOZED: "snoozed", MISSED: "missed"}
+
+RECORD = struct.Struct("<16sBd")
+RECORD_SIZE = RECORD.size  # 25 bytes
+
+
+class DoseLog:
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self._file = None  # Opened on the first append
+
+    def append(self, prescription_ID: str, event: int, when: datetime) -> None:
+        """Adds one event to the end of the log."""
+        if self._file is None:
+            directory = os.path.dirname(self.file_name)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Unbuffered, so every record reaches the file right away in one write call
+            self._file = open(self.file_name, "ab", buffering=0)
+        self._file.write(RECORD.pack(uuid.UUID(prescription_ID).bytes, event, when.timestamp()))
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def read_bytes(self) -> bytes:
+        """Raw contents of the log, cut down to whole records. Empty if there is no log yet."""
+        try:
+            with open(self.file_name, "rb") as file:
+                data = file.read()
+        except OSError:
+            return b""
+        return data[:len(data) - len(data) % RECORD_SIZE]
+
+    def __len__(self) -> int:
+        try:
+            return os.path.getsize(self.file_name) // RECORD_SIZE
+        except OSError:
+            return 0
+
+    def events(self, prescription_ID: str = None):
+        """Yields (prescription ID, event type, datetime) for every record, oldest first.
+        If a prescription ID is given, only that prescription's events are yielded."""
+        wanted = uuid.UUID(prescription_ID).bytes if prescription_ID is not None else None
+        for raw_ID, event, timestamp in RECORD.iter_unpack(self.read_bytes()):
+            if wanted is None or raw_ID == wanted:
+                yield str(uuid.UUID(bytes=raw_ID)), event, datetime.fromtimestamp(timestamp)
+
+
+if __name__ == "__main__":
+    # Quick sanity test: append, read back and survive a torn last record
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        log = DoseLog(os.path.join(temp_dir, "dose_log.bin"))
+        first, second = str(uuid.uuid4()), str(uuid.uuid4())
+        moment = datetime(2024, 4, 5, 8, 30)
+        log.append(first, TAKEN, moment)
+        log.append(second, SNOOZED, moment)
+        log.append(first, MISSED, moment)
+        log.close()
+
+        with open(log.file_name, "ab") as f:
+            f.write(b"\x00" * 7)  # Half-written record
+
+        assert len(log) == 3
+        assert list(log.events(first)) == [(first, TAKEN, moment), (first, MISSED, moment)]
+        print("Dose log test successful")
@@ -0,0 +1,164 @@
+"""
+Name: Events.py
+Description: Change events the Database publishes, and the bus that hands them to subscribers.
+
+Rather than rescanning every prescription to find out what changed, a part of the program subscribes to the
+Database's bus and is told about each change as it happens:
+
+    ADDED       A prescription was added.
+    EDITED      Its details were changed (Database.edit_prescription).
+    DELETED     It was deleted.
+    TAKEN       A dose was marked taken.
+    SNOOZED     Its reminder was snoozed.
+    REMINDED    Its reminder bookkeeping changed: held back for quiet hours, snooze over, missed doses logged.
+    UNLOADED    Its owner's shard was dropped from memory. Nothing changed, but the object is no longer the
+                one the Database hands out.
+
+Every event carries the prescription object as it is after the change (or as it was, for DELETED).
+
+Subscriptions are delivered in one of two ways:
+    * Synchronous: the callback runs inside publish(), in the thread that made the change and while that thread
+      holds the Database's lock. The state the callback sees is exactly the one right after the change. Callbacks
+      must be quick and must not wait for other threads.
+    * Queued: events are kept until drain() is called, which runs the callback on each of them in the calling
+      thread. A Tk window drains its queue from root.after(), a worker thread can loop on drain(timeout=...).
+
+    subscription = database.events.subscribe(on_change, kinds=(Events.ADDED, Events.DELETED), queued=True)
+    ...
+    subscription.drain()    # Calls on_change(event) for every event since the last drain
+    subscription.cancel()
+
+A callback that raises does not stop the other subscribers: the error is printed and counted as
+"events.failed" (see Instrumentation.py).
+"""
+
+import threading
+from collections import deque, namedtuple
+
+try:
+    import src.Instrumentation as Instrumentation
+except ImportError:
+    import Instrumentation as Instrumentation
+
+ADDED = "added"
+EDITED = "edited"
+DELETED = "deleted"
+TAKEN = "taken"
+SNOOZED = "snoozed"
+REMINDED = "reminded"
+UNLOADED = "unloaded"
+
+KINDS = (ADDED, EDITED, DELETED, TAKEN, SNOOZED, REMINDED, UNLOADED)
+CHANGES = (ADDED, EDITED, DELETED, TAKEN, SNOOZED, REMINDED)  # Every kind that means a shard has to be saved
+
+Event = namedtuple("Event", ("kind", "prescription_ID", "owner_ID", "prescription"))
+
+
+class Subscription:
+    def __init__(self, bus: "EventBus", callback, kinds, queued: bool):
+        self.bus = bus
+        self.callback = callback  # Called with each Event
+        self.kinds = frozenset(kinds) if kinds is not None else None  # None for every kind
+        self.queued = queued
+        self._queue = deque()
+        self._ready = threading.Condition(threading.Lock())
+
+    def __len__(self):
+        """Number of queued events not drained yet."""
+        return len(self._queue)
+
+    def deliver(self, event: Event) -> None:
+        if not self.queued:
+            _call(self.callback, event)
+            return
+        with self._ready:
+            self._queue.append(event)
+            self._ready.notify()
+
+    def drain(self, timeout: float = None) -> int:
+        """Runs the callback on every queued event, oldest first. Returns how many there were.
+        Given a timeout, waits up to that many seconds for an event if there are none yet."""
+        if timeout is not None and not self._queue:
+            with self._ready:
+                self._ready.wait_for(lambda: self._queue, timeout)
+        count = 0
+        while True:
+            try:
+                event = self._queue.popleft()
+            except IndexError:
+                return count
+            _call(self.callback, event)
+            count += 1
+
+    def cancel(self) -> None:
+        """Stops the deliveries. Events still queued are dropped."""
+        self.bus.unsubscribe(self)
+        self._queue.clear()
+
+
+class EventBus:
+    def __init__(self):
+        # Replaced rather than changed, so publish() can go through it without a lock while others subscribe
+        self._subscriptions = ()
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback, kinds=None, queued: bool = False) -> Subscription:
+        """Calls callback(event) for every event of the given kinds (all kinds if None). See the top of this file
+        for the difference between synchronous and queued subscriptions."""
+        subscription = Subscription(self, callback, kinds, queued)
+        with self._lock:
+            self._subscriptions += (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not subscription)
+
+    def publish(self, kind: str, prescription) -> None:
+        """Tells every subscriber to the kind that it happened to the prescription."""
+        subscriptions = self._subscriptions
+        if not subscriptions:
+            return
+        event = Event(kind, prescription.ID, prescription.owner_ID, prescription)
+        for subscription in subscriptions:
+            if subscription.kinds is None or kind in subscription.kinds:
+                subscription.deliver(event)
+        Instrumentation.count(f"events.{kind}")
+
+
+def _call(callback, event: Event) -> None:
+    try:
+        callback(event)
+    except Exception:
+        import traceback  # Slow to import and only needed when a subscriber fails
+        traceback.print_exc()
+        Instrumentation.count("events.failed")
+
+
+if __name__ == "__main__":
+    # Quick sanity test
+    from types import SimpleNamespace
+
+    bus = EventBus()
+    seen, queued = [], []
+    everything = bus.subscribe(seen.append)
+    deletions = bus.subscribe(queued.append, kinds=(DELETED,), queued=True)
+
+    prescription = SimpleNamespace(ID="p1", owner_ID="u1")
+    bus.publish(ADDED, prescription)
+    bus.publish(DELETED, prescription)
+    assert [event.kind for event in seen] == [ADDED, DELETED]
+    assert queued == [] and len(deletions) == 1
+    assert deletions.drain() == 1 and queued[0] == Event(DELETED, "p1", "u1", prescription)
+
+    # A worker thread waiting on a queued subscription
+    worker = threading.Thread(target=deletions.drain, args=(5,))
+    worker.start()
+    bus.publish(DELETED, prescription)
+    worker.join()
+    assert len(queued) == 2
+
+    everything.cancel()
+    bus.publish(EDITED, prescription)
+    assert [event.kind for event in seen] == [ADDED, DELETED, DELETED]
+    print("Events test successful")
@@ -0,0 +1,184 @@
+"""
+Name: Exporter.py
+Description: Exports customers and prescriptions to CSV, JSON-lines or a columnar .npz file.
+
+CSV and JSON-lines exports are streamed: rows are written as they are produced, and prescriptions are read one
+shard at a time (see Database.iter_all_prescriptions), so memory use does not grow with the size of the database.
+Passwords are never exported.
+
+The columnar export (.npz) holds one array per field, for analysis with NumPy (e.g. np.load("out.npz")["dosage"]).
+Text fields become unicode arrays, dates become datetime64[s] arrays (NaT where there is none) and numbers become
+int64 arrays. Since every array has to be complete before it is written, this export holds the selected fields of
+every exported row in memory, so selecting only the fields needed keeps it small. NumPy is only needed for this
+export.
+
+Every export can be limited to a selection of fields and to the customers with the given owner IDs.
+
+Run from the Sprint folder:
+    python -m src.Exporter customers customers.csv
+    python -m src.Exporter prescriptions prescriptions.jsonl --owner 1b9d6bcd-bbfd-4b2d-9b5d-ab8dfbbd4bed
+    python -m src.Exporter prescriptions doses.npz --fields owner_ID,drug_name,time_btwn_dose,was_taken
+"""
+
+import argparse
+import csv
+import json
+import os
+from datetime import datetime
+
+CUSTOMERS = "customers"
+PRESCRIPTIONS = "prescriptions"
+
+# Exportable fields, in the order they are written. The password is left out on purpose
+CUSTOMER_FIELDS = ("ID", "first_name", "last_name", "username", "email", "phone_number")
+PRESCRIPTION_FIELDS = ("ID", "owner_ID", "drug_name", "doctor_name", "time_btwn_dose", "schedule", "side_effects",
+                       "dosage", "date_issued", "expiration_date", "was_taken", "snooze", "last_missed")
+DATE_FIELDS = frozenset(("date_issued", "expiration_date", "was_taken", "snooze", "last_missed"))
+NUMBER_FIELDS = frozenset(("time_btwn_dose",))
+
+FORMATS = ("csv", "jsonl", "npz")
+
+
+def _fields(kind: str, fields) -> tuple:
+    """The selected fields, checked against the exportable ones. None selects all of them."""
+    allowed = CUSTOMER_FIELDS if kind == CUSTOMERS else PRESCRIPTION_FIELDS
+    if fields is None:
+        return allowed
+    fields = tuple(fields)
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"Cannot export {', '.join(unknown)}. Fields of {kind}: {', '.join(allowed)}")
+    return fields
+
+
+def _objects(database, kind: str, owner_IDs=None):
+    """Yields the customers or prescriptions to export, optionally only those of the given owners."""
+    if kind == CUSTOMERS:
+        if owner_IDs is None:
+            yield from database.customers
+        else:
+            for owner_ID in owner_IDs:
+                customer = database.get_customer_by_ID(owner_ID)
+                if customer is not None:
+                    yield customer
+    elif owner_IDs is None:
+        yield from database.iter_all_prescriptions()
+    else:
+        for owner_ID in owner_IDs:
+            yield from database.peek_shard(owner_ID)
+
+
+def _row(item, fields: tuple, numbers: list) -> tuple:
+    """Values of the fields of one object. numbers are the positions of the NUMBER_FIELDS among the fields."""
+    row = tuple(getattr(item, field, None) for field in fields)
+    if numbers:
+        # time_btwn_dose is saved as text by some older code paths (e.g. the default prescriptions)
+        row = tuple(int(value) if idx in numbers and value is not None else value
+                    for idx, value in enumerate(row))
+    return row
+
+
+def rows(database, kind: str, fields=None, owner_IDs=None):
+    """Yields one tuple of field values per exported object, in the order of the selected fields.
+    Fields missing from objects saved by older versions of the program are None."""
+    fields = _fields(kind, fields)
+    numbers = [idx for idx, field in enumerate(fields) if field in NUMBER_FIELDS]
+    for item in _objects(database, kind, owner_IDs):
+        yield _row(item, fields, numbers)
+
+
+def _text(value):
+    """Value as written to a CSV or JSON-lines file: dates in ISO format, numbers as numbers, None stays None."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def as_dict(item, kind: str, fields=None) -> dict:
+    """One customer or prescription as a dictionary that json can encode, the same as a JSON-lines row."""
+    fields = _fields(kind, fields)
+    numbers = [idx for idx, field in enumerate(fields) if field in NUMBER_FIELDS]
+    return dict(zip(fields, map(_text, _row(item, fields, numbers))))
+
+
+def write_csv(file, database, kind: str, fields=None, owner_IDs=None) -> int:
+    """Writes a header row and one row per object to an open text file. Returns the number of rows written."""
+    fields = _fields(kind, fields)
+    writer = csv.writer(file)
+    writer.writerow(fields)
+    count = 0
+    for row in rows(database, kind, fields, owner_IDs):
+        writer.writerow(["" if value is None else _text(value) for value in row])
+        count += 1
+    return count
+
+
+def write_jsonl(file, database, kind: str, fields=None, owner_IDs=None) -> int:
+    """Writes one JSON object per line to an open text file. Returns the number of rows written."""
+    fields = _fields(kind, fields)
+    encoder = json.JSONEncoder(ensure_ascii=False)
+    count = 0
+    for row in rows(database, kind, fields, owner_IDs):
+        file.write(encoder.encode(dict(zip(fields, map(_text, row)))))
+        file.write("\n")
+        count += 1
+    return count
+
+
+def write_npz(path: str, database, kind: str, fields=None, owner_IDs=None) -> int:
+    """Writes one array per field to a compressed .npz file. Returns the number of rows written."""
+    import numpy as np
+
+    fields = _fields(kind, fields)
+    columns = [[] for _ in fields]
+    for row in rows(database, kind, fields, owner_IDs):
+        for column, value in zip(columns, row):
+            column.append(value)
+
+    arrays = {}
+    for field, column in zip(fields, columns):
+        if field in DATE_FIELDS:
+            arrays[field] = np.array([value if value is not None else "NaT" for value in column],
+                                     dtype="datetime64[s]")
+        elif field in NUMBER_FIELDS:
+            arrays[field] = np.array(column, dtype=np.int64)
+        else:
+            arrays[field] = np.array(["" if value is None else str(value) for value in column], dtype=np.str_)
+    np.savez_compressed(path, **arrays)
+    return len(columns[0]) if columns else 0
+
+
+def export(database, kind: str, path: str, file_format: str = None, fields=None, owner_IDs=None) -> int:
+    """Exports customers or prescriptions to a file. The format is taken from the file extension (.csv, .jsonl
+    or .npz) unless given. Returns the number of rows written."""
+    if file_format is None:
+        file_format = os.path.splitext(path)[1].lower().lstrip(".")
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format {file_format!r}. Use one of {', '.join(FORMATS)}.")
+
+    if file_format == "npz":
+        return write_npz(path, database, kind, fields, owner_IDs)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = write_csv if file_format == "csv" else write_jsonl
+        return writer(file, database, kind, fields, owner_IDs)
+
+
+if __name__ == "__main__":
+    try:
+        from src.Database import Database
+    except ImportError:
+        from Database import Database
+
+    parser = argparse.ArgumentParser(description="Export customers or prescriptions to CSV, JSON-lines or .npz.")
+    parser.add_argument("kind", choices=(CUSTOMERS, PRESCRIPTIONS))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="Defaults to the file extension")
+    parser.add_argument("--fields", help="Comma separated fields to export, all of them by default")
+    parser.add_argument("--owner", action="append", help="Only export this customer's data (may be repeated)")
+    args = parser.parse_args()
+
+    db = Database()
+    db.load()
+    count = export(db, args.kind, args.path, args.format, args.fields.split(",") if args.fields else None,
+                   args.owner)
+    print(f"Exported {count} {args.kind} to {args.path}")
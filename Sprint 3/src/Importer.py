@@ -0,0 +1,187 @@
+"""
+Name: Importer.py
+Description: Bulk import of customers or prescriptions from CSV or JSON-lines files.
+
+Records flow through a pipeline of generators, so only one chunk is ever held in memory, however big the file:
+
+    parse     read the file a row at a time (csv.DictReader, or one json.loads per line)
+    validate  check every record with BatchValidator and convert it to Database arguments
+    dedupe    drop prescriptions the owner already has, or that appear earlier in the same file
+    insert    add the records CHUNK_SIZE at a time with Database.add_customers / add_prescriptions, which save
+              the customer list or each shard involved once per chunk rather than once per record
+
+Rejected and duplicate records are counted in the ImportReport, along with the first MAX_REJECTS_KEPT reasons.
+
+Importing customers is bound by password hashing (see Password.py). With Password.DEFAULT_POLICY each hash takes
+70-130ms of one core, so about 8-14 customers per second per core are imported (benchmarks/bench_import.py,
+default_policy_customers). Database.add_customers hashes on every core and without holding the database lock,
+so the rest of the program carries on during a long import. Prescriptions have no such cost.
+
+Files use the field names of BatchValidator (CUSTOMER_FIELDS and PRESCRIPTION_FIELDS). Prescriptions name their
+owner with an owner_ID or owner_username column, or take the --owner given on the command line.
+
+Run from the Sprint folder, with the program closed (it imports into the saved database):
+    python -m src.Importer customers clinic_patients.csv
+    python -m src.Importer prescriptions clinic_prescriptions.jsonl --chunk 5000
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from datetime import date
+
+try:
+    from src.BatchValidator import BatchValidator, FieldError
+except ImportError:
+    from BatchValidator import BatchValidator, FieldError
+
+CUSTOMERS = "customers"
+PRESCRIPTIONS = "prescriptions"
+CHUNK_SIZE = 1000
+MAX_REJECTS_KEPT = 100
+
+UNPARSABLE = "unparsable"  # Error code of lines that are not JSON objects, next to those of BatchValidator
+
+
+class ImportReport:
+    def __init__(self):
+        self.read = 0
+        self.imported = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.chunks = 0
+        self.seconds = 0.0
+        self.rejects = []  # (record index in the file, FieldError) of the first MAX_REJECTS_KEPT problems
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / self.seconds if self.seconds > 0 else 0.0
+
+    def reject(self, index: int, errors: list) -> None:
+        self.rejected += 1
+        for error in errors:
+            if len(self.rejects) < MAX_REJECTS_KEPT:
+                self.rejects.append((index, error))
+
+    def __str__(self):
+        lines = [f"Read {self.read} records in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s): "
+                 f"{self.imported} imported in {self.chunks} chunks, {self.rejected} rejected, "
+                 f"{self.duplicates} duplicates skipped"]
+        for index, error in self.rejects:
+            lines.append(f"    Record {index + 1}, {error.field}: {error.message} ({error.code})")
+        if self.rejected > len(self.rejects):
+            lines.append(f"    Only the first {MAX_REJECTS_KEPT} problems are listed.")
+        return "\n".join(lines)
+
+
+def parse(file, file_format: str, report: ImportReport):
+    """Yields each record of an open text file as a dict. file_format is "csv" or "jsonl".
+    JSON lines that are not an object are rejected, blank lines are skipped."""
+    if file_format == "csv":
+        for record in csv.DictReader(file):
+            report.read += 1
+            yield record
+        return
+
+    for line in file:
+        if not line.strip():
+            continue
+        report.read += 1
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if isinstance(record, dict):
+            yield record
+        else:
+            report.reject(report.read - 1, [FieldError("line", UNPARSABLE, "Each line must be a JSON object.")])
+
+
+def validate(records, validator: BatchValidator, kind: str, report: ImportReport, owner_ID: str = None):
+    """Yields the Database arguments of every record that passes validation."""
+    results = validator.customers(records) if kind == CUSTOMERS else validator.prescriptions(records, owner_ID)
+    for result in results:
+        if result.ok:
+            yield result.values
+        else:
+            # Each result comes right after its record was read, so the count of records read so far locates it
+            # in the file (result.index would not count the lines parse() rejected)
+            report.reject(report.read - 1, result.errors)
+
+
+def dedupe(rows, database, kind: str, report: ImportReport):
+    """Skips prescriptions with the same owner, drug, dosage and issue date as one the owner already has or an
+    earlier row of the import. Customers were already deduplicated by username in validate()."""
+    if kind == CUSTOMERS:
+        yield from rows
+        return
+
+    seen = {}  # Owner ID -> keys of their prescriptions, filled in from their shard the first time they come up
+    for row in rows:
+        keys = seen.get(row["owner_ID"])
+        if keys is None:
+            keys = seen[row["owner_ID"]] = {
+                (p.drug_name, p.dosage, p.date_issued.date()) for p in database.peek_shard(row["owner_ID"])
+            }
+        key = (row["drug_name"], row["dosage"],
+               date(row["date_issued_year"], row["date_issued_month"], row["date_issued_day"]))
+        if key in keys:
+            report.duplicates += 1
+            continue
+        keys.add(key)
+        yield row
+
+
+def insert(rows, database, kind: str, report: ImportReport, chunk_size: int = CHUNK_SIZE) -> None:
+    """Adds the rows to the database chunk_size at a time, saving once per chunk."""
+    add = database.add_customers if kind == CUSTOMERS else database.add_prescriptions
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            add(chunk)
+            report.imported += len(chunk)
+            report.chunks += 1
+            chunk = []
+    if chunk:
+        add(chunk)
+        report.imported += len(chunk)
+        report.chunks += 1
+
+
+def import_file(database, path: str, kind: str, owner_ID: str = None, chunk_size: int = CHUNK_SIZE,
+                file_format: str = None) -> ImportReport:
+    """Imports every valid record of a CSV or JSON-lines file into the database. The format is taken from the
+    file extension (.csv, or .jsonl/.ndjson) unless given."""
+    if file_format is None:
+        file_format = "csv" if os.path.splitext(path)[1].lower() == ".csv" else "jsonl"
+
+    report = ImportReport()
+    start = time.perf_counter()
+    with open(path, newline="", encoding="utf-8") as file:
+        records = parse(file, file_format, report)
+        rows = validate(records, BatchValidator(database), kind, report, owner_ID)
+        insert(dedupe(rows, database, kind, report), database, kind, report, chunk_size)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+if __name__ == "__main__":
+    try:
+        from src.Database import Database
+    except ImportError:
+        from Database import Database
+
+    parser = argparse.ArgumentParser(description="Import customers or prescriptions from a CSV or JSON-lines file.")
+    parser.add_argument("kind", choices=(CUSTOMERS, PRESCRIPTIONS))
+    parser.add_argument("path")
+    parser.add_argument("--owner", help="Owner ID of prescriptions that do not name one")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="Records added and saved at a time")
+    args = parser.parse_args()
+
+    db = Database()
+    db.load()
+    print(import_file(db, args.path, args.kind, args.owner, args.chunk))
+    db.close()
@@ -0,0 +1,222 @@
+"""
+Name: Instrumentation.py
+Description: Lightweight call counters, latency histograms and byte counters for the program's hot paths.
+
+Instrumentation is off unless the MAP_INSTRUMENT environment variable is set (to anything but 0) or enable()
+is called. While off, instrumented functions are the plain, unwrapped functions, so they cost nothing extra.
+enable() swaps timing wrappers in and disable() puts the originals back.
+
+Usage:
+    class Database:
+        @instrumented("Database.load")   # Count calls and time them under the given name
+        def load(self): ...
+    register(Database)                   # Once, after the class (or module) holding marked functions exists
+
+    Instrumentation.count("auth.failed")  # Bump a plain counter
+    Instrumentation.add_bytes("Database.save_customers", 1024)
+    Instrumentation.snapshot()            # Everything recorded so far as a dict (also see Database.stats())
+
+If MAP_STATS_FILE is set, configure_from_environment() also turns instrumentation on and writes a snapshot
+to that file every MAP_STATS_INTERVAL seconds (60 by default).
+"""
+
+import os
+import threading
+import time
+from functools import wraps
+
+ENABLE_ENV_VAR = "MAP_INSTRUMENT"
+DUMP_FILE_ENV_VAR = "MAP_STATS_FILE"
+DUMP_INTERVAL_ENV_VAR = "MAP_STATS_INTERVAL"
+DEFAULT_DUMP_INTERVAL_S = 60
+
+# Latency histogram buckets are powers of two of microseconds: bucket i holds calls that took less than 2^i µs
+# (bucket 0 is anything under 1µs). The last bucket catches everything slower than about 36 minutes.
+HISTOGRAM_BUCKETS = 32
+
+enabled = os.environ.get(ENABLE_ENV_VAR, "") not in ("", "0")
+
+_metrics = {}  # Name -> _Metric
+_counters = {}  # Name -> int
+_registered = []  # (class or module, attribute name, original function, metric name)
+_lock = threading.Lock()
+_dump_thread = None
+_dump_stop = threading.Event()
+
+
+class _Metric:
+    """Call count, total and max latency, latency histogram and byte count of one instrumented name."""
+
+    __slots__ = ("calls", "total_s", "max_s", "histogram", "bytes")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+        self.bytes = 0
+
+    def percentile_s(self, fraction: float) -> float:
+        """Upper bound of the latency below which the given fraction of calls fall, read from the histogram."""
+        target = self.calls * fraction
+        seen = 0
+        for idx, calls in enumerate(self.histogram):
+            seen += calls
+            if calls and seen >= target:
+                return (1 << idx) / 1e6
+        return self.max_s
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "total_s": self.total_s,
+            "mean_s": self.total_s / self.calls if self.calls else 0.0,
+            "max_s": self.max_s,
+            "p50_s": self.percentile_s(0.5),
+            "p99_s": self.percentile_s(0.99),
+            "histogram_us": {f"<{1 << idx}": calls for idx, calls in enumerate(self.histogram) if calls},
+            "bytes": self.bytes,
+        }
+
+
+def enable() -> None:
+    """Starts recording. Swaps every registered function for its timing wrapper."""
+    global enabled
+    enabled = True
+    for namespace, attribute, func, name in _registered:
+        setattr(namespace, attribute, _timing_wrapper(func, name))
+
+
+def disable() -> None:
+    """Stops recording. Puts every registered function back to the original."""
+    global enabled
+    enabled = False
+    for namespace, attribute, func, name in _registered:
+        setattr(namespace, attribute, func)
+
+
+def _metric(name: str) -> _Metric:
+    metric = _metrics.get(name)
+    if metric is None:
+        metric = _metrics.setdefault(name, _Metric())
+    return metric
+
+
+def record(name: str, seconds: float) -> None:
+    """Adds one call that took the given number of seconds."""
+    bucket = min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)
+    with _lock:
+        metric = _metric(name)
+        metric.calls += 1
+        metric.total_s += seconds
+        if seconds > metric.max_s:
+            metric.max_s = seconds
+        metric.histogram[bucket] += 1
+
+
+def add_bytes(name: str, amount: int) -> None:
+    """Adds to the byte count of the given name. Does nothing while instrumentation is off."""
+    if not enabled:
+        return
+    with _lock:
+        _metric(name).bytes += amount
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Adds to a plain counter. Does nothing while instrumentation is off."""
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def instrumented(name: str):
+    """Decorator that marks a function to be counted and timed under the given name while enabled.
+    The function itself is returned unchanged. register() must be called on the class or module holding it."""
+    def decorate(func):
+        func.__instrument_name__ = name
+        return func
+    return decorate
+
+
+def _timing_wrapper(func, name: str):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record(name, time.perf_counter() - start)
+    return wrapper
+
+
+def register(namespace) -> None:
+    """Makes the functions marked with @instrumented in the given class or module switchable by enable()."""
+    for attribute, value in list(vars(namespace).items()):
+        name = getattr(value, "__instrument_name__", None)
+        if name is None:
+            continue
+        _registered.append((namespace, attribute, value, name))
+        if enabled:
+            setattr(namespace, attribute, _timing_wrapper(value, name))
+
+
+def snapshot() -> dict:
+    """Copy of everything recorded so far."""
+    with _lock:
+        return {
+            "enabled": enabled,
+            "time": time.time(),
+            "metrics": {name: metric.to_dict() for name, metric in sorted(_metrics.items())},
+            "counters": dict(sorted(_counters.items())),
+        }
+
+
+def reset() -> None:
+    """Forgets everything recorded so far."""
+    with _lock:
+        _metrics.clear()
+        _counters.clear()
+
+
+def dump(path: str) -> None:
+    """Writes a snapshot to the given file as JSON. The file is replaced in one step so readers never see
+    half of it."""
+    import json  # Nothing else here needs json, so it is not imported at startup
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as file:
+        json.dump(snapshot(), file, indent=2)
+    os.replace(temp_path, path)
+
+
+def start_periodic_dump(path: str, interval_s: float = DEFAULT_DUMP_INTERVAL_S) -> None:
+    """Dumps a snapshot to the given file every interval_s seconds from a background thread."""
+    global _dump_thread
+    stop_periodic_dump()
+    _dump_stop.clear()
+
+    def run():
+        while not _dump_stop.wait(interval_s):
+            try:
+                dump(path)
+            except OSError as error:
+                print(f"Could not write instrumentation stats to {path}: {error}")
+
+    _dump_thread = threading.Thread(target=run, name="stats-dump", daemon=True)
+    _dump_thread.start()
+
+
+def stop_periodic_dump() -> None:
+    global _dump_thread
+    if _dump_thread is not None:
+        _dump_stop.set()
+        _dump_thread.join()
+        _dump_thread = None
+
+
+def configure_from_environment() -> None:
+    """Starts the periodic dump if MAP_STATS_FILE is set. Instrumentation is switched on in that case too."""
+    path = os.environ.get(DUMP_FILE_ENV_VAR)
+    if path:
+        enable()
+        start_periodic_dump(path, float(os.environ.get(DUMP_INTERVAL_ENV_VAR, DEFAULT_DUMP_INTERVAL_S)))
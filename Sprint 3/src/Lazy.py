@@ -0,0 +1,20 @@
+"""
+Name: Lazy.py
+Description: Imports this project's modules the first time they are needed rather than at startup.
+
+    Medication = lazy_import("Medication")
+
+is the same module as `import src.Medication` when the program runs from the Sprint folder, or `import Medication`
+when a module is run from inside src, so both ways of running the code share one copy of each module.
+Python caches modules after their first import, so later calls are a dictionary lookup.
+"""
+
+import importlib
+
+_PACKAGE_PREFIX = __package__ + "." if __package__ else ""
+
+
+def lazy_import(module_name: str):
+    """Imports one of this project's modules by name, the same way it would have been imported at the top of a
+    file."""
+    return importlib.import_module(_PACKAGE_PREFIX + module_name)
@@ -12,19 +12,65 @@ except ImportError:
     import ttk
 
 try:
+    from src.Resources import get_icon, window_pool, PooledWindow
     from src.Validator import Validator
+    from src.Widgets import VirtualList
+    import src.Clock as Clock
 except ImportError:
+    from Resources import get_icon, window_pool, PooledWindow
     from Validator import Validator
+    from Widgets import VirtualList
+    import Clock as Clock
 
 TITLE_FONT = ('Magneto', 24)  # Goofy font bc why not
 
 
-class MedicationMenuWindow:
-    """Shows the main screen [PRO01] with the options for managing prescriptions shown and nothing else."""
+class _WatchesPrescriptions:
+    """Mixin for the windows that show the current user's prescriptions. While such a window is open, it is
+    refreshed whenever those prescriptions change, whichever thread changed them (a reminder, the local server,
+    another window). The changes are queued (see Events.py) and picked up on the Tk thread every
+    WATCH_INTERVAL_MS."""
+
+    WATCH_INTERVAL_MS = 500
+
+    def watch_prescriptions(self, refresh):
+        """Calls refresh() after the current user's prescriptions change, until the window is closed."""
+        self.stop_watching()
+        self._refresh_on_change = refresh
+        self._changed = False
+        self._changes = self.database.events.subscribe(self._note_change, queued=True)
+        self._watch_job = self.root.after(self.WATCH_INTERVAL_MS, self._check_changes)
+
+    def stop_watching(self):
+        if getattr(self, "_changes", None) is not None:
+            self._changes.cancel()
+            self._changes = None
+            self.root.after_cancel(self._watch_job)
+
+    def _note_change(self, event):
+        if event.owner_ID == self.current_user.get():
+            self._changed = True
+
+    def _check_changes(self):
+        self._changes.drain()
+        if self._changed:
+            self._changed = False
+            self._refresh_on_change()
+        self._watch_job = self.root.after(self.WATCH_INTERVAL_MS, self._check_changes)
+
+    def close_window(self, e=None):
+        self.stop_watching()
+        super().close_window(e)
+
+
+class MedicationMenuWindow(PooledWindow):
+    """Shows the main screen [PRO01] with the options for managing prescriptions shown and nothing else.
+    Opened through window_pool, so closing it only hides it."""
 
     def __init__(self, database, current_user):
         # Open new window
         self.root = tk.Toplevel()
+        self.init_pooled_window()
 
         # Database
         self.database = database
@@ -46,6 +92,11 @@ class MedicationMenuWindow:
         self.create_title_bar()
         self.create_buttons()
 
+    def reopen(self, database, current_user):
+        """Reuse this window for the given user. Nothing else on this window holds state."""
+        self.database = database
+        self.current_user = current_user
+
     def init_root(self):
         """Configure any window elements such as title, size, etc."""
 
@@ -56,12 +107,11 @@ class MedicationMenuWindow:
         self.root.rowconfigure(0, weight=1)
 
         # Window size
-        self.root.geometry('450x150')
+        self.root.geometry('560x150')
         self.root.resizable(width=True, height=True)
 
         # Window Logo
-        logo = tk.PhotoImage(file='./assets/medical_icon.png')
-        self.root.iconphoto(False, logo)
+        self.root.iconphoto(False, get_icon(self.root))
 
     def init_frames(self):
         """Configure the main and button frames."""
@@ -72,6 +122,7 @@ class MedicationMenuWindow:
         self.main_frame.columnconfigure(0, weight=1)
         self.main_frame.columnconfigure(1, weight=1)
         self.main_frame.columnconfigure(2, weight=1)
+        self.main_frame.columnconfigure(3, weight=1)
         self.main_frame.rowconfigure(self.TOP_ROW, weight=1)
 
     def create_title_bar(self):
@@ -83,11 +134,12 @@ class MedicationMenuWindow:
         )
 
     def create_buttons(self):
-        """Create the three option buttons to select which prescription operation to execute."""
+        """Create the option buttons to select which prescription operation to execute."""
         buttonContents = (
             ("Add Prescription", self.click_add_prescription),
             ("Edit Prescriptions", self.click_edit_prescriptions),
-            ("Delete Prescriptions", self.click_delete_prescriptions)
+            ("Delete Prescriptions", self.click_delete_prescriptions),
+            ("Dose Calendar", self.click_dose_calendar)
         )
 
         for idx in range(len(buttonContents)):
@@ -96,24 +148,28 @@ class MedicationMenuWindow:
             )
 
     def click_add_prescription(self):
-        win = AddMedicationWindow("Add Prescription", self.database, self.current_user)
-        win.root.bind("<Destroy>", self.option_window_close)
+        win = window_pool.acquire(AddMedicationWindow, "Add Prescription", self.database, self.current_user)
+        win.set_close_callback(self.option_window_close)
 
     def click_edit_prescriptions(self):
-        win = EditMedicationWindow("Edit Prescription", self.database, self.current_user)
-        win.root.bind("<Destroy>", self.option_window_close)
+        win = window_pool.acquire(EditMedicationWindow, "Edit Prescription", self.database, self.current_user)
+        win.set_close_callback(self.option_window_close)
 
     def click_delete_prescriptions(self):
-        win = DeleteMedicationWindow(self.database, self.current_user)
-        win.root.bind("<Destroy>", self.option_window_close)
+        win = window_pool.acquire(DeleteMedicationWindow, self.database, self.current_user)
+        win.set_close_callback(self.option_window_close)
+
+    def click_dose_calendar(self):
+        win = window_pool.acquire(CalendarWindow, self.database, self.current_user)
+        win.set_close_callback(self.root.focus)
 
     def option_window_close(self, e=None):
         """Runs when any of the prescription option windows close."""
-        self.database.save_prescriptions()
+        self.database.save_changed()
         self.root.focus()
 
 
-class _MedicationInputParent:
+class _MedicationInputParent(PooledWindow):
     """Since the add and edit prescription windows are very nearly identical, this parent class implements
     the shared input boxes, window configuration, etc. for both and is used as a superclass.
 
@@ -125,6 +181,7 @@ class _MedicationInputParent:
     def __init__(self, window_title, done_func, database, current_user, drug_name_immutable=False):
         # Open new window
         self.root = tk.Toplevel()
+        self.init_pooled_window()
         self.title = tk.StringVar()
         self.title.set(window_title)
 
@@ -148,6 +205,7 @@ class _MedicationInputParent:
             "date_issued": (tk.StringVar(), tk.StringVar(), tk.StringVar()),
             "dosage": tk.StringVar(),
             "time_btwn_dose": tk.StringVar(),
+            "schedule": tk.StringVar(),  # Optional schedule expression, replaces time_btwn_dose when filled in
             "expiration_date": (tk.StringVar(), tk.StringVar(), tk.StringVar()),
             "side_effects": tk.StringVar()
         }
@@ -176,6 +234,25 @@ class _MedicationInputParent:
         # Event bindings
         self.root.bind("<KeyPress-Return>", self.done_func)
 
+    def reopen(self, window_title, database, current_user):
+        """Reuse this window for the given user. Puts every input box back to how a new window shows it."""
+        self.title.set(window_title)
+        self.root.title(f'{self.title.get()}: Medical Adherence Software - Group 7')
+        self.database = database
+        self.current_user = current_user
+        self.reset_fields()
+
+    def reset_fields(self):
+        """Clears all input boxes and resets the date placeholders and duration selector."""
+        for key, value in self.prescription_data.items():
+            if isinstance(value, tuple):
+                value[0].set("MM")
+                value[1].set("DD")
+                value[2].set("YYYY")
+            else:
+                value.set("")
+        self.selected_duration_mod.set(self.duration_mods[0][3])
+
     def init_root(self):
         """Configure any window elements such as title, size, etc."""
 
@@ -186,12 +263,11 @@ class _MedicationInputParent:
         self.root.rowconfigure(0, weight=1)
 
         # Window size
-        self.root.geometry('450x330')
+        self.root.geometry('450x385')
         self.root.resizable(width=True, height=True)
 
         # Window Logo
-        logo = tk.PhotoImage(file='./assets/medical_icon.png')
-        self.root.iconphoto(False, logo)
+        self.root.iconphoto(False, get_icon(self.root))
 
     def init_frames(self):
         """Configure the main and button frames."""
@@ -263,6 +339,23 @@ class _MedicationInputParent:
             padx=5, pady=5, sticky="NSEW"
         )
 
+        # Optional schedule expression, for doses at set times of day rather than a fixed time apart
+        anchor_row += 1
+        tk.Label(self.main_frame, text="Schedule (optional)").grid(
+            column=0, row=anchor_row,
+            columnspan=1, sticky="NSEW", padx=5, pady=(5, 0)
+        )
+        tk.Entry(self.main_frame, textvariable=self.prescription_data["schedule"]).grid(
+            column=1, row=anchor_row,
+            columnspan=self.COL_WIDTH - 1, sticky="NSEW", padx=10, pady=(5, 0)
+        )
+        anchor_row += 1
+        tk.Label(self.main_frame, text='e.g. "8am, 8pm" or "weekdays 9:00". Replaces Time Between Dose.',
+                 font=("TkDefaultFont", 8), foreground="grey").grid(
+            column=1, row=anchor_row,
+            columnspan=self.COL_WIDTH - 1, sticky="NSW", padx=10, pady=(0, 5)
+        )
+
         # Date inputs
         for idx in range(len(date_items)):
             item = date_items[idx]
@@ -293,7 +386,7 @@ class _MedicationInputParent:
 
         # Create done and cancel buttons
         anchor_row += len(date_items)
-        ttk.Button(self.main_frame, text="Cancel", command=self.root.destroy).grid(
+        ttk.Button(self.main_frame, text="Cancel", command=self.close_window).grid(
             column=self.COL_WIDTH - 2, row=anchor_row,
             columnspan=1, sticky="SEW", padx=5, pady=8
         )
@@ -303,8 +396,23 @@ class _MedicationInputParent:
             columnspan=1, sticky="SEW", padx=5, pady=8
         )
 
+    def check_dose_timing(self, validator: Validator) -> None:
+        """Validates the schedule if one was entered, otherwise the time between doses."""
+        schedule = self.get_schedule_from_entry()
+        if schedule is not None:
+            validator.check_valid_schedule(schedule)
+        else:
+            validator.check_can_be_int(self.prescription_data["time_btwn_dose"].get(), "Time Between Dose")
+
+    def get_schedule_from_entry(self) -> str or None:
+        """The schedule expression typed in, or None if the box is blank."""
+        return self.prescription_data["schedule"].get().strip() or None
+
     def get_time_btwn_dose_from_entry(self) -> int:
-        """Convert time_between_dosage value into an integer number of seconds."""
+        """Convert time_between_dosage value into an integer number of seconds.
+        Returns 0 if a schedule was entered, since the database then works it out from the schedule."""
+        if self.get_schedule_from_entry() is not None:
+            return 0
         time_btwn_dose = int(int(self.prescription_data["time_btwn_dose"].get()) *
                              self.duration_mods[1][self.duration_mods[0].index(self.selected_duration_mod.get())])
         return time_btwn_dose
@@ -337,7 +445,7 @@ class AddMedicationWindow(_MedicationInputParent):
         validator = Validator()
         validator.check_dates_are_valid(self.prescription_data)
         validator.check_str_not_blank(self.prescription_data["drug_name"].get(), "Drug Name")
-        validator.check_can_be_int(self.prescription_data["time_btwn_dose"].get(), "Time Between Dose")
+        self.check_dose_timing(validator)
 
         if validator.no_failures():
             # Automatically add "mg" to dosage
@@ -359,9 +467,10 @@ class AddMedicationWindow(_MedicationInputParent):
                 int(self.prescription_data["expiration_date"][2].get()),  # year
                 int(self.prescription_data["expiration_date"][0].get()),  # month
                 int(self.prescription_data["expiration_date"][1].get()),  # day
+                self.get_schedule_from_entry()
             )
 
-            self.root.destroy()
+            self.close_window()
 
         else:
             validator.display_failures()
@@ -373,17 +482,25 @@ class _ViewMedicationParent(_MedicationInputParent):
         super().__init__(window_title, click_done_button_func, database, current_user, drug_name_immutable=True)
 
         # Window size
-        self.root.geometry('450x350')
+        self.root.geometry('450x405')
 
-        # OptionMenu selection variable
+        # ID of the selected prescription
         self.selection = tk.StringVar()
 
         self.update_prescription_selection()
 
-        # Update prescription data fields when OptionMenu selection changes.
+        # Update prescription data fields when the selection changes.
         self.selection.trace_add("write", self.update_prescription_selection)
 
-        # Check that prescriptions exist to edit. If not, show an alert then close the window.
+        self.check_has_prescriptions()
+
+    def reopen(self, window_title, database, current_user):
+        super().reopen(window_title, database, current_user)
+        self.selection.set("")
+        self.check_has_prescriptions()
+
+    def check_has_prescriptions(self):
+        """Check that prescriptions exist to edit. If not, show an alert then close the window."""
         validator = Validator()
         validator.check_user_has_prescriptions(self.current_user.get(), self.database)
         if not validator.no_failures():
@@ -391,61 +508,71 @@ class _ViewMedicationParent(_MedicationInputParent):
             win.root.bind("<Destroy>", self.close_window)
 
     def update_prescription_selection(self, *e):
-        """Runs when a new prescription is selected from the option menu."""
-        for prescription in self.database.prescriptions:
-            if (prescription.owner_ID == self.current_user.get()) and (prescription.drug_name == self.selection.get()):
-                self.prescription_data["drug_name"].set(prescription.drug_name)
-                self.prescription_data["doctor"].set(prescription.doctor_name)
-                self.prescription_data["side_effects"].set(prescription.side_effects)
-                self.prescription_data["dosage"].set(prescription.dosage)
-                self.prescription_data["date_issued"][2].set(prescription.date_issued.year)  # year
-                self.prescription_data["date_issued"][0].set(prescription.date_issued.month)  # month
-                self.prescription_data["date_issued"][1].set(prescription.date_issued.day)  # day
-                self.prescription_data["expiration_date"][2].set(prescription.expiration_date.year)  # year
-                self.prescription_data["expiration_date"][0].set(prescription.expiration_date.month)  # month
-                self.prescription_data["expiration_date"][1].set(prescription.expiration_date.day)  # day
-
-                # Set time between dose and duration mod combobox
-                info = self.get_time_btwn_dose_info(prescription.time_btwn_dose)
-                self.prescription_data["time_btwn_dose"].set(info[0])
-                self.selected_duration_mod.set(info[1])
-                break
-
-    def close_window(self, e=None):
-        """Callback helper"""
-        self.root.destroy()
+        """Runs when a new prescription is selected."""
+        prescription = self.database.get_prescription_by_ID(self.selection.get())
+        if (prescription is None) or (prescription.owner_ID != self.current_user.get()):
+            return
+
+        self.prescription_data["drug_name"].set(prescription.drug_name)
+        self.prescription_data["doctor"].set(prescription.doctor_name)
+        self.prescription_data["side_effects"].set(prescription.side_effects)
+        self.prescription_data["dosage"].set(prescription.dosage)
+        self.prescription_data["date_issued"][2].set(prescription.date_issued.year)  # year
+        self.prescription_data["date_issued"][0].set(prescription.date_issued.month)  # month
+        self.prescription_data["date_issued"][1].set(prescription.date_issued.day)  # day
+        self.prescription_data["expiration_date"][2].set(prescription.expiration_date.year)  # year
+        self.prescription_data["expiration_date"][0].set(prescription.expiration_date.month)  # month
+        self.prescription_data["expiration_date"][1].set(prescription.expiration_date.day)  # day
+
+        # Set time between dose and duration mod combobox
+        info = self.get_time_btwn_dose_info(prescription.time_btwn_dose)
+        self.prescription_data["time_btwn_dose"].set(info[0])
+        self.selected_duration_mod.set(info[1])
+        self.prescription_data["schedule"].set(getattr(prescription, "schedule", None) or "")
 
 
 class ViewMedicationWindow(_ViewMedicationParent):
     def __init__(self, window_title, database, current_user, prescription):
         super().__init__(window_title, database, current_user, self.close_window)
 
-        self.selection.set(prescription.drug_name)
+        self.selection.set(prescription.ID)
         self.update_prescription_selection()
 
+    def reopen(self, window_title, database, current_user, prescription):
+        super().reopen(window_title, database, current_user)
+        self.selection.set(prescription.ID)
+
 
-class EditMedicationWindow(_ViewMedicationParent):
+class EditMedicationWindow(_WatchesPrescriptions, _ViewMedicationParent):
     def __init__(self, window_title, database, current_user):
+        # Widgets defined in create_prescription_selection()
+        self.selection_label = None
+        self.selection_list = None
+
         super().__init__(window_title, database, current_user, self.click_done_button)
 
+        # Window size, taller than the view window to fit the selection list
+        self.root.geometry('450x535')
+
         self.create_prescription_selection()
+        self.watch_prescriptions(self.refresh_prescription_selection)
+
+    def reopen(self, window_title, database, current_user):
+        super().reopen(window_title, database, current_user)
+        self.refresh_prescription_selection()
+        self.watch_prescriptions(self.refresh_prescription_selection)
 
     def click_done_button(self, e=None):
         # Run validation tests
         validator = Validator()
         validator.check_dates_are_valid(self.prescription_data)
         validator.check_str_not_blank(self.prescription_data["drug_name"].get(), "Drug Name")
-        validator.check_can_be_int(self.prescription_data["time_btwn_dose"].get(), "Time Between Dose")
+        self.check_dose_timing(validator)
 
         if validator.no_failures():
-            # Delete the old prescription
-            self.database.delete_prescription_by_drug_name(
+            # Update the prescription in place so it keeps its ID and dose history
+            self.database.edit_prescription(
                 self.selection.get(),
-                self.current_user.get()
-            )
-
-            # Add the edited prescription
-            self.database.add_prescription(
                 self.current_user.get(),
                 self.prescription_data["drug_name"].get(),
                 self.prescription_data["doctor"].get(),
@@ -458,55 +585,61 @@ class EditMedicationWindow(_ViewMedicationParent):
                 int(self.prescription_data["expiration_date"][2].get()),  # year
                 int(self.prescription_data["expiration_date"][0].get()),  # month
                 int(self.prescription_data["expiration_date"][1].get()),  # day
+                self.get_schedule_from_entry()
             )
 
-            self.root.destroy()
+            self.close_window()
 
         else:
             validator.display_failures()
 
     def create_prescription_selection(self):
-        """Creates the selection box that allows the user to pick from their medications."""
-        # Get an iterable list of the user's prescriptions and a copy with just the names.
+        """Creates the selection list that allows the user to pick from their medications."""
+        # Create label
+        self.selection_label = ttk.Label(self.main_frame, text="Select Prescription:")
+        self.selection_label.grid(
+            column=0, row=self.TOP_ROW - 1,
+            columnspan=1, rowspan=1,
+            padx=5, pady=10, sticky="NEW"
+        )
+
+        # Create selection widget
+        self.selection_list = VirtualList(self.main_frame, self.selection)
+        self.selection_list.grid(
+            column=1, row=self.TOP_ROW - 1,
+            columnspan=self.COL_WIDTH - 1, rowspan=1,
+            padx=5, pady=10, sticky="NSEW"
+        )
+
+        self.refresh_prescription_selection()
+
+    def refresh_prescription_selection(self):
+        """Fills the selection list with the current user's prescriptions."""
         user_prescription_data = self.database.get_prescriptions_by_owner_ID(self.current_user.get())
 
         # Check if user has any prescriptions
-        # If user has no prescriptions, show a blank box.
+        # If user has no prescriptions, hide the list.
         if user_prescription_data is None:
             self.selection.set("")
-            ttk.Label(self.main_frame, text="Current user has no prescriptions to edit!").grid(
-                column=0, row=self.TOP_ROW - 1,
-                columnspan=1, rowspan=1,
-                padx=5, pady=10, sticky="NSEW"
-            )
+            self.selection_label["text"] = "Current user has no prescriptions to edit!"
+            self.selection_list.grid_remove()
             self.done_button.state(['disabled'])  # Disable the done button if no prescriptions exist
 
         # If user has prescriptions, do as normal
         else:
-            user_prescription_names = [x.drug_name for x in user_prescription_data]
-            # Create label
-            ttk.Label(self.main_frame, text="Select Prescription:").grid(
-                column=0, row=self.TOP_ROW - 1,
-                columnspan=1, rowspan=1,
-                padx=5, pady=10, sticky="NSEW"
-            )
-
-            # Create selection widget
-            combobox = ttk.OptionMenu(self.main_frame, self.selection,
-                                      user_prescription_names[0], *user_prescription_names)
-            combobox.grid(
-                column=1, row=self.TOP_ROW - 1,
-                columnspan=self.COL_WIDTH - 1, rowspan=1,
-                padx=5, pady=10, sticky="NSEW"
-            )
+            self.selection_label["text"] = "Select Prescription:"
+            self.selection_list.grid()
+            self.selection_list.set_items((x.ID, f"{x.drug_name} ({x.dosage})") for x in user_prescription_data)
+            self.done_button.state(['!disabled'])
 
 
-class DeleteMedicationWindow:
+class DeleteMedicationWindow(_WatchesPrescriptions, PooledWindow):
     """Allows the user to select a medication to delete"""
 
     def __init__(self, database, current_user):
         # Open new window
         self.root = tk.Toplevel()
+        self.init_pooled_window()
 
         # Database
         self.database = database
@@ -522,15 +655,31 @@ class DeleteMedicationWindow:
         # Colors
         self.DARK_GREY = "#b3b3b3"
 
-        # Holds name of to-be-deleted prescription
+        # Holds ID of to-be-deleted prescription
         self.selection = tk.StringVar()
 
+        # Widgets defined in other functions
+        self.selection_label = None  # create_prescription_selection
+        self.selection_list = None  # create_prescription_selection
+        self.delete_button = None  # create_buttons
+
         # Run all the functions that create the window
         self.init_root()
         self.init_frames()
         self.create_title_bar()
         self.create_prescription_selection()
         self.create_buttons()
+        self.watch_prescriptions(self.refresh_prescription_selection)
+
+        # Only allow deleting once a prescription is selected
+        self.selection.trace_add("write", self.update_delete_button)
+
+    def reopen(self, database, current_user):
+        """Reuse this window for the given user. Rebuilds the prescription selection for them."""
+        self.database = database
+        self.current_user = current_user
+        self.refresh_prescription_selection()
+        self.watch_prescriptions(self.refresh_prescription_selection)
 
     def init_root(self):
         """Configure any window elements such as title, size, etc."""
@@ -542,12 +691,11 @@ class DeleteMedicationWindow:
         self.root.rowconfigure(0, weight=1)
 
         # Window size
-        self.root.geometry('450x200')
+        self.root.geometry('450x320')
         self.root.resizable(width=True, height=True)
 
         # Window Logo
-        logo = tk.PhotoImage(file='./assets/medical_icon.png')
-        self.root.iconphoto(False, logo)
+        self.root.iconphoto(False, get_icon(self.root))
 
     def init_frames(self):
         """Configure the main and button frames."""
@@ -567,56 +715,203 @@ class DeleteMedicationWindow:
         )
 
     def create_prescription_selection(self):
-        """Creates the selection box that allows the user to pick from their medications."""
-        # Get an iterable list of the user's prescriptions and a copy with just the names.
+        """Creates the selection list that allows the user to pick from their medications."""
+        # Create label
+        self.selection_label = ttk.Label(self.main_frame, text="Select Prescription:")
+        self.selection_label.grid(
+            column=0, row=self.TOP_ROW,
+            columnspan=1, rowspan=1,
+            padx=5, pady=10, sticky="NEW"
+        )
+
+        # Create selection widget
+        self.selection_list = VirtualList(self.main_frame, self.selection)
+        self.selection_list.grid(
+            column=1, row=self.TOP_ROW,
+            columnspan=self.COL_WIDTH - 1, rowspan=1,
+            padx=5, pady=10, sticky="NSEW"
+        )
+
+        self.refresh_prescription_selection()
+
+    def refresh_prescription_selection(self):
+        """Fills the selection list with the current user's prescriptions."""
         user_prescription_data = self.database.get_prescriptions_by_owner_ID(self.current_user.get())
 
         # Check if user has any prescriptions
-        # If user has no prescriptions, show a blank box.
+        # If user has no prescriptions, hide the list.
         if user_prescription_data is None:
             self.selection.set("")
-            ttk.Label(self.main_frame, text="Current user has no prescriptions to delete!").grid(
-                column=0, row=self.TOP_ROW,
-                columnspan=1, rowspan=1,
-                padx=5, pady=10, sticky="NSEW"
-            )
+            self.selection_label["text"] = "Current user has no prescriptions to delete!"
+            self.selection_list.grid_remove()
 
         # If user has prescriptions, do as normal
         else:
-            user_prescription_names = [x.drug_name for x in user_prescription_data]
-            # Create label
-            ttk.Label(self.main_frame, text="Select Prescription:").grid(
-                column=0, row=self.TOP_ROW,
-                columnspan=1, rowspan=1,
-                padx=5, pady=10, sticky="NSEW"
-            )
+            self.selection_label["text"] = "Select Prescription:"
+            self.selection_list.grid()
+            self.selection_list.set_items((x.ID, f"{x.drug_name} ({x.dosage})") for x in user_prescription_data)
 
-            # Create selection widget
-            combobox = ttk.OptionMenu(self.main_frame, self.selection,
-                                      user_prescription_names[0], *user_prescription_names)
-            combobox.grid(
-                column=1, row=self.TOP_ROW,
-                columnspan=self.COL_WIDTH - 1, rowspan=1,
-                padx=5, pady=10, sticky="NSEW"
-            )
+        if self.delete_button is not None:  # Not made yet when the selection is first filled in
+            self.update_delete_button()
 
     def create_buttons(self):
         """Creates done and cancel buttons."""
-        ttk.Button(self.main_frame, text="Cancel", command=self.root.destroy).grid(
+        ttk.Button(self.main_frame, text="Cancel", command=self.close_window).grid(
             column=self.COL_WIDTH - 2, row=self.TOP_ROW + 1,
             columnspan=1, sticky="SEW", padx=5, pady=8
         )
-        delete_button = ttk.Button(self.main_frame, text="Delete", command=self.click_delete_button)
-        delete_button.grid(
+        self.delete_button = ttk.Button(self.main_frame, text="Delete", command=self.click_delete_button)
+        self.delete_button.grid(
             column=self.COL_WIDTH - 1, row=self.TOP_ROW + 1,
             columnspan=1, sticky="SEW", padx=5, pady=8
         )
 
-        # Disable delete button if no prescriptions exist for user
+        self.update_delete_button()
+
+    def update_delete_button(self, *e):
+        """Disable delete button unless a prescription is selected"""
         if self.selection.get() == "":
-            delete_button.state(['disabled'])
+            self.delete_button.state(['disabled'])
+        else:
+            self.delete_button.state(['!disabled'])
 
     def click_delete_button(self, e=None):
         """Delete selected prescription"""
-        self.database.delete_prescription_by_drug_name(self.selection.get(), self.current_user.get())
-        self.root.destroy()
+        self.database.delete_prescription_by_ID(self.selection.get(), self.current_user.get())
+        self.close_window()
+
+
+class CalendarWindow(_WatchesPrescriptions, PooledWindow):
+    """Lists the doses the current user is due to take today or over the next days (see Calendar.py)"""
+
+    # Range choices shown in the selector -> number of days
+    RANGES = {"Today": 1, "Next 7 days": 7, "Next 14 days": 14}
+
+    def __init__(self, database, current_user):
+        # Open new window
+        self.root = tk.Toplevel()
+        self.init_pooled_window()
+
+        # Database
+        self.database = database
+        self.current_user = current_user
+
+        # Frames defined in other functions
+        self.main_frame = None
+
+        # Grid constants
+        self.TOP_ROW = 1
+        self.COL_WIDTH = 4
+
+        # Colors
+        self.DARK_GREY = "#b3b3b3"
+
+        # Selected range, one of the RANGES keys
+        self.selected_range = tk.StringVar()
+        self.selected_range.set("Next 7 days")
+
+        # Widgets defined in other functions
+        self.dose_list = None  # create_dose_list
+
+        # Run all the functions that create the window
+        self.init_root()
+        self.init_frames()
+        self.create_title_bar()
+        self.create_range_selector()
+        self.create_dose_list()
+        self.create_buttons()
+        self.refresh_doses()
+        self.watch_prescriptions(self.refresh_doses)
+
+        # Event bindings
+        self.selected_range.trace_add("write", self.refresh_doses)
+
+    def reopen(self, database, current_user):
+        """Reuse this window for the given user. Shows their doses from now on."""
+        self.database = database
+        self.current_user = current_user
+        self.refresh_doses()
+        self.watch_prescriptions(self.refresh_doses)
+
+    def init_root(self):
+        """Configure any window elements such as title, size, etc."""
+
+        self.root.title('Dose Calendar: Medical Adherence Software - Group 7')  # Window title
+
+        # Configure the root so that it does not interfere with the main_frame grid layout
+        self.root.columnconfigure(0, weight=1)
+        self.root.rowconfigure(0, weight=1)
+
+        # Window size
+        self.root.geometry('450x400')
+        self.root.resizable(width=True, height=True)
+
+        # Window Logo
+        self.root.iconphoto(False, get_icon(self.root))
+
+    def init_frames(self):
+        """Configure the main frame."""
+        self.main_frame = tk.Frame(self.root, padx=3, pady=5)
+        self.main_frame.grid(column=0, row=0, sticky="NSEW")
+
+        self.main_frame.columnconfigure(1, weight=1)
+        self.main_frame.rowconfigure(self.TOP_ROW + 1, weight=1)
+
+    def create_title_bar(self):
+        """Creates a header"""
+        tk.Label(self.main_frame, text="Dose Calendar", font=TITLE_FONT, background=self.DARK_GREY).grid(
+            column=0, row=self.TOP_ROW - 1,
+            columnspan=self.COL_WIDTH, rowspan=1,
+            padx=5, pady=0, sticky="NEW"
+        )
+
+    def create_range_selector(self):
+        """Lets the user pick how many days ahead are shown."""
+        ttk.Label(self.main_frame, text="Show:").grid(
+            column=0, row=self.TOP_ROW,
+            columnspan=1, rowspan=1,
+            padx=5, pady=10, sticky="NSEW"
+        )
+        ttk.OptionMenu(self.main_frame, self.selected_range, self.selected_range.get(), *self.RANGES).grid(
+            column=1, row=self.TOP_ROW,
+            columnspan=self.COL_WIDTH - 1, rowspan=1,
+            padx=5, pady=10, sticky="NSEW"
+        )
+
+    def create_dose_list(self):
+        """A scrollable list of doses, with a heading line for each day."""
+        self.dose_list = tk.Listbox(self.main_frame, activestyle="none", font=("Courier", 10))
+        self.dose_list.grid(
+            column=0, row=self.TOP_ROW + 1,
+            columnspan=self.COL_WIDTH - 1, rowspan=1,
+            padx=(5, 0), pady=5, sticky="NSEW"
+        )
+        scrollbar = ttk.Scrollbar(self.main_frame, orient="vertical", command=self.dose_list.yview)
+        scrollbar.grid(column=self.COL_WIDTH - 1, row=self.TOP_ROW + 1, padx=(0, 5), pady=5, sticky="NSW")
+        self.dose_list["yscrollcommand"] = scrollbar.set
+
+    def create_buttons(self):
+        """Creates a close button."""
+        ttk.Button(self.main_frame, text="Close", command=self.close_window).grid(
+            column=self.COL_WIDTH - 2, row=self.TOP_ROW + 2,
+            columnspan=2, sticky="SEW", padx=5, pady=8
+        )
+
+    def refresh_doses(self, *e):
+        """Fills the list with the current user's doses in the selected range."""
+        now = Clock.now()
+        doses = self.database.get_dose_calendar(self.current_user.get(), self.RANGES[self.selected_range.get()], now)
+
+        lines = []
+        day = None
+        for moment, prescription in doses:
+            if moment.date() != day:
+                day = moment.date()
+                lines.append(moment.strftime("%A, %B %d"))
+            overdue = " - overdue" if moment < now else ""
+            lines.append(f"   {moment:%H:%M}  {prescription.drug_name} ({prescription.dosage}){overdue}")
+        if not lines:
+            lines.append("No doses due in this time.")
+
+        self.dose_list.delete(0, "end")
+        self.dose_list.insert("end", *lines)
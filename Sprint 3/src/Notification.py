@@ -3,20 +3,34 @@ Name: Notification.py
 Description: Holds a wrapper function that sends the medication reminder notification.
 """
 
-from windows_toasts import InteractableWindowsToaster, ToastDisplayImage, ToastAudio, AudioSource, Toast, \
-    ToastActivatedEventArgs, ToastButton
+import sys
 from os import path
 from datetime import datetime, timedelta
 
 try:
     from src.Prescription import Prescription
-    from src.Medication import ViewMedicationWindow
+    import src.DoseLog as DoseLog
+    import src.Schedule as Schedule
+    import src.QuietHours as QuietHours
+    import src.Clock as Clock
+    import src.Instrumentation as Instrumentation
+    import src.Events as Events
+    from src.Instrumentation import instrumented
 except ImportError:
     from Prescription import Prescription
-    from Medication import ViewMedicationWindow
+    import DoseLog as DoseLog
+    import Schedule as Schedule
+    import QuietHours as QuietHours
+    import Clock as Clock
+    import Instrumentation as Instrumentation
+    import Events as Events
+    from Instrumentation import instrumented
 
 ICO_PATH = path.abspath("./assets/medical_icon.png")
 SNOOZE_TIME_MIN = 5
+# Most missed doses logged for one prescription per check. A long gap (e.g. the program was closed for weeks) is
+# caught up over the following checks instead of all at once on the Tk thread with the database locked.
+MAX_MISSED_PER_CHECK = 100
 
 button_contents = (
     ("Medication Taken", "taken"),
@@ -25,27 +39,91 @@ button_contents = (
 )
 
 
-def check(database) -> list[Prescription]:
-    """Takes a database and returns a tuple of prescriptions that need to have a notification sent out."""
+@instrumented("Notification.check")
+def check(database, session=None) -> list[Prescription]:
+    """Takes a database and returns a tuple of prescriptions that need to have a notification sent out.
+    Given a session (see Session.py), only the prescriptions of its user are checked.
+    Reminders that come due during the owner's quiet hours are held back until the quiet hours end."""
     result = []
+    now = Clock.now()
+    quiet_hours = {}  # Owner ID -> QuietHours, so each owner is only looked up once per check
+
+    prescriptions = database.prescriptions if session is None else database.load_shard(session.get())
+    due_now = []  # (prescription, its schedule, due time, held back until) of those due
+    for p in prescriptions:
+        # A held back reminder is skipped without further work until its quiet hours are over
+        deferred_until = getattr(p, "deferred_until", None)  # Prescriptions saved before quiet hours lack it
+        if deferred_until is not None and now < deferred_until:
+            continue
 
-    for p in database.prescriptions:
         # Figure out if a prescription is due for a notification
-        if datetime.now() >= p.was_taken + timedelta(seconds=int(p.time_btwn_dose)):
-            # Then check if a snooze was applied and if that is done as well
-            if p.snooze is None:
-                result.append(p)
-            elif datetime.now() - timedelta(minutes=SNOOZE_TIME_MIN) >= p.snooze:
-                result.append(p)
-                p.snooze = None
+        schedule = Schedule.of(p)
+        due = schedule.next_after(p.was_taken)
+        if now >= due:
+            due_now.append((p, schedule, due, deferred_until))
+
+    # Other threads may be reading the due prescriptions (e.g. saving them), so they are changed under the lock
+    if due_now:
+        with database.lock.write():
+            for p, schedule, due, deferred_until in due_now:
+                quiet = quiet_hours.get(p.owner_ID)
+                if quiet is None:
+                    quiet = quiet_hours[p.owner_ID] = QuietHours.of(database.get_customer_by_ID(p.owner_ID))
+                window_end = quiet.end_of_window(now) if quiet else None
+                if window_end is not None:
+                    p.deferred_until = window_end
+                    database.events.publish(Events.REMINDED, p)
+                    continue
+                changed = deferred_until is not None
+                if changed:
+                    p.deferred_until = None
+
+                # Then check if a snooze was applied and if that is done as well
+                if p.snooze is None:
+                    result.append(p)
+                elif now - timedelta(minutes=SNOOZE_TIME_MIN) >= p.snooze:
+                    result.append(p)
+                    p.snooze = None
+                    changed = True
+
+                # A dose that is still not taken once the next one is due has been missed
+                if now >= schedule.next_after(due):
+                    changed = _record_missed_doses(database, p, schedule, due, now) or changed
+
+                if changed:
+                    database.events.publish(Events.REMINDED, p)
 
     return result
 
 
-def send(database, presc: Prescription, current_user) -> None:
-    """Takes input fields and sends a notification to remind the user to take medication"""
+def _record_missed_doses(database, presc: Prescription, schedule, due: datetime, now: datetime) -> bool:
+    """Logs every dose since the last one taken whose window has fully passed, unless it was logged already.
+    Doses due after the expiration date are not logged, and at most MAX_MISSED_PER_CHECK are logged per call.
+    presc.last_missed holds the due time of the latest dose logged as missed. Returns whether any was logged."""
+    last_missed = getattr(presc, "last_missed", None)  # Prescriptions saved before the dose log lack it
+    missed = due if (last_missed is None or last_missed < due) else schedule.next_after(last_missed)
+    following = schedule.next_after(missed)
+    logged = 0
+    while now >= following and logged < MAX_MISSED_PER_CHECK:
+        if following <= missed or missed > presc.expiration_date:  # A zero or negative interval never moves forward
+            break
+        database.record_dose_event(presc.ID, DoseLog.MISSED, missed)
+        presc.last_missed = missed
+        logged += 1
+        missed, following = following, schedule.next_after(following)
+    return logged > 0
+
+
+@instrumented("Notification.send")
+def send(database, presc: Prescription, session) -> None:
+    """Takes input fields and sends a notification to remind the user to take medication.
+    session is the signed-in user's Session (or anything else whose get() returns their ID)."""
     # Checks that only the owner of the prescription receives the notification for their prescription
-    if current_user.get() == presc.owner_ID:
+    if session.get() == presc.owner_ID:
+        # The toast backend is only imported once a notification actually goes out
+        from windows_toasts import InteractableWindowsToaster, ToastDisplayImage, ToastAudio, AudioSource, Toast, \
+            ToastButton
+
         toaster = InteractableWindowsToaster("Medication Reminder")  # Sets title/initializes notification server
 
         # Configure notification body
@@ -59,45 +137,51 @@ def send(database, presc: Prescription, current_user) -> None:
             toast_body.AddAction(ToastButton(button[0], button[1]))
 
         # Register callback functions
-        toast_body.on_activated = lambda args: _button_handler(database, presc, current_user, args)
+        toast_body.on_activated = lambda args: _button_handler(database, presc, session, args)
         toast_body.on_dismissed = lambda args: _snooze_action(database, presc)
 
         # Display notification
         toaster.show_toast(toast_body)
 
 
-def _button_handler(database, presc, current_user, args) -> None:
+def _button_handler(database, presc, session, args) -> None:
     """Decides which button the user pressed and based on that, carries out the correct action."""
     arg = args.arguments
 
     if arg == "taken":
-        _medication_taken_action(presc)
+        _medication_taken_action(database, presc)
     elif arg == "view":
-        _view_medication_action(presc, database, current_user)
+        _view_medication_action(presc, database, session)
     elif arg == "dismiss":
         _snooze_action(database, presc)
     else:
         _snooze_action(database, presc)  # Snooze if unknown action occurred
 
 
-def _medication_taken_action(presc) -> None:
+def _medication_taken_action(database, presc) -> None:
     """Sets the prescription in question as being taken just now."""
-    presc.was_taken = datetime.now()
+    database.mark_taken(presc.ID, presc.owner_ID)
 
 
-def _view_medication_action(presc, database, current_user) -> None:
+def _view_medication_action(presc, database, session) -> None:
     """Opens an editing window that displays the prescription's info"""
-    # Temporarily disable the prescription's notification
-    presc.snooze = datetime.now() + timedelta(weeks=1)  # If you take 1 week to look at your medication, you probably died so the notification running again is the least of your worries
+    # Temporarily disable the prescription's notification. This is not a snooze by the user, so it is not logged.
+    database.snooze(presc.ID, presc.owner_ID, Clock.now() + timedelta(weeks=1), log=False)  # If you take 1 week to look at your medication, you probably died so the notification running again is the least of your worries
     # Show medication information
-    win = ViewMedicationWindow(f"View {presc.drug_name}", database, current_user, presc)
-    win.root.bind("<Destroy>", lambda *args: _snooze_action(database, presc))  # Snoozes notification once user closes the window
+    try:
+        from src.Medication import ViewMedicationWindow
+    except ImportError:
+        from Medication import ViewMedicationWindow
+    win = ViewMedicationWindow(f"View {presc.drug_name}", database, session, presc)
+    win.set_close_callback(lambda: _snooze_action(database, presc))  # Snoozes notification once user closes the window
 
 
 def _snooze_action(database, presc: Prescription) -> None:
     """Runs when notification is dismissed by the dismiss button or otherwise.
     Essentially, this functions as a snooze. The user must take their medication soon, so it won't stop sending
     reminders until they do."""
-    presc.snooze = datetime.now()
+    database.snooze(presc.ID, presc.owner_ID)
     #print(f"Snoozed {presc.drug_name} until {presc.snooze + timedelta(minutes=SNOOZE_TIME_MIN)}")
-    database.save_prescriptions()
+
+
+Instrumentation.register(sys.modules[__name__])
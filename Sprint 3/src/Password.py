@@ -0,0 +1,139 @@
+"""
+Name: Password.py
+Description: Salted password hashing with a tunable work factor.
+
+Passwords are run through a key derivation function (PBKDF2-HMAC-SHA256 or scrypt, both from hashlib) with a
+random salt, and stored as one text field that records everything needed to check them again:
+
+    pbkdf2_sha256$<iterations>$<salt>$<hash>
+    scrypt$<n>$<r>$<p>$<salt>$<hash>
+
+(salt and hash in base64). Because the cost is kept with each hash, the policy for new hashes can be raised at
+any time with set_policy() and old hashes still verify. needs_rehash() tells when a stored hash is weaker than
+the current policy, so it can be replaced the next time its password is typed in (see Database.authenticate).
+
+Hashes are compared with hmac.compare_digest, which takes the same time wherever the first difference is.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+from collections import namedtuple
+
+PBKDF2 = "pbkdf2_sha256"
+SCRYPT = "scrypt"
+ALGORITHMS = (PBKDF2, SCRYPT)
+
+SALT_BYTES = 16
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+# cost is the number of iterations for PBKDF2 and n (a power of 2) for scrypt
+Policy = namedtuple("Policy", ("algorithm", "cost"))
+
+DEFAULT_POLICY = Policy(PBKDF2, 310_000)  # About 70ms per hash or check on a current desktop
+# Only for generated test data (e.g. benchmarks/population.py), where thousands of customers are made at once
+FAST_POLICY = Policy(PBKDF2, 1_000)
+
+_policy = DEFAULT_POLICY
+
+
+def get_policy() -> Policy:
+    return _policy
+
+
+def set_policy(policy: Policy) -> Policy:
+    """Sets the algorithm and cost of new hashes. Returns the previous policy so it can be restored."""
+    global _policy
+    if policy.algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown password hashing algorithm {policy.algorithm!r}")
+    if policy.algorithm == SCRYPT and (policy.cost < 2 or policy.cost & (policy.cost - 1)):
+        raise ValueError("The scrypt cost must be a power of 2")
+    if policy.cost < 1:
+        raise ValueError("The cost must be at least 1")
+    previous = _policy
+    _policy = policy
+    return previous
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt(password: bytes, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # hashlib refuses to use more than 32MB unless allowed to, which n=2**15 with r=8 already needs
+    return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p + 2 ** 20, dklen=32)
+
+
+def hash_password(password: str, policy: Policy = None) -> str:
+    """The stored form of a password, with a new random salt, hashed with the given or current policy."""
+    if policy is None:
+        policy = _policy
+    salt = os.urandom(SALT_BYTES)
+    secret = password.encode("utf-8")
+    if policy.algorithm == SCRYPT:
+        digest = _scrypt(secret, salt, policy.cost, SCRYPT_R, SCRYPT_P)
+        return f"{SCRYPT}${policy.cost}${SCRYPT_R}${SCRYPT_P}${_b64encode(salt)}${_b64encode(digest)}"
+    digest = hashlib.pbkdf2_hmac("sha256", secret, salt, policy.cost)
+    return f"{PBKDF2}${policy.cost}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def _parse(stored: str) -> tuple or None:
+    """(algorithm, parameters, salt, hash) of a stored hash, or None if it is not one."""
+    parts = stored.split("$")
+    try:
+        if parts[0] == PBKDF2 and len(parts) == 4:
+            return PBKDF2, (int(parts[1]),), base64.b64decode(parts[2]), base64.b64decode(parts[3])
+        if parts[0] == SCRYPT and len(parts) == 6:
+            return SCRYPT, tuple(int(part) for part in parts[1:4]), base64.b64decode(parts[4]), \
+                base64.b64decode(parts[5])
+    except ValueError:
+        pass
+    return None
+
+
+def verify(password: str, stored: str) -> bool:
+    """Whether the password matches a stored hash. Malformed hashes never match."""
+    parsed = _parse(stored) if stored else None
+    if parsed is None:
+        return False
+    algorithm, parameters, salt, expected = parsed
+    secret = password.encode("utf-8")
+    if algorithm == SCRYPT:
+        digest = _scrypt(secret, salt, *parameters)
+    else:
+        digest = hashlib.pbkdf2_hmac("sha256", secret, salt, parameters[0])
+    return hmac.compare_digest(digest, expected)
+
+
+def needs_rehash(stored: str, policy: Policy = None) -> bool:
+    """Whether a stored hash is missing, malformed, or made with a different algorithm or a lower cost than the
+    given or current policy."""
+    if policy is None:
+        policy = _policy
+    parsed = _parse(stored) if stored else None
+    if parsed is None or parsed[0] != policy.algorithm:
+        return True
+    return parsed[1][0] < policy.cost
+
+
+if __name__ == "__main__":
+    # Quick sanity test
+    stored = hash_password("hollow&purple1989")
+    assert stored.startswith(f"{PBKDF2}${DEFAULT_POLICY.cost}$")
+    assert verify("hollow&purple1989", stored)
+    assert not verify("hollow&purple1988", stored)
+    assert not needs_rehash(stored)
+    assert stored != hash_password("hollow&purple1989")  # New salt every time
+
+    previous = set_policy(Policy(SCRYPT, 2 ** 14))
+    assert previous == DEFAULT_POLICY
+    assert needs_rehash(stored)
+    upgraded = hash_password("hollow&purple1989")
+    assert verify("hollow&purple1989", upgraded) and not needs_rehash(upgraded)
+    set_policy(previous)
+
+    for broken in ("", "hollow&purple1989", f"{PBKDF2}$x$y$z", f"{SCRYPT}$1$2$3"):
+        assert not verify("hollow&purple1989", broken) and needs_rehash(broken)
+    print("Password test successful")
@@ -9,26 +9,38 @@ Description: The prescription class.
 import uuid
 from datetime import datetime
 
+try:
+    import src.Clock as Clock
+except ImportError:
+    import Clock as Clock
+
 
 class Prescription:
     def __init__(self, owner_ID: str,
                  drug_name: str, doctor_name: str,
                  time_btwn_dose: int, side_effects: str, dosage: str,
                  date_issued_year: int, date_issued_month: int, date_issued_day: int,
-                 expiration_date_year: int, expiration_date_month: int, expiration_date_day: int):
+                 expiration_date_year: int, expiration_date_month: int, expiration_date_day: int,
+                 schedule: str = None):
         self.owner_ID = owner_ID  # ID of the Customer object that was logged in upon creation.
         self.drug_name = drug_name
         self.doctor_name = doctor_name
         self.time_btwn_dose = time_btwn_dose  # stored in seconds
+        # Schedule expression such as "8am, 8pm" (see Schedule.py), else it's None and doses are time_btwn_dose apart
+        self.schedule = schedule
         self.side_effects = side_effects
         self.dosage = dosage
 
         # Random ID to discern between prescriptions with identical names, date, etc.
         self.ID = str(uuid.uuid4())
         # Tracks when medication was last taken
-        self.was_taken = datetime.now()
+        self.was_taken = Clock.now()
         # Tracks when notification was snoozed by user, else it's None
         self.snooze = None
+        # Due time of the latest dose recorded as missed in the dose log, else it's None
+        self.last_missed = None
+        # End of the owner's quiet hours that the due reminder is being held back until, else it's None
+        self.deferred_until = None
 
         # Dates are special.
         self.date_issued = datetime(date_issued_year, date_issued_month, date_issued_day)
@@ -39,6 +51,7 @@ class Prescription:
         Doctor: {1}
         Dosage: {2}
         Time Between Doses: {3}
+        Schedule: {9}
         Side Effects: {4}
         Date Issued: {5}
         Date Expiration: {6}
@@ -50,5 +63,6 @@ class Prescription:
             self.side_effects,
             self.date_issued.isoformat(), self.expiration_date.isoformat(),
             self.ID,
-            self.owner_ID
+            self.owner_ID,
+            getattr(self, "schedule", None)
         )
@@ -0,0 +1,189 @@
+"""
+Name: Profiler.py
+Description: Profiles a real session of the program with cProfile and tracemalloc.
+
+The profiler is off unless the MAP_PROFILE environment variable is set (to anything but 0), in which case it runs
+from startup until the program exits. It can also be started and stopped at any time with Ctrl+Shift+P in the
+main window.
+
+Each time the profiler is stopped a report is written to MAP_PROFILE_DIR ("profiles" by default), named after the
+time it was written, e.g. profiles/profile-20240405-142233.txt. The report lists
+    * the functions with the highest cumulative time, over the whole program and per project module
+    * the lines that allocated the most memory still in use, per project module. Allocations made inside the
+      standard library are charged to the project line that called into it.
+The raw cProfile data is saved next to the report (same name, .prof) for tools such as snakeviz.
+
+Only the Tk thread is profiled by cProfile. tracemalloc sees allocations from every thread.
+"""
+
+import os
+import time
+import tracemalloc
+
+ENABLE_ENV_VAR = "MAP_PROFILE"
+DIR_ENV_VAR = "MAP_PROFILE_DIR"
+DEFAULT_DIR = "profiles"
+
+# Modules that get their own section in the report. Any other module of this project is listed under "Other"
+REPORT_MODULES = ("Database", "Notification", "Medication", "Validator")
+TOP_N = 15  # Rows per section
+TRACEMALLOC_FRAMES = 16  # Deep enough to find the project line under pickle, tkinter, etc.
+
+_THIS_FILE = os.path.abspath(__file__)
+_PROJECT_DIR = os.path.dirname(_THIS_FILE)
+
+
+def _project_module(file_name: str) -> str or None:
+    """Name of the project module the given source file belongs to, e.g. "Database". None for anything else."""
+    file_name = os.path.abspath(file_name)
+    if os.path.dirname(file_name) != _PROJECT_DIR or not file_name.endswith(".py") or file_name == _THIS_FILE:
+        return None
+    module = os.path.basename(file_name)[:-3]
+    return module if module in REPORT_MODULES else "Other"
+
+
+class Profiler:
+    def __init__(self, directory: str = None):
+        if directory is None:
+            directory = os.environ.get(DIR_ENV_VAR, DEFAULT_DIR)
+        self.directory = directory
+
+        self._profile = None  # cProfile.Profile while running
+        self._started = None  # time.time() of start()
+        self._started_tracemalloc = False  # Whether tracemalloc was started by us (and so should be stopped by us)
+
+    @property
+    def running(self) -> bool:
+        return self._profile is not None
+
+    def start(self):
+        # Imported here so that cProfile and pstats stay out of normal startups
+        import cProfile
+
+        if self.running:
+            return
+        self._started_tracemalloc = not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._started = time.time()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        print("Profiler started.")
+
+    def stop(self) -> str or None:
+        """Stops profiling and writes the report. Returns the path of the report, or None if not running."""
+        if not self.running:
+            return None
+        self._profile.disable()
+        memory = tracemalloc.take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        path = self.write_report(self._profile, memory, time.time() - self._started)
+        self._profile = None
+        print(f"Profiler stopped. Report written to {path}")
+        return path
+
+    def toggle(self, e=None):
+        """Starts the profiler if it is stopped, stops it if it is running. Bound to a key in App."""
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    def write_report(self, profile, memory: tracemalloc.Snapshot, duration_s: float) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        base_name = os.path.join(self.directory, time.strftime("profile-%Y%m%d-%H%M%S"))
+        path = base_name + ".txt"
+        idx = 1
+        while os.path.exists(path):  # Two reports in the same second
+            path = f"{base_name}-{idx}.txt"
+            idx += 1
+
+        profile.dump_stats(path[:-4] + ".prof")
+        with open(path, "w") as file:
+            file.write(f"Session profile written {time.strftime('%Y-%m-%d %H:%M:%S')}, "
+                       f"covering {duration_s:.1f}s\n\n")
+            self._write_cpu_section(file, profile)
+            self._write_memory_section(file, memory)
+        return path
+
+    @staticmethod
+    def _write_cpu_section(file, profile):
+        import pstats
+
+        # (file name, line, function) -> (primitive calls, total calls, own time, cumulative time, callers)
+        stats = pstats.Stats(profile).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+
+        def write_rows(title, selected):
+            file.write(f"{title}\n")
+            file.write(f"{'calls':>10} {'own s':>9} {'cumul. s':>9}  function\n")
+            for (file_name, line, function), (_, calls, own_s, cumulative_s, _) in selected[:TOP_N]:
+                location = f" ({os.path.basename(file_name)}:{line})" if line else ""  # Built-ins have no line
+                file.write(f"{calls:>10} {own_s:>9.3f} {cumulative_s:>9.3f}  {function}{location}\n")
+            if not selected:
+                file.write("    (nothing recorded)\n")
+            file.write("\n")
+
+        write_rows("== Top functions by cumulative time ==", rows)
+        for module in REPORT_MODULES + ("Other",):
+            write_rows(f"-- {module} --", [row for row in rows if _project_module(row[0][0]) == module])
+
+    @staticmethod
+    def _write_memory_section(file, memory: tracemalloc.Snapshot):
+        # Charge every live allocation to the innermost project line on its traceback
+        sites = {}  # (module, file name, line) -> [bytes, allocations]
+        for trace in memory.traces:
+            for frame in reversed(trace.traceback):  # Tracebacks run from the oldest frame to the newest
+                module = _project_module(frame.filename)
+                if module is not None:
+                    site = sites.setdefault((module, frame.filename, frame.lineno), [0, 0])
+                    site[0] += trace.size
+                    site[1] += 1
+                    break
+
+        file.write("== Top allocation sites (memory still in use) ==\n")
+        for module in REPORT_MODULES + ("Other",):
+            selected = sorted(((size, count, file_name, line)
+                               for (site_module, file_name, line), (size, count) in sites.items()
+                               if site_module == module), reverse=True)
+            file.write(f"-- {module}: {sum(row[0] for row in selected) / 1024:.1f} KiB --\n")
+            for size, count, file_name, line in selected[:TOP_N]:
+                file.write(f"{size / 1024:>10.1f} KiB {count:>8} blocks  {os.path.basename(file_name)}:{line}\n")
+            file.write("\n")
+
+
+def configure_from_environment(profiler: Profiler) -> None:
+    """Starts the given profiler if MAP_PROFILE is set. Its report is then written when the program exits."""
+    if os.environ.get(ENABLE_ENV_VAR, "") not in ("", "0"):
+        import atexit
+        profiler.start()
+        atexit.register(profiler.stop)
+
+
+if __name__ == "__main__":
+    # Profile a short run of the database and check that the report comes out grouped by module
+    import tempfile
+
+    try:
+        from src.Database import Database
+    except ImportError:
+        from Database import Database
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        profiler = Profiler(temp_dir)
+        profiler.start()
+        database = Database()
+        database.CUSTOMER_FILE_NAME = os.path.join(temp_dir, "customers.pkl")
+        database.PRESCRIPTION_DIR_NAME = os.path.join(temp_dir, "prescriptions")
+        for idx in range(200):
+            database.add_customer("Satoru", "Gojo", f"user{idx}", "hollow&purple1989", "gojo@jjk.com", "5550100")
+        database.save_all()
+        report = profiler.stop()
+
+        with open(report) as f:
+            text = f.read()
+        print(text)
+        assert "-- Database --" in text and "Database.py" in text
+        assert os.path.exists(report[:-4] + ".prof")
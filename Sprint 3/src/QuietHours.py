@@ -0,0 +1,127 @@
+"""
+Name: QuietHours.py
+Description: Times of day when a customer does not want to be reminded, such as overnight.
+
+A customer's quiet hours are stored as (start, end) pairs of seconds since midnight. A window whose end is
+before its start runs past midnight, so (22:00, 07:00) covers the night. Reminders that come due inside a
+window are held back until the window ends (see Notification.check).
+
+compile_windows() turns the pairs into sorted, merged, non-overlapping windows, so finding the window a moment falls in
+is a single bisect on the start times. Like schedules, the result is cached, so customers sharing the same
+quiet hours share one compiled object.
+"""
+
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+try:
+    from src.Schedule import DAY_S, parse_time
+except ImportError:
+    from Schedule import DAY_S, parse_time
+
+
+class QuietHours:
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, windows):
+        pieces = []
+        for start, end in windows:
+            if not (0 <= start < DAY_S and 0 <= end < DAY_S):
+                raise ValueError("Quiet hours must be times of day.")
+            if start == end:
+                raise ValueError("Quiet hours must start and end at different times.")
+            if start < end:
+                pieces.append((start, end))
+            else:  # Runs past midnight
+                pieces.append((start, DAY_S))
+                if end > 0:
+                    pieces.append((0, end))
+
+        merged = []
+        for start, end in sorted(pieces):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+
+        if merged == [(0, DAY_S)]:
+            raise ValueError("Quiet hours cannot cover the whole day.")
+        # A window running until midnight carries on into one starting at midnight
+        if len(merged) > 1 and merged[0][0] == 0 and merged[-1][1] == DAY_S:
+            merged[-1] = (merged[-1][0], DAY_S + merged[0][1])
+
+        self.starts = tuple(start for start, _ in merged)
+        self.ends = tuple(end for _, end in merged)
+
+    def end_of_window(self, moment: datetime) -> datetime or None:
+        """When the quiet window the given moment falls in ends, or None if it is not in one."""
+        if not self.starts:
+            return None
+        seconds = moment.hour * 3600 + moment.minute * 60 + moment.second
+        exact = seconds + moment.microsecond / 1_000_000
+        idx = bisect_right(self.starts, exact) - 1
+        if idx < 0 or exact >= self.ends[idx]:
+            return None
+        return moment + timedelta(seconds=self.ends[idx] - seconds, microseconds=-moment.microsecond)
+
+    def __bool__(self):
+        return bool(self.starts)
+
+    def __repr__(self):
+        return f"QuietHours({list(zip(self.starts, self.ends))})"
+
+
+@lru_cache(maxsize=1024)
+def compile_windows(windows: tuple) -> QuietHours:
+    """Compiles (start, end) pairs of seconds since midnight. Raises ValueError if they are not valid."""
+    return QuietHours(windows)
+
+
+NO_QUIET_HOURS = compile_windows(())
+
+
+def parse(text: str) -> tuple:
+    """(start, end) pairs of an expression like "10pm-7am" or "22:00-07:00, 13:00-14:00". Blank means none.
+    Raises ValueError if it cannot be understood."""
+    windows = []
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        times = part.split("-")
+        if len(times) != 2:
+            raise ValueError(f'"{part.strip()}" is not a window. Use a start and end like 10pm-7am.')
+        windows.append(tuple(parse_time(time.replace(" ", "").lower()) for time in times))
+    compile_windows(tuple(windows))  # Check that the windows make sense together
+    return tuple(windows)
+
+
+def of(customer) -> QuietHours:
+    """The compiled quiet hours of a customer. Customers saved before quiet hours existed have none."""
+    windows = getattr(customer, "quiet_hours", None)
+    return compile_windows(tuple(windows)) if windows else NO_QUIET_HOURS
+
+
+if __name__ == "__main__":
+    # Quick sanity test
+    night = compile_windows(parse("10pm-7am"))
+    assert night.end_of_window(datetime(2024, 4, 5, 23, 30)) == datetime(2024, 4, 6, 7, 0)
+    assert night.end_of_window(datetime(2024, 4, 6, 3, 15, 20, 500)) == datetime(2024, 4, 6, 7, 0)
+    assert night.end_of_window(datetime(2024, 4, 6, 7, 0)) is None
+    assert night.end_of_window(datetime(2024, 4, 6, 21, 59)) is None
+
+    # Overlapping windows are merged, and one ending at midnight joins one starting at midnight
+    several = compile_windows(parse("13:00-14:00, 13:30-15:00, 23:00-00:00, 00:00-06:00"))
+    assert several.starts == (0, 13 * 3600, 23 * 3600)
+    assert several.ends == (6 * 3600, 15 * 3600, DAY_S + 6 * 3600)
+    assert several.end_of_window(datetime(2024, 4, 5, 23, 10)) == datetime(2024, 4, 6, 6, 0)
+    assert several.end_of_window(datetime(2024, 4, 5, 14, 45)) == datetime(2024, 4, 5, 15, 0)
+    assert not compile_windows(parse(""))
+
+    for bad in ("10pm", "10pm-10pm", "25:00-7am", "0:00-12pm, 12pm-0:00"):
+        try:
+            parse(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"{bad!r} should not parse")
+    print("Quiet hours test successful")
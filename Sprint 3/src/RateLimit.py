@@ -0,0 +1,108 @@
+"""
+Name: RateLimit.py
+Description: In-memory token bucket rate limiter, used to throttle login attempts per username.
+
+Every key (e.g. a username) has a bucket holding up to `capacity` tokens, which refills at `refill_per_s` tokens
+per second. Each attempt takes a token, and an attempt finding the bucket empty is refused. So a burst of
+`capacity` attempts is allowed, and after that one more every 1 / refill_per_s seconds.
+
+Buckets are only stored while they are below capacity, so an idle key costs nothing. They are kept in least
+recently used order. Refilled buckets at the least recently used end are dropped (a full bucket is the same as
+a new one), and beyond `max_buckets` the least recently used bucket is dropped even if it has not refilled.
+Each attempt does a constant amount of work, whatever the number of keys.
+
+    limiter = TokenBucketLimiter(capacity=5, refill_per_s=1 / 30)
+    if not limiter.allow(username):
+        print(f"Too many attempts, try again in {limiter.retry_after(username):.0f} seconds")
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import src.Instrumentation as Instrumentation
+except ImportError:
+    import Instrumentation as Instrumentation
+
+LOGIN_CAPACITY = 5  # Attempts allowed in a burst
+LOGIN_REFILL_PER_S = 1 / 30  # Then one more every 30 seconds
+MAX_BUCKETS = 100_000
+
+
+class TokenBucketLimiter:
+    def __init__(self, capacity: float = LOGIN_CAPACITY, refill_per_s: float = LOGIN_REFILL_PER_S,
+                 max_buckets: int = MAX_BUCKETS, clock=time.monotonic, name: str = "limiter"):
+        """clock returns seconds and never goes back. name prefixes the Instrumentation counters."""
+        self.capacity = capacity
+        self.refill_per_s = refill_per_s
+        self.max_buckets = max_buckets
+        self.clock = clock
+        self.name = name
+        self._buckets = OrderedDict()  # Key -> [tokens, time of last update]. Least recently used first.
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _evict(self, now: float) -> None:
+        """Drops buckets that have refilled since they were last used, and any beyond max_buckets."""
+        buckets = self._buckets
+        while buckets:
+            key, (tokens, last) = next(iter(buckets.items()))
+            full = len(buckets) > self.max_buckets
+            if not full and tokens + (now - last) * self.refill_per_s < self.capacity:
+                break
+            del buckets[key]
+            if full:
+                Instrumentation.count(f"{self.name}.evicted")
+
+    def _tokens(self, key, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self.capacity
+        return min(self.capacity, bucket[0] + (now - bucket[1]) * self.refill_per_s)
+
+    def allow(self, key) -> bool:
+        """Takes a token from the key's bucket. Returns False, and takes nothing, if there is not a whole one."""
+        with self._lock:
+            now = self.clock()
+            tokens = self._tokens(key, now)
+            if tokens < 1:
+                Instrumentation.count(f"{self.name}.refused")
+                return False
+            self._buckets[key] = [tokens - 1, now]
+            self._buckets.move_to_end(key)
+            self._evict(now)
+            return True
+
+    def retry_after(self, key) -> float:
+        """Seconds until the key's next attempt would be allowed. 0 if it would be now."""
+        with self._lock:
+            return max(0.0, (1 - self._tokens(key, self.clock())) / self.refill_per_s)
+
+    def forget(self, key) -> None:
+        """Gives the key a full bucket again, e.g. after a successful login."""
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+if __name__ == "__main__":
+    # Quick sanity test
+    now = [0.0]
+    limiter = TokenBucketLimiter(capacity=3, refill_per_s=1, max_buckets=2, clock=lambda: now[0])
+    assert [limiter.allow("gojo") for _ in range(4)] == [True, True, True, False]
+    assert limiter.retry_after("gojo") == 1
+    now[0] = 1.5
+    assert limiter.allow("gojo") and not limiter.allow("gojo")
+
+    limiter.allow("sukuna")
+    limiter.allow("yuji")  # Over max_buckets, so the least recently used (gojo) goes
+    assert len(limiter) == 2 and limiter.allow("gojo")
+
+    now[0] = 100.0  # Long enough for every bucket to refill
+    limiter.allow("megumi")
+    assert len(limiter) == 1
+    limiter.forget("megumi")
+    assert len(limiter) == 0
+    print("Rate limit test successful")
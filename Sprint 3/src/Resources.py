@@ -0,0 +1,118 @@
+"""
+Name: Resources.py
+Description: UI resources shared by every window in the program.
+             Images are decoded once per Tk interpreter and handed out from a cache.
+             Windows that get opened over and over (the prescription windows) are kept in a pool when closed.
+             They are hidden instead of destroyed and shown again the next time one is needed.
+"""
+
+from abc import ABC, abstractmethod
+
+# Import shenanigans necessary to ensure cross-platform compatibility
+try:
+    import tkinter as tk
+except ImportError:
+    import Tkinter as tk
+
+ICON_PATH = './assets/medical_icon.png'
+
+_image_cache = {}  # (Tk interpreter, file path) -> PhotoImage
+
+
+def get_image(widget, path: str = ICON_PATH) -> tk.PhotoImage:
+    """Returns the image at the given path for use in the given widget's Tk interpreter.
+    The file is only read and decoded the first time it is requested."""
+    key = (widget.tk, path)
+    image = _image_cache.get(key)
+    if image is None:
+        image = tk.PhotoImage(master=widget, file=path)
+        _image_cache[key] = image
+    return image
+
+
+def get_icon(widget) -> tk.PhotoImage:
+    """Returns the program's window logo"""
+    return get_image(widget, ICON_PATH)
+
+
+class PooledWindow(ABC):
+    """Mixin for windows that can be handed out by a WindowPool.
+
+    Inheriting classes must have a self.root Toplevel and implement reopen(), which receives the same
+    arguments as __init__ and must put the window back into the state a freshly built window would be in.
+    Windows should close themselves with close_window() rather than self.root.destroy(), and whoever opens a
+    window should use set_close_callback() rather than binding to <Destroy>."""
+
+    pool = None  # The WindowPool this window goes back to when closed. None means the window is destroyed instead
+    is_open = True
+    close_callback = None
+
+    def init_pooled_window(self):
+        """Makes the title bar close button go through close_window(). Call once the root exists."""
+        self.root.protocol("WM_DELETE_WINDOW", self.close_window)
+
+    @abstractmethod
+    def reopen(self, *args):
+        """Called by WindowPool.acquire() with the arguments of __init__ when a hidden window is reused."""
+
+    def set_close_callback(self, callback):
+        """Runs callback (with no arguments) once the window is closed. Replaces any earlier callback."""
+        self.close_callback = callback
+
+    def close_window(self, e=None):
+        """Hides the window and returns it to its pool, or destroys it if it does not belong to one."""
+        if not self.is_open:
+            return  # Already closed, e.g. when several <Destroy> events of an alert all call this
+        self.is_open = False
+
+        callback, self.close_callback = self.close_callback, None
+        if self.pool is None:
+            self.root.destroy()
+        else:
+            self.pool.release(self)
+
+        if callback is not None:
+            callback()
+
+
+class WindowPool:
+    """Keeps closed windows hidden so they can be shown again instead of being built from scratch."""
+
+    def __init__(self, max_idle_per_class=2):
+        self.max_idle_per_class = max_idle_per_class
+        self._idle = {}  # Window class -> list of hidden windows of that class
+
+    def acquire(self, window_class, *args) -> PooledWindow:
+        """Returns an open window of the given class. A hidden one is reused if available, otherwise a new
+        one is built. args are passed to the class's __init__, or to reopen() for reused windows."""
+        idle = self._idle.get(window_class)
+        while idle:
+            window = idle.pop()
+            if not window.root.winfo_exists():
+                continue  # Destroyed while hidden, e.g. along with its parent
+
+            window.is_open = True
+            window.root.deiconify()
+            window.reopen(*args)
+            window.root.lift()
+            window.root.focus()
+            return window
+
+        window = window_class(*args)
+        window.pool = self
+        return window
+
+    def release(self, window: PooledWindow) -> None:
+        """Hides a window and keeps it for later. Destroys it instead if enough of its class are kept already."""
+        idle = self._idle.setdefault(type(window), [])
+        if len(idle) >= self.max_idle_per_class:
+            window.pool = None
+            window.root.destroy()
+            return
+
+        window.root.withdraw()
+        idle.append(window)
+
+
+# Process wide pool used by the prescription windows
+window_pool = WindowPool()
@@ -0,0 +1,47 @@
+"""
+Name: Rules.py
+Description: The input rules behind the Validator checks, as plain functions that return True or False.
+
+Validator.py wraps these for the GUI windows. They do not depend on Tk or the database, so they can be used
+anywhere, e.g. to validate many records at once.
+
+Every rule takes time linear in the length of its input:
+    * The patterns are compiled once, when this module is imported.
+    * The password rules are checked with one pass over the characters rather than with regular expressions
+      like ".*[0-9].*[a-zA-Z].*", which backtrack and take quadratic time on long inputs without a match.
+    * Emails longer than MAX_EMAIL_LENGTH (the longest address SMTP allows) are rejected before matching.
+      EMAIL_PATTERN itself cannot backtrack more than once over its input: the part before the "@" cannot
+      contain an "@", and the first domain label cannot contain a ".", so every boundary has only one place
+      it can be.
+"""
+
+import re
+from string import ascii_letters, digits
+
+MAX_EMAIL_LENGTH = 254
+MIN_PASSWORD_LENGTH = 8
+
+# Not a perfect representation of the standard, but covers enough. It's mostly lacking support for "comments" and
+# checking if certain characters are present only within quotes.
+EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9!#\$%&'\*\+-/=\?\^_`\{\|\}~\.]+@[a-zA-Z0-9\-]+\.[a-zA-Z\.]+")
+
+_LETTERS = frozenset(ascii_letters)
+_DIGITS = frozenset(digits)
+
+
+def valid_email(email: str) -> bool:
+    """Whether the email is in a valid format."""
+    return len(email) <= MAX_EMAIL_LENGTH and EMAIL_PATTERN.fullmatch(email) is not None
+
+
+def password_long_enough(password: str) -> bool:
+    """Whether the password has MIN_PASSWORD_LENGTH or more characters.
+    A line break makes a password invalid, same as it always has (the old pattern, ".{8,}", did not match one)."""
+    return len(password) >= MIN_PASSWORD_LENGTH and "\n" not in password
+
+
+def password_has_letters_and_numbers(password: str) -> bool:
+    """Whether the password contains both a letter and a number (a-z, A-Z and 0-9). No line breaks allowed."""
+    characters = set(password)
+    return (not characters.isdisjoint(_LETTERS)) and (not characters.isdisjoint(_DIGITS)) and \
+        "\n" not in characters
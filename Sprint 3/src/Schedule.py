@@ -0,0 +1,185 @@
+"""
+Name: Schedule.py
+Description: Dose schedules of prescriptions, parsed once into a form that answers "when is the next dose?" fast.
+
+A prescription without a schedule expression keeps taking a dose every time_btwn_dose seconds after the last one.
+A schedule expression can instead say:
+
+    every 8 hours                   A fixed interval (also minutes, days, weeks; "every day" means 1 day)
+    8am, 2pm, 8pm                   Those times every day. 24 hour times like 14:00 or 20:30 work too
+    weekdays 8:00                   Monday to Friday only ("weekends" and "daily" work as well)
+    mon, wed, fri 9am, 9pm          Only on the named days
+
+Expressions are case-insensitive. compile_schedule() parses an expression into a schedule object and remembers it, so
+each distinct expression is only parsed once no matter how many prescriptions use it.
+
+Times-of-day schedules are compiled into one sorted tuple of offsets (seconds since Monday 00:00) covering the
+week. The next dose after any moment is then a single bisect into that tuple, O(log n) in the number of dose
+times per week. Interval schedules need one addition, O(1).
+"""
+
+import re
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+DAY_S = 24 * 60 * 60
+WEEK_S = 7 * DAY_S
+_TINY = timedelta(microseconds=1)
+
+DAY_NAMES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+DAY_GROUPS = {
+    "daily": range(7),
+    "everyday": range(7),
+    "weekdays": range(5),
+    "weekends": range(5, 7),
+}
+UNIT_SECONDS = {"minute": 60, "hour": 3600, "day": DAY_S, "week": WEEK_S}
+
+_INTERVAL_PATTERN = re.compile(r"every\s+(\d+\s*)?(minute|hour|day|week)s?")
+_TIME_PATTERN = re.compile(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?")
+_SEPARATORS = re.compile(r"[\s,]+")
+
+
+class IntervalSchedule:
+    """A dose every `seconds` seconds after the previous one."""
+
+    __slots__ = ("seconds", "interval")
+
+    def __init__(self, seconds: int):
+        self.seconds = seconds
+        self.interval = timedelta(seconds=seconds)
+
+    def next_after(self, moment: datetime) -> datetime:
+        """The dose following one taken (or due) at the given moment."""
+        return moment + self.interval
+
+    def skip_to(self, last: datetime, start: datetime) -> datetime:
+        """A dose in the series continuing from last that is at most the first dose at or after start."""
+        return last + (start - last) // self.interval * self.interval
+
+    def mean_gap_s(self) -> int:
+        return self.seconds
+
+    def __repr__(self):
+        return f"IntervalSchedule({self.seconds})"
+
+
+class WeeklySchedule:
+    """Doses at fixed times of day, on some or all days of the week."""
+
+    __slots__ = ("offsets",)
+
+    def __init__(self, offsets):
+        self.offsets = tuple(sorted(set(offsets)))  # Seconds since Monday 00:00
+        if not self.offsets:
+            raise ValueError("A schedule needs at least one dose time.")
+
+    def next_after(self, moment: datetime) -> datetime:
+        """The first dose time strictly after the given moment."""
+        seconds = moment.weekday() * DAY_S + moment.hour * 3600 + moment.minute * 60 + moment.second
+        idx = bisect_right(self.offsets, seconds + moment.microsecond / 1_000_000)
+        target = self.offsets[idx] if idx < len(self.offsets) else WEEK_S + self.offsets[0]
+        return moment + timedelta(seconds=target - seconds, microseconds=-moment.microsecond)
+
+    def skip_to(self, last: datetime, start: datetime) -> datetime:
+        """The first dose time at or after start. Dose times do not depend on earlier doses."""
+        return self.next_after(start - _TINY)
+
+    def mean_gap_s(self) -> int:
+        return WEEK_S // len(self.offsets)
+
+    def __repr__(self):
+        return f"WeeklySchedule({self.offsets})"
+
+
+@lru_cache(maxsize=1024)
+def compile_schedule(expression: str):
+    """Parses a schedule expression (see the top of this file). Raises ValueError if it cannot be understood.
+    The result is cached, so compiling the same expression again costs a dictionary lookup."""
+    text = expression.strip().lower()
+    if not text:
+        raise ValueError("The schedule is blank.")
+
+    match = _INTERVAL_PATTERN.fullmatch(text)
+    if match is not None:
+        count = int(match.group(1)) if match.group(1) else 1
+        if count == 0:
+            raise ValueError("The time between doses must be more than zero.")
+        return IntervalSchedule(count * UNIT_SECONDS[match.group(2)])
+
+    days = None
+    times = []
+    for word in _SEPARATORS.split(text):
+        if not word:
+            continue
+        if word in DAY_GROUPS:
+            days = (days or set()) | set(DAY_GROUPS[word])
+        elif word[:3] in DAY_NAMES and word.isalpha():
+            days = (days or set()) | {DAY_NAMES.index(word[:3])}
+        elif word in ("am", "pm") and times and isinstance(times[-1], str):  # "8 am" written with a space
+            times[-1] = parse_time(times[-1] + word)
+        else:
+            times.append(word)
+
+    offsets_in_day = [parse_time(word) if isinstance(word, str) else word for word in times]
+    if not offsets_in_day:
+        raise ValueError(f'No dose times found in "{expression}". Use times like 8am or 20:00.')
+    return WeeklySchedule(day * DAY_S + seconds for day in (days if days is not None else range(7))
+                          for seconds in offsets_in_day)
+
+
+def parse_time(word: str) -> int:
+    """Seconds since midnight of a time like "8am", "8:30pm" or "20:30"."""
+    match = _TIME_PATTERN.fullmatch(word)
+    if match is None:
+        raise ValueError(f'"{word}" is not a time. Use times like 8am or 20:00.')
+    hour, minute, half = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if half is not None:
+        if not 1 <= hour <= 12:
+            raise ValueError(f'"{word}" is not a time.')
+        hour = hour % 12 + (12 if half == "pm" else 0)
+    if hour > 23 or minute > 59:
+        raise ValueError(f'"{word}" is not a time.')
+    return hour * 3600 + minute * 60
+
+
+@lru_cache(maxsize=1024)
+def interval(seconds: int) -> IntervalSchedule:
+    return IntervalSchedule(seconds)
+
+
+def of(prescription):
+    """The compiled schedule of a prescription. Prescriptions without an expression (including ones saved before
+    schedules existed) take a dose every time_btwn_dose seconds."""
+    expression = getattr(prescription, "schedule", None)
+    if expression:
+        return compile_schedule(expression)
+    return interval(int(prescription.time_btwn_dose))
+
+
+def next_due(prescription) -> datetime:
+    """When the prescription's next dose is due, going by when it was last taken."""
+    return of(prescription).next_after(prescription.was_taken)
+
+
+if __name__ == "__main__":
+    # Quick sanity test
+    friday_evening = datetime(2024, 4, 5, 21, 0)  # A Friday
+    assert compile_schedule("every 8 hours").next_after(friday_evening) == datetime(2024, 4, 6, 5, 0)
+    assert compile_schedule("Every day").next_after(friday_evening) == datetime(2024, 4, 6, 21, 0)
+    assert compile_schedule("8am, 2pm, 8pm").next_after(friday_evening) == datetime(2024, 4, 6, 8, 0)
+    assert compile_schedule("8 am, 14:00, 8:30pm").next_after(datetime(2024, 4, 5, 14, 0)) == \
+        datetime(2024, 4, 5, 20, 30)
+    assert compile_schedule("weekdays 8:00").next_after(friday_evening) == datetime(2024, 4, 8, 8, 0)
+    assert compile_schedule("mon, wed, fri 9am, 9pm").next_after(datetime(2024, 4, 3, 21, 0)) == \
+        datetime(2024, 4, 5, 9, 0)
+    assert compile_schedule("sunday 12pm").next_after(datetime(2024, 4, 7, 12, 0)) == datetime(2024, 4, 14, 12, 0)
+    assert compile_schedule("weekdays 8:00") is compile_schedule("weekdays 8:00")
+    for bad in ("", "sometimes", "25:00", "13pm", "mon", "every 0 hours"):
+        try:
+            compile_schedule(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"{bad!r} should not compile")
+    print("Schedule test successful")
@@ -0,0 +1,253 @@
+"""
+Name: Server.py
+Description: Local HTTP/JSON API over the Database, for kiosks and other front ends than the Tk windows.
+
+Serves the methods of Service.py with asyncio, keeping HTTP/1.1 connections open between requests. Requests and
+responses are JSON. Every route but /login needs the token from /login in an "Authorization: Bearer <token>"
+header.
+
+    POST   /login                          {"username": ..., "password": ...} -> {"token": ..., "user_ID": ...}
+    POST   /logout
+    GET    /prescriptions                  Every prescription of the user
+    POST   /prescriptions                  Add one (fields of Service.EDITABLE_FIELDS, dates as "YYYY-MM-DD")
+    GET    /prescriptions/due              Those due for a reminder now
+    GET    /prescriptions/<ID>
+    PATCH  /prescriptions/<ID>             Change the given fields
+    DELETE /prescriptions/<ID>
+    POST   /prescriptions/<ID>/taken       Mark a dose taken now
+    POST   /prescriptions/<ID>/snooze      Snooze the reminder
+
+Errors come back with the status of the ServiceError and its to_dict() as the body. Any other exception is
+printed and answered with a 500, and the connection is closed.
+
+Service calls run on a small thread pool, so the event loop keeps reading and writing other connections while
+one request waits for the service's lock, a shard file or a password hash.
+
+Run from the Sprint folder, with the program closed (the server uses the saved database):
+    python -m src.Server                       # http://127.0.0.1:8355
+    python -m src.Server --port 9000
+"""
+
+import argparse
+import asyncio
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+try:
+    from src.Service import Service, ServiceError
+except ImportError:
+    from Service import Service, ServiceError
+
+DEFAULT_HOST = "127.0.0.1"  # Local only. There is no TLS, so this should not be exposed to a network
+DEFAULT_PORT = 8355
+WORKERS = 4
+KEEP_ALIVE_S = 30  # Connections idle for longer are closed
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 256 * 1024
+
+# (method, path pattern, Service method name, whether it needs a session)
+ROUTES = (
+    ("POST", re.compile(r"/login"), "login", False),
+    ("POST", re.compile(r"/logout"), "logout", True),
+    ("GET", re.compile(r"/prescriptions"), "prescriptions", True),
+    ("POST", re.compile(r"/prescriptions"), "add_prescription", True),
+    ("GET", re.compile(r"/prescriptions/due"), "due", True),
+    ("GET", re.compile(r"/prescriptions/([^/]+)"), "prescription", True),
+    ("PATCH", re.compile(r"/prescriptions/([^/]+)"), "edit_prescription", True),
+    ("DELETE", re.compile(r"/prescriptions/([^/]+)"), "delete_prescription", True),
+    ("POST", re.compile(r"/prescriptions/([^/]+)/taken"), "mark_taken", True),
+    ("POST", re.compile(r"/prescriptions/([^/]+)/snooze"), "snooze", True),
+)
+# Methods whose request body is passed on to the Service method
+TAKES_BODY = frozenset(("add_prescription", "edit_prescription"))
+
+
+class HTTPError(Exception):
+    """A request the server cannot handle, before it reaches the Service."""
+
+    def __init__(self, status: int, message: str, close: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.close = close  # The rest of the connection cannot be trusted, e.g. after a malformed request
+
+
+class Server:
+    def __init__(self, service: Service, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int = WORKERS):
+        self.service = service
+        self.host = host
+        self.port = port  # 0 picks a free port, which start() then stores here
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="service")
+        self._server = None
+
+    async def start(self) -> int:
+        """Starts listening. Returns the port."""
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=True)
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answers requests on one connection until the client closes it, asks to, or goes quiet."""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_S)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                        {"error": "Headers too large."}, close=True)
+                    return
+
+                try:
+                    method, path, headers, keep_alive = _parse_head(head)
+                    body = await self._read_body(reader, headers)
+                    status, payload = await self._dispatch(method, path, headers, body)
+                except HTTPError as error:
+                    await self._respond(writer, error.status, {"error": str(error)}, close=error.close)
+                    if error.close:
+                        return
+                    continue
+                except Exception:
+                    import traceback  # Slow to import and only needed when a request fails
+                    traceback.print_exc()
+                    await self._respond(writer, HTTPStatus.INTERNAL_SERVER_ERROR,
+                                        {"error": "Internal server error."}, close=True)
+                    return
+                await self._respond(writer, status, payload, close=not keep_alive)
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_body(reader: asyncio.StreamReader, headers: dict):
+        length = headers.get("content-length", "0")
+        if not length.isdigit():
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Bad Content-Length.", close=True)
+        length = int(length)
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large.", close=True)
+        if length == 0:
+            return None
+        try:
+            data = await reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body cut short.", close=True)
+        try:
+            return json.loads(data)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body is not JSON.")
+
+    async def _dispatch(self, method: str, path: str, headers: dict, body) -> tuple:
+        """Runs the Service method of the route. Returns (status, JSON-ready payload)."""
+        path = path.split("?", 1)[0].rstrip("/") or "/"
+        allowed = False
+        for route_method, pattern, name, needs_session in ROUTES:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            allowed = True
+            if route_method == method:
+                break
+        else:
+            if allowed:
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not supported on {path}.")
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Nothing at {path}.")
+
+        token = headers.get("authorization", "")
+        token = token[len("Bearer "):] if token.startswith("Bearer ") else None
+
+        def call():
+            if name == "login":
+                if not isinstance(body, dict):
+                    raise ServiceError(400, "Send a JSON object with a username and password.")
+                return self.service.login(body.get("username", ""), body.get("password", ""))
+            args = [self.service.session(token)] if needs_session else []
+            args.extend(match.groups())
+            if name in TAKES_BODY:
+                args.append(body)
+            return getattr(self.service, name)(*args)
+
+        loop = asyncio.get_running_loop()
+        try:
+            payload = await loop.run_in_executor(self.executor, call)
+        except ServiceError as error:
+            return error.status, error
+        return (HTTPStatus.CREATED if name == "add_prescription" else HTTPStatus.OK), payload
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload, close: bool = False) -> None:
+        extra = ""
+        if isinstance(payload, ServiceError):
+            if payload.retry_after_s is not None:
+                extra = f"Retry-After: {max(1, round(payload.retry_after_s))}\r\n"
+            payload = payload.to_dict()
+        body = json.dumps(payload).encode("utf-8")
+        status = HTTPStatus(status)
+        writer.write((f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                      f"Content-Type: application/json\r\n"
+                      f"Content-Length: {len(body)}\r\n"
+                      f"Connection: {'close' if close else 'keep-alive'}\r\n"
+                      f"{extra}\r\n").encode("latin-1") + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+def _parse_head(head: bytes) -> tuple:
+    """(method, path, headers with lowercase names, keep alive) of the request line and headers."""
+    try:
+        lines = head.decode("latin-1").split("\r\n")
+        method, path, version = lines[0].split(" ")
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line.", close=True)
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return method, path, headers, keep_alive
+
+
+if __name__ == "__main__":
+    try:
+        from src.Database import Database
+    except ImportError:
+        from Database import Database
+
+    parser = argparse.ArgumentParser(description="Serve the saved database as a local HTTP/JSON API.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--shards", type=int, default=256, help="Customers' prescriptions kept in memory")
+    args = parser.parse_args()
+
+    db = Database()
+    db.load()
+    db.MAX_RESIDENT_SHARDS = args.shards
+    server = Server(Service(db), args.host, args.port)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.save_all()
+        db.close()
@@ -0,0 +1,220 @@
+"""
+Name: Service.py
+Description: The program's operations on one signed-in user's data, for front ends other than the Tk windows.
+
+Each method takes a Session (see Session.py), does what the matching window does through the Database, saves
+what changed and returns plain dictionaries and lists that json can encode (prescriptions look like the rows of
+Exporter.py). Problems are raised as a ServiceError with an HTTP style status:
+
+    400  the record did not pass validation (errors lists each problem, see BatchValidator.py)
+    401  wrong username or password, or the session is closed
+    404  the user has no prescription with that ID
+    429  too many login attempts (retry_after_s says for how long)
+
+The Database locks itself (see Concurrency.py), so reading needs no lock of the service's own. Methods that
+change a prescription hold the service's lock while they run, so that the checks, the change and the save
+happen as one step. Server.py serves these methods over HTTP.
+"""
+
+import threading
+
+try:
+    from src.BatchValidator import BatchValidator
+    from src.Session import SessionManager, LoginThrottled
+    import src.Exporter as Exporter
+    import src.Notification as Notification
+except ImportError:
+    from BatchValidator import BatchValidator
+    from Session import SessionManager, LoginThrottled
+    import Exporter as Exporter
+    import Notification as Notification
+
+# Fields a client may send for a prescription, with BatchValidator's names
+EDITABLE_FIELDS = ("drug_name", "doctor_name", "time_btwn_dose", "schedule", "side_effects", "dosage",
+                   "date_issued", "expiration_date")
+
+
+class ServiceError(Exception):
+    def __init__(self, status: int, message: str, errors: list = None, retry_after_s: float = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.errors = errors or []  # BatchValidator.FieldError of each problem with a record
+        self.retry_after_s = retry_after_s
+
+    def to_dict(self) -> dict:
+        result = {"error": self.message}
+        if self.errors:
+            result["errors"] = [error._asdict() for error in self.errors]
+        if self.retry_after_s is not None:
+            result["retry_after_s"] = self.retry_after_s
+        return result
+
+
+class Service:
+    def __init__(self, database, sessions: SessionManager = None):
+        self.database = database
+        self.sessions = sessions if sessions is not None else SessionManager(database)
+        self._lock = threading.RLock()
+
+    # SESSIONS -----
+    def login(self, username: str, password: str) -> dict:
+        """Opens a session. Returns its token and the user's ID."""
+        try:
+            session = self.sessions.login(str(username), str(password))
+        except LoginThrottled as error:
+            raise ServiceError(429, str(error), retry_after_s=error.retry_after_s)
+        if session is None:
+            raise ServiceError(401, "Wrong username or password.")
+        return {"token": session.token, "user_ID": session.get()}
+
+    def session(self, token: str):
+        """The open session with the given token."""
+        session = self.sessions.get(token) if token else None
+        if session is None:
+            raise ServiceError(401, "Not logged in, or the session timed out.")
+        return session
+
+    def logout(self, session) -> dict:
+        self.sessions.close(session.token)
+        return {}
+
+    # PRESCRIPTIONS -----
+    def prescriptions(self, session) -> list[dict]:
+        return [Exporter.as_dict(p, Exporter.PRESCRIPTIONS) for p in self.database.load_shard(session.get())]
+
+    def prescription(self, session, ID: str) -> dict:
+        return Exporter.as_dict(self._owned(session, ID), Exporter.PRESCRIPTIONS)
+
+    def due(self, session) -> list[dict]:
+        """The user's prescriptions that are due for a reminder now (see Notification.check)."""
+        return [Exporter.as_dict(p, Exporter.PRESCRIPTIONS) for p in Notification.check(self.database, session)]
+
+    def add_prescription(self, session, record: dict) -> dict:
+        """Adds a prescription from a record with the fields of BatchValidator.PRESCRIPTION_FIELDS."""
+        with self._lock:
+            values = self._validate(session, record)
+            ID = self.database.add_prescription(**values)
+            self.database.save_shard(session.get())
+            return Exporter.as_dict(self.database.get_prescription_by_ID(ID), Exporter.PRESCRIPTIONS)
+
+    def edit_prescription(self, session, ID: str, record: dict) -> dict:
+        """Changes the given fields of a prescription. Fields left out keep their values."""
+        if not isinstance(record, dict):
+            raise ServiceError(400, "A prescription must be a JSON object.")
+        with self._lock:
+            current = Exporter.as_dict(self._owned(session, ID), Exporter.PRESCRIPTIONS, EDITABLE_FIELDS)
+            for field in ("date_issued", "expiration_date"):
+                current[field] = current[field][:len("YYYY-MM-DD")]
+            if record.get("schedule"):
+                current["time_btwn_dose"] = None  # Replaced by the schedule's average gap
+            current.update(record)
+            values = self._validate(session, current)
+            values["user_id"] = values.pop("owner_ID")
+            self.database.edit_prescription(ID, **values)
+            self.database.save_shard(session.get())
+            return Exporter.as_dict(self.database.get_prescription_by_ID(ID), Exporter.PRESCRIPTIONS)
+
+    def delete_prescription(self, session, ID: str) -> dict:
+        with self._lock:
+            self._owned(session, ID)
+            self.database.delete_prescription_by_ID(ID, session.get())
+            self.database.save_shard(session.get())
+            return {}
+
+    def mark_taken(self, session, ID: str) -> dict:
+        with self._lock:
+            prescription = self.database.mark_taken(ID, session.get())
+            if prescription is None:
+                raise ServiceError(404, f"No prescription with ID {ID}.")
+            self.database.save_shard(session.get())
+            return Exporter.as_dict(prescription, Exporter.PRESCRIPTIONS)
+
+    def snooze(self, session, ID: str) -> dict:
+        with self._lock:
+            prescription = self.database.snooze(ID, session.get())
+            if prescription is None:
+                raise ServiceError(404, f"No prescription with ID {ID}.")
+            self.database.save_shard(session.get())
+            return Exporter.as_dict(prescription, Exporter.PRESCRIPTIONS)
+
+    def _owned(self, session, ID: str):
+        prescription = self.database.get_user_prescription(ID, session.get())
+        if prescription is None:
+            raise ServiceError(404, f"No prescription with ID {ID}.")
+        return prescription
+
+    def _validate(self, session, record: dict) -> dict:
+        """The Database arguments of a prescription record of the session's user, or a 400 ServiceError."""
+        if not isinstance(record, dict):
+            raise ServiceError(400, "A prescription must be a JSON object.")
+        record = {field: record[field] for field in EDITABLE_FIELDS if field in record}
+        result = next(BatchValidator(self.database).prescriptions([record], session.get()))
+        if not result.ok:
+            raise ServiceError(400, "The prescription is not valid.", result.errors)
+        return result.values
+
+
+if __name__ == "__main__":
+    # Quick sanity test
+    try:
+        from src.Database import Database
+    except ImportError:
+        from Database import Database
+
+    db = Database()
+    db.load_default_customers()
+    db.CUSTOMER_FILE_NAME = "temp_service_cust.pkl"
+    db.PRESCRIPTION_DIR_NAME = "temp_service_pscr"
+    db.DOSE_LOG_FILE_NAME = "temp_service_dose_log.bin"
+    service = Service(db)
+
+    token = service.login("thestr0ngest", "hollow&purple1989")["token"]
+    gojo = service.session(token)
+    added = service.add_prescription(gojo, {
+        "drug_name": "Ibuprofen", "doctor_name": "Ieiri Shoko", "time_btwn_dose": 28800, "side_effects": "None",
+        "dosage": "200mg", "date_issued": "2024-04-05", "expiration_date": "2025-04-05"})
+    assert [p["ID"] for p in service.prescriptions(gojo)] == [added["ID"]]
+
+    edited = service.edit_prescription(gojo, added["ID"], {"schedule": "8am, 8pm"})
+    assert edited["schedule"] == "8am, 8pm" and edited["time_btwn_dose"] == 43200 and edited["dosage"] == "200mg"
+    assert service.mark_taken(gojo, added["ID"])["was_taken"] is not None
+    assert service.snooze(gojo, added["ID"])["snooze"] is not None
+
+    try:
+        service.edit_prescription(gojo, added["ID"], {"expiration_date": "2025-02-30"})
+        raise AssertionError("Invalid date was accepted")
+    except ServiceError as error:
+        assert error.status == 400 and error.errors[0].field == "expiration_date"
+    for record in (None, [1], "schedule"):
+        try:
+            service.edit_prescription(gojo, added["ID"], record)
+            raise AssertionError(f"Edit with {record!r} was accepted")
+        except ServiceError as error:
+            assert error.status == 400
+
+    sukuna = service.session(service.login("kingofcurses", "20fingers")["token"])
+    for action in (service.prescription, service.delete_prescription, service.mark_taken):
+        try:
+            action(sukuna, added["ID"])  # Not his
+            raise AssertionError("Another user's prescription was reachable")
+        except ServiceError as error:
+            assert error.status == 404
+
+    service.delete_prescription(gojo, added["ID"])
+    assert service.prescriptions(gojo) == []
+    service.logout(gojo)
+    try:
+        service.session(token)
+        raise AssertionError("Closed session still works")
+    except ServiceError as error:
+        assert error.status == 401
+
+    import os
+    import shutil
+    db.close()
+    shutil.rmtree(db.PRESCRIPTION_DIR_NAME, ignore_errors=True)
+    for name in (db.CUSTOMER_FILE_NAME, db.DOSE_LOG_FILE_NAME):
+        if os.path.exists(name):
+            os.remove(name)
+    print("Service test successful")
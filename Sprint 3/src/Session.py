@@ -0,0 +1,166 @@
+"""
+Name: Session.py
+Description: Signed-in users. One Session per user, and a SessionManager holding many of them at once.
+
+A Session stands for one signed-in user: their ID, a random token that identifies the session to a client, and a
+`state` dictionary for anything a front end wants to keep per user (e.g. the prescription being edited).
+Sessions have get() and set() for the user's ID, the same as the tk.StringVar the windows were first written
+around, so the windows, Notification.send and the Database calls they make work with either.
+
+The Tk program has a single Session of its own (App.current_user). A headless or server front end uses a
+SessionManager instead, which logs users in through the Database (throttled, see RateLimit.py), hands out
+sessions by token and closes those that have been idle for longer than idle_timeout_s:
+
+    sessions = SessionManager(database)
+    session = sessions.login("thestr0ngest", "hollow&purple1989")   # None if the password is wrong
+    ...
+    session = sessions.get(token)                                   # None once it was closed or timed out
+    due = Notification.check(database, session)                     # Only this user's reminders
+
+Sessions are kept in least recently used order, so closing the idle ones only looks at those that timed out.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import src.Instrumentation as Instrumentation
+except ImportError:
+    import Instrumentation as Instrumentation
+
+IDLE_TIMEOUT_S = 30 * 60
+TOKEN_BYTES = 32
+
+
+class LoginThrottled(Exception):
+    """Raised by SessionManager.login when the username had too many attempts lately."""
+
+    def __init__(self, username: str, retry_after_s: float):
+        super().__init__(f"Too many login attempts for {username}")
+        self.retry_after_s = retry_after_s
+
+
+class Session:
+    def __init__(self, user_ID: str = None, token: str = None, now: float = 0.0):
+        self.user_ID = user_ID
+        self.token = token  # None for sessions not handed out by a SessionManager
+        self.created = now  # Times in seconds of the manager's clock
+        self.last_seen = now
+        self.state = {}  # Per user data of the front end
+
+    def get(self) -> str:
+        """ID of the signed-in user."""
+        return self.user_ID
+
+    def set(self, user_ID: str) -> None:
+        """Changes the signed-in user, e.g. when the Tk login window finishes."""
+        self.user_ID = user_ID
+
+    def __repr__(self):
+        return f"Session(user_ID={self.user_ID!r})"
+
+
+class SessionManager:
+    def __init__(self, database, idle_timeout_s: float = IDLE_TIMEOUT_S, clock=time.monotonic):
+        """clock returns seconds and never goes back."""
+        self.database = database
+        self.idle_timeout_s = idle_timeout_s
+        self.clock = clock
+        self._sessions = OrderedDict()  # Token -> Session. Least recently used first.
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            self._expire(self.clock())
+            return len(self._sessions)
+
+    def _expire(self, now: float) -> None:
+        """Closes every session idle for longer than idle_timeout_s."""
+        sessions = self._sessions
+        while sessions:
+            token, session = next(iter(sessions.items()))
+            if now - session.last_seen <= self.idle_timeout_s:
+                break
+            del sessions[token]
+            Instrumentation.count("sessions.expired")
+
+    def login(self, username: str, password: str) -> Session or None:
+        """Opens a session for the user if the password is theirs, otherwise returns None.
+        Raises LoginThrottled, without checking the password, after too many attempts."""
+        limiter = self.database.login_limiter
+        if not limiter.allow(username):
+            raise LoginThrottled(username, limiter.retry_after(username))
+        customer = self.database.authenticate(username, password)
+        if customer is None:
+            return None
+        limiter.forget(username)
+        return self.open(customer.ID)
+
+    def open(self, user_ID: str) -> Session:
+        """Opens a session for a user who was already authenticated."""
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            import secrets  # Not needed before the first sign in
+            session = Session(user_ID, secrets.token_urlsafe(TOKEN_BYTES), now)
+            self._sessions[session.token] = session
+            Instrumentation.count("sessions.opened")
+            return session
+
+    def get(self, token: str) -> Session or None:
+        """The open session with the given token, or None. Counts as activity on the session."""
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            session = self._sessions.get(token)
+            if session is not None:
+                session.last_seen = now
+                self._sessions.move_to_end(token)
+            return session
+
+    def close(self, token: str) -> bool:
+        """Closes a session (logs out). Returns whether it was open."""
+        with self._lock:
+            return self._sessions.pop(token, None) is not None
+
+    def sessions(self) -> list[Session]:
+        """Every open session, least recently used first."""
+        with self._lock:
+            self._expire(self.clock())
+            return list(self._sessions.values())
+
+
+if __name__ == "__main__":
+    # Quick sanity test
+    try:
+        from src.Database import Database
+    except ImportError:
+        from Database import Database
+
+    db = Database()
+    db.CUSTOMER_FILE_NAME = "temp_session_cust.pkl"
+    db.load_default_customers()
+    now = [0.0]
+    manager = SessionManager(db, idle_timeout_s=60, clock=lambda: now[0])
+
+    gojo = manager.login("thestr0ngest", "hollow&purple1989")
+    sukuna = manager.login("kingofcurses", "20fingers")
+    assert gojo.get() == db.get_customer_by_username("thestr0ngest").ID and gojo.token != sukuna.token
+    assert manager.login("thestr0ngest", "wrong-password1") is None
+    assert manager.get(gojo.token) is gojo and len(manager) == 2
+
+    now[0] = 50.0
+    manager.get(sukuna.token)
+    now[0] = 100.0  # gojo was idle for 100s, sukuna for 50s
+    assert manager.get(gojo.token) is None and manager.get(sukuna.token) is sukuna
+    assert manager.close(sukuna.token) and len(manager) == 0
+
+    for _ in range(db.login_limiter.capacity):
+        manager.login("kingofcurses", "wrong-password1")
+    try:
+        manager.login("kingofcurses", "20fingers")
+        raise AssertionError("Login was not throttled")
+    except LoginThrottled as error:
+        assert error.retry_after_s > 0
+    print("Session test successful")
@@ -16,15 +16,21 @@ The way this class should be used is the following:
 Feel free to add a new validation function into the class if necessary.
 """
 
-import re
+import math
 from datetime import datetime
 
 try:
     from src.Database import Database
     from src.Alert import AlertWindow
+    import src.Schedule as Schedule
+    import src.QuietHours as QuietHours
+    import src.Rules as Rules
 except ImportError:
-    from src.Database import Database
-    from src.Alert import AlertWindow
+    from Database import Database
+    from Alert import AlertWindow
+    import Schedule as Schedule
+    import QuietHours as QuietHours
+    import Rules as Rules
 
 
 class Validator:
@@ -82,26 +88,17 @@ class Validator:
         """
         FAIL_MESSAGE = "Username already exists in the database. Please choose another username."
 
-        for user in database.customers:
-            if user.username == username:
-                self._add_failure(FAIL_MESSAGE)
+        if database.get_customer_by_username(username) is not None:
+            self._add_failure(FAIL_MESSAGE)
 
     def check_valid_email_format(self, email: str) -> None:
         """
-        Checks if email is in a valid format.
+        Checks if email is in a valid format (see Rules.valid_email).
         Test case implementation: Use Case 2, TC03
         """
         FAIL_MESSAGE = "Email was not in the correct format. Please enter a valid email address."
 
-        EMAIL_REGEX = r"[a-zA-Z0-9!#\$%&'\*\+-/=\?\^_`\{\|\}~\.]+@[a-zA-Z0-9\-]+\.[a-zA-Z\.]+"  # Yes, I know.
-        """
-        The above isn't a perfect representation of the standard, but covers enough. It's mostly lacking
-        support for "comments" and checking if certain characters are present only within quotes.
-        I've never seen an email that uses either of these features, and just putting your email in won't fail
-        in the way it's been implemented. If you like to use comments in your email address, too bad!
-        """
-
-        if re.fullmatch(EMAIL_REGEX, email) is None:  # re.fullmatch() returns None if the entire string does not match
+        if not Rules.valid_email(email):
             self._add_failure(FAIL_MESSAGE)
 
     def check_valid_password_format(self, password: str) -> None:
@@ -115,17 +112,12 @@ class Validator:
         FAIL_MESSAGE_LETTERS_AND_NUMS = "Password does not satisfy the requirements; " + \
                                         "it must have both letters and numbers."
 
-        EIGHT_CHARS_REGEX = ".{8,}"
-        LETTERS_THEN_NUM_REGEX = ".*[0-9].*[a-zA-Z].*"
-        NUM_THEN_LETTERS_REGEX = ".*[a-zA-Z].*[0-9].*"
-
         # Check for length requirement
-        if re.fullmatch(EIGHT_CHARS_REGEX, password) is None:  # re.fullmatch() returns None if no match
+        if not Rules.password_long_enough(password):
             self._add_failure(FAIL_MESSAGE_CHARS)
 
         # Check for letters and numbers requirement
-        if (re.fullmatch(LETTERS_THEN_NUM_REGEX, password) is None) and \
-                (re.fullmatch(NUM_THEN_LETTERS_REGEX, password) is None):
+        if not Rules.password_has_letters_and_numbers(password):
             self._add_failure(FAIL_MESSAGE_LETTERS_AND_NUMS)
 
     def check_username_exists(self, username: str, database: Database) -> None:
@@ -135,25 +127,30 @@ class Validator:
         """
         FAIL_MESSAGE = f"No account found with username {username}."
 
-        for user in database.customers:
-            if user.username == username:
-                return
-        self._add_failure(FAIL_MESSAGE)
+        if database.get_customer_by_username(username) is None:
+            self._add_failure(FAIL_MESSAGE)
+
+    def check_login_not_throttled(self, username: str, database: Database) -> None:
+        """
+        Checks that the username has not had too many login attempts lately (see RateLimit.py). Every call counts
+        as an attempt, so this should come before the password is checked.
+        """
+        if not database.login_limiter.allow(username):
+            wait_s = math.ceil(database.login_limiter.retry_after(username))
+            self._add_failure(f"Too many login attempts for \"{username}\". Please try again in {wait_s} seconds.")
 
-    def check_username_password_match(self, username: str, password: str, database: Database) -> None:
+    def check_username_password_match(self, username: str, password: str, database: Database):
         """
         Checks the given database if the given username and password correctly match an existing user.
+        Returns the matching customer (or None), so the password does not have to be checked a second time.
         Test case implementation: Use Case 2, TC07
         """
         FAIL_MESSAGE = f"Password for user \"{username}\" incorrect. Please try again."
 
-        for user in database.customers:
-            if user.username == username:
-                if user.password == password:
-                    return
-                else:
-                    break
-        self._add_failure(FAIL_MESSAGE)
+        user = database.authenticate(username, password)
+        if user is None:
+            self._add_failure(FAIL_MESSAGE)
+        return user
 
     def check_user_logged_in(self, current_user_ID, no_user_msg) -> None:
         """
@@ -199,15 +196,26 @@ class Validator:
         if not input_str.isdigit():
             self._add_failure(FAIL_MESSAGE)
 
+    def check_valid_schedule(self, expression: str) -> None:
+        """Checks that a dose schedule such as "8am, 8pm" or "weekdays 9:00" can be understood (see Schedule.py)."""
+        try:
+            Schedule.compile_schedule(expression)
+        except ValueError as error:
+            self._add_failure(f"Schedule could not be understood.\n{error}")
+
+    def check_valid_quiet_hours(self, text: str) -> None:
+        """Checks that quiet hours such as "10pm-7am" can be understood (see QuietHours.py)."""
+        try:
+            QuietHours.parse(text)
+        except ValueError as error:
+            self._add_failure(f"Quiet hours could not be understood.\n{error}")
+
     def check_user_has_prescriptions(self, user_id: str, database: Database) -> None:
         """Check that given user has any prescriptions."""
         FAIL_MESSAGE = "Current user has no prescriptions to edit!"
 
-        for prescription in database.prescriptions:
-            if prescription.owner_ID == user_id:
-                return
-
-        self._add_failure(FAIL_MESSAGE)
+        if database.get_prescriptions_by_owner_ID(user_id) is None:
+            self._add_failure(FAIL_MESSAGE)
 
 
 """Some manual testing of test cases is performed here if this file is run by itself."""
@@ -272,3 +280,11 @@ if __name__ == "__main__":
     v.check_username_exists("i-dont-exist", db)
     v.check_username_password_match("i-dont-exist", "fakepassword", db)
     print(f"Username & Password failure / {str(v)}")
+
+    # check_login_not_throttled
+    v = Validator()
+    for _ in range(db.login_limiter.capacity):
+        v.check_login_not_throttled("kingofcurses", db)
+    print(f"Blank / {str(v)}")
+    v.check_login_not_throttled("kingofcurses", db)
+    print(f"Throttled failure / {str(v)}")
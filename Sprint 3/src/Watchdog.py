@@ -0,0 +1,164 @@
+"""
+Name: Watchdog.py
+Description: Keeps an eye on the Tk event loop so that freezes leave a trace.
+
+EventLoopMonitor does three things once started:
+    * Times every Tk callback (button commands, event bindings, after() timers, variable traces) and logs
+      the ones that take longer than the callback threshold, with their name and duration.
+    * Runs a heartbeat timer and records how late it fires ("drift"). Timers scheduled through
+      monitor.schedule() (such as App.notification_bg_task) get their drift recorded too.
+    * Optionally runs a background thread that notices when the heartbeat has stopped for longer than the
+      stall threshold and prints a stack sample of the main thread, showing what it is stuck on.
+
+Environment variables:
+    MAP_WATCHDOG_THRESHOLD_MS   Callbacks slower than this are logged (default 200)
+    MAP_WATCHDOG_STALL_MS       Heartbeat silence that counts as a stall (default 2000)
+    MAP_WATCHDOG_STACKS         Set to 1 to sample the main thread's stack on a stall
+"""
+
+# Import shenanigans necessary to ensure cross-platform compatibility
+try:
+    import tkinter as tk
+except ImportError:
+    import Tkinter as tk
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+try:
+    import src.Instrumentation as Instrumentation
+except ImportError:
+    import Instrumentation as Instrumentation
+
+HEARTBEAT_MS = 1000
+DEFAULT_CALLBACK_THRESHOLD_MS = 200
+DEFAULT_STALL_MS = 2000
+SLOW_CALLBACK_HISTORY = 50  # How many of the latest slow callbacks are kept for stats()
+
+_ORIGINAL_CALL_WRAPPER = tk.CallWrapper
+
+
+def _callback_name(func) -> str:
+    """Readable name of a Tk callback, e.g. "App.notification_bg_task"."""
+    name = getattr(func, "__name__", None) or repr(func)
+    owner = getattr(func, "__self__", None)
+    if owner is not None:
+        name = f"{type(owner).__name__}.{name}"
+    return name
+
+
+class EventLoopMonitor:
+    def __init__(self, root, callback_threshold_s=None, stall_threshold_s=None, sample_stacks=None):
+        self.root = root
+
+        if callback_threshold_s is None:
+            callback_threshold_s = int(os.environ.get("MAP_WATCHDOG_THRESHOLD_MS",
+                                                      DEFAULT_CALLBACK_THRESHOLD_MS)) / 1000
+        if stall_threshold_s is None:
+            stall_threshold_s = int(os.environ.get("MAP_WATCHDOG_STALL_MS", DEFAULT_STALL_MS)) / 1000
+        if sample_stacks is None:
+            sample_stacks = os.environ.get("MAP_WATCHDOG_STACKS", "") not in ("", "0")
+
+        self.callback_threshold_s = callback_threshold_s
+        self.stall_threshold_s = stall_threshold_s
+        self.sample_stacks = sample_stacks
+
+        # Timer name -> [times fired, total drift, max drift] in seconds
+        self.drift = {}
+        # Latest slow callbacks as (name, duration in seconds)
+        self.slow_callbacks = deque(maxlen=SLOW_CALLBACK_HISTORY)
+        self.stall_count = 0
+
+        self._main_thread_id = threading.get_ident()
+        self._last_heartbeat = time.monotonic()
+        self._stall_reported = False
+        self._sampler_stop = threading.Event()
+
+    def start(self):
+        """Starts monitoring. Callbacks registered with Tk before this is called are not timed, so start the
+        monitor before building any widgets."""
+        self._install_callback_timer()
+        self.schedule("heartbeat", HEARTBEAT_MS, self._heartbeat)
+        if self.sample_stacks:
+            threading.Thread(target=self._stall_sampler, name="tk-watchdog", daemon=True).start()
+
+    def stop(self):
+        """Stops the stall sampler and puts tkinter's own callback wrapper back."""
+        self._sampler_stop.set()
+        tk.CallWrapper = _ORIGINAL_CALL_WRAPPER
+
+    def _install_callback_timer(self):
+        """Replaces tkinter's callback wrapper so every callback Tk runs is timed.
+        tkinter wraps each Python callback in a CallWrapper when it is registered with Tk."""
+        monitor = self
+
+        class TimedCallWrapper(_ORIGINAL_CALL_WRAPPER):
+            def __call__(self, *args):
+                start = time.perf_counter()
+                try:
+                    return super().__call__(*args)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    if elapsed > monitor.callback_threshold_s:
+                        monitor.report_slow_callback(_callback_name(self.func), elapsed)
+
+        tk.CallWrapper = TimedCallWrapper
+
+    def report_slow_callback(self, name: str, seconds: float):
+        self.slow_callbacks.append((name, seconds))
+        Instrumentation.count("Tk.slow_callbacks")
+        print(f"[watchdog] Slow Tk callback: {name} took {seconds * 1000:.0f}ms")
+
+    def schedule(self, name: str, delay_ms: int, func) -> str:
+        """Same as root.after(delay_ms, func), but records how late func actually runs under the given name.
+        Returns the after() ID."""
+        expected = time.perf_counter() + delay_ms / 1000
+
+        def fire():
+            self.record_drift(name, time.perf_counter() - expected)
+            func()
+        fire.__name__ = _callback_name(func)  # Slow callback reports show func's name rather than "fire"
+
+        return self.root.after(delay_ms, fire)
+
+    def record_drift(self, name: str, seconds: float):
+        seconds = max(seconds, 0.0)
+        entry = self.drift.setdefault(name, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+        if Instrumentation.enabled:
+            Instrumentation.record(f"Tk.drift.{name}", seconds)
+
+    def _heartbeat(self):
+        self._last_heartbeat = time.monotonic()
+        self._stall_reported = False
+        self.schedule("heartbeat", HEARTBEAT_MS, self._heartbeat)
+
+    def _stall_sampler(self):
+        """Background thread. Prints the main thread's stack once per stall."""
+        interval = max(self.stall_threshold_s / 4, 0.05)
+        while not self._sampler_stop.wait(interval):
+            silence = time.monotonic() - self._last_heartbeat - HEARTBEAT_MS / 1000
+            if silence < self.stall_threshold_s or self._stall_reported:
+                continue
+
+            self._stall_reported = True
+            self.stall_count += 1
+            Instrumentation.count("Tk.stalls")
+            import traceback  # Imported on the first stall rather than at startup
+            frame = sys._current_frames().get(self._main_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "(main thread not found)\n"
+            print(f"[watchdog] Tk event loop stalled for {silence:.1f}s. Main thread stack:\n{stack}", end="")
+
+    def stats(self) -> dict:
+        """Drift per timer, the latest slow callbacks and the number of stalls seen."""
+        return {
+            "drift": {name: {"fired": fired, "mean_s": total / fired if fired else 0.0, "max_s": worst}
+                      for name, (fired, total, worst) in self.drift.items()},
+            "slow_callbacks": list(self.slow_callbacks),
+            "stalls": self.stall_count,
+        }
@@ -0,0 +1,195 @@
+"""
+Name: Widgets.py
+Description: Custom widgets shared between windows.
+             VirtualList replaces ttk.OptionMenu wherever a user picks one of their prescriptions.
+"""
+
+# Import shenanigans necessary to ensure cross-platform compatibility
+try:
+    import tkinter as tk
+    from tkinter import ttk
+except ImportError:
+    import Tkinter as tk
+    import ttk
+
+from bisect import bisect_left
+
+
+class VirtualList(tk.Frame):
+    """A scrollable list with a filter box on top.
+
+    Each item is a (key, text) pair. The text is shown and the key of the selected item is written to the
+    given StringVar, so two items with the same text can still be told apart.
+    Only visible_rows labels are ever created no matter how many items there are. Scrolling just changes
+    which items those labels show.
+
+    Typing in the filter box only shows items containing the typed text (case-insensitive). When the new
+    filter text extends the old one, only the items that matched before are searched again."""
+
+    def __init__(self, master, variable: tk.StringVar, visible_rows=5, **kwargs):
+        super().__init__(master, **kwargs)
+
+        # Selected item's key. Empty string if nothing is selected
+        self.variable = variable
+        self.visible_rows = visible_rows
+
+        # Item data. Stored as parallel lists so filtering does not have to build any objects
+        self._keys = []
+        self._texts = []
+        self._folded_texts = []  # Lowercase copies of _texts for filtering
+        self._key_positions = {}  # Key -> index into the lists above
+
+        # Filter state
+        self.filter_text = tk.StringVar()
+        self._query = ""
+        self._matches = []  # Sorted indices of the items passing the filter
+        self._top = 0  # Position in _matches shown on the first row
+
+        # Colors
+        self.DARK_GREY = "#b3b3b3"
+        self.normal_background = None  # Whatever the theme uses, read in create_widgets
+
+        # Widgets defined in other functions
+        self.filter_entry = None
+        self.rows_frame = None
+        self.row_labels = []
+        self.scrollbar = None
+
+        self.create_widgets()
+
+        # Event bindings
+        self.filter_text.trace_add("write", self._filter_changed)
+        self.variable.trace_add("write", self._render)
+
+    def create_widgets(self):
+        """Filter box on top, the rows below it, and a scrollbar to their right."""
+        self.columnconfigure(0, weight=1)
+
+        self.filter_entry = tk.Entry(self, textvariable=self.filter_text)
+        self.filter_entry.grid(column=0, row=0, columnspan=2, sticky="NSEW", pady=(0, 3))
+        self.filter_entry.bind("<Down>", lambda e: self.move_selection(1))
+        self.filter_entry.bind("<Up>", lambda e: self.move_selection(-1))
+
+        self.rows_frame = tk.Frame(self, relief="sunken", borderwidth=1)
+        self.rows_frame.grid(column=0, row=1, sticky="NSEW")
+        self.rows_frame.columnconfigure(0, weight=1)
+        self.normal_background = self.rows_frame.cget("background")
+
+        for idx in range(self.visible_rows):
+            label = tk.Label(self.rows_frame, anchor="w", padx=3)
+            label.grid(column=0, row=idx, sticky="NSEW")
+            label.bind("<Button-1>", lambda e, row=idx: self._click_row(row))
+            self._bind_scroll_wheel(label)
+            self.row_labels.append(label)
+        self._bind_scroll_wheel(self.rows_frame)
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._scrollbar_command)
+        self.scrollbar.grid(column=1, row=1, sticky="NS")
+
+    def _bind_scroll_wheel(self, widget):
+        widget.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1))  # Windows/macOS
+        widget.bind("<Button-4>", lambda e: self.scroll(-1))  # Linux
+        widget.bind("<Button-5>", lambda e: self.scroll(1))
+
+    def set_items(self, items):
+        """Replaces the list contents with the given (key, text) pairs and clears the filter.
+        The current selection is kept if its key is still present, otherwise the first item is selected."""
+        self._keys = []
+        self._texts = []
+        for key, text in items:
+            self._keys.append(key)
+            self._texts.append(text)
+        self._folded_texts = [text.casefold() for text in self._texts]
+        self._key_positions = {key: idx for idx, key in enumerate(self._keys)}
+
+        self._query = ""
+        self._matches = list(range(len(self._keys)))
+        self._top = 0
+        self.filter_text.set("")  # Runs _filter_changed, which renders
+
+        if self.variable.get() not in self._key_positions:
+            self.variable.set(self._keys[0] if self._keys else "")
+
+    def _filter_changed(self, *e):
+        """Narrows the shown items down to the ones containing the filter text."""
+        query = self.filter_text.get().casefold()
+        if query.startswith(self._query):
+            candidates = self._matches  # Anything that failed the shorter query fails this one too
+        else:
+            candidates = range(len(self._keys))
+
+        self._matches = [idx for idx in candidates if query in self._folded_texts[idx]]
+        self._query = query
+        self._top = 0
+        self.scroll_to_selection()
+
+    def _render(self, *e):
+        """Shows the items from self._top onward on the row labels and updates the scrollbar."""
+        selected = self._key_positions.get(self.variable.get())
+        for row in range(self.visible_rows):
+            label = self.row_labels[row]
+            position = self._top + row
+            if position < len(self._matches):
+                idx = self._matches[position]
+                label["text"] = self._texts[idx]
+                label["background"] = self.DARK_GREY if idx == selected else self.normal_background
+            else:
+                label["text"] = ""
+                label["background"] = self.normal_background
+
+        count = len(self._matches)
+        if count <= self.visible_rows:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self._top / count, (self._top + self.visible_rows) / count)
+
+    def scroll(self, rows: int):
+        """Scrolls by the given number of rows, staying inside the list."""
+        self._top = max(0, min(self._top + rows, len(self._matches) - self.visible_rows))
+        self._render()
+
+    def _scrollbar_command(self, action, amount, unit=None):
+        if action == "moveto":
+            self._top = 0
+            self.scroll(int(float(amount) * len(self._matches)))
+        elif unit == "pages":
+            self.scroll(int(amount) * self.visible_rows)
+        else:
+            self.scroll(int(amount))
+
+    def _position_of_selection(self) -> int or None:
+        """Position of the selected item within the filtered items, or None if it is filtered out."""
+        selected = self._key_positions.get(self.variable.get())
+        if selected is None:
+            return None
+        position = bisect_left(self._matches, selected)  # _matches is sorted, so no scan is needed
+        if position < len(self._matches) and self._matches[position] == selected:
+            return position
+        return None
+
+    def scroll_to_selection(self):
+        """Makes sure the selected item is on screen, if it passes the filter."""
+        position = self._position_of_selection()
+        if position is not None:
+            if position < self._top:
+                self._top = position
+            elif position >= self._top + self.visible_rows:
+                self._top = position - self.visible_rows + 1
+        self.scroll(0)
+
+    def move_selection(self, step: int):
+        """Selects the filtered item step rows below (or above, if negative) the current one."""
+        if not self._matches:
+            return
+        position = self._position_of_selection()
+        if position is None:
+            position = 0
+        else:
+            position = max(0, min(position + step, len(self._matches) - 1))
+        self.variable.set(self._keys[self._matches[position]])
+        self.scroll_to_selection()
+
+    def _click_row(self, row: int):
+        position = self._top + row
+        if position < len(self._matches):
+            self.variable.set(self._keys[self._matches[position]])